@@ -0,0 +1,126 @@
+"""
+Mergeable Aggregates
+Running mean/variance and fixed-bin histogram counts that can be built chunk
+by chunk and merged, so summary statistics of a long recording never need
+all of its values in memory at once
+"""
+
+import numpy as np
+
+
+class RunningStats:
+    """Weighted count, mean, variance, min and max of a stream of values"""
+
+    def __init__(self):
+        self.count = 0
+        self.weight = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0   # weighted sum of squared deviations from the mean
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    @classmethod
+    def of(cls, values, weight=1.0):
+        return cls().add(values, weight)
+
+    def add(self, values, weight=1.0):
+        """Add finite `values`, each counted with `weight`"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if len(values) == 0 or weight <= 0:
+            return self
+        batch = RunningStats()
+        batch.count = len(values)
+        batch.weight = weight * len(values)
+        batch.mean = float(values.mean())
+        batch._m2 = weight * float(np.sum(np.square(values - batch.mean)))
+        batch.min = float(values.min())
+        batch.max = float(values.max())
+        return self.merge(batch)
+
+    def merge(self, other):
+        """Fold another RunningStats into this one (Chan et al. pairwise update)"""
+        if other.weight == 0:
+            return self
+        total = self.weight + other.weight
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.weight * other.weight / total
+        self.mean += delta * other.weight / total
+        self.weight = total
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Population variance (as np.var), NaN when empty"""
+        return self._m2 / self.weight if self.weight else float('nan')
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.variance))
+
+    def summary(self, digits=4):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': round(self.mean, digits),
+            'std': round(self.std, digits),
+            'min': round(self.min, digits),
+            'max': round(self.max, digits)
+        }
+
+
+class HistogramCounts:
+    """Counts of values in fixed bins, plus those below and above the range"""
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.below = 0
+        self.above = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        self.counts += np.histogram(values, self.edges)[0]
+        self.below += int(np.sum(values < self.edges[0]))
+        self.above += int(np.sum(values > self.edges[-1]))
+        return self
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Cannot merge histograms with different bins")
+        self.counts += other.counts
+        self.below += other.below
+        self.above += other.above
+        return self
+
+    @property
+    def total(self):
+        return int(self.counts.sum()) + self.below + self.above
+
+    def quantile(self, q):
+        """Approximate quantile, interpolated linearly inside its bin"""
+        if not self.total:
+            return float('nan')
+        target = q * self.total - self.below
+        if target <= 0:
+            return float(self.edges[0])
+        cumulative = np.cumsum(self.counts)
+        i = int(np.searchsorted(cumulative, target))
+        if i >= len(self.counts):
+            return float(self.edges[-1])
+        before = cumulative[i - 1] if i else 0
+        fraction = (target - before) / self.counts[i] if self.counts[i] else 0.0
+        return float(self.edges[i] + fraction * (self.edges[i + 1] - self.edges[i]))
+
+    def summary(self):
+        return {
+            'edges': [round(float(e), 4) for e in self.edges],
+            'counts': self.counts.tolist(),
+            'below': self.below,
+            'above': self.above
+        }
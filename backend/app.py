@@ -2,22 +2,36 @@
 Flask Backend API for Voice Analysis
 Endpoints:
 - POST /analyze - Analyze audio file
-- GET /health - Health check
+- POST /analyze/batch - Analyze several audio files in one request
+- POST /analyze/jobs - Queue an analysis job (returns a job id)
+- GET /analyze/jobs/<id> - Job status and result
+- POST /stream/sessions - Start a live (streaming) analysis session
+- POST /stream/sessions/<id>/frames - Send PCM frames, get partial results
+- POST /stream/sessions/<id>/stop - Finish the session, get the full result
+- GET/DELETE /admin/cache - Result cache stats / invalidation
+- GET /admin/batching - Model micro-batching stats
+- GET /health - Health check (liveness, readiness, startup times)
+- GET /health/live, /health/ready - Probes for orchestrators
+- GET /metrics - Prometheus metrics
 """
 
+import hmac
 import os
 import sys
+import time
+import threading
+
+# Seconds spent in each startup step, reported by /health
+STARTUP_BEGAN = time.perf_counter()
+startup_times = {}
 
 # Add FFmpeg to PATH before importing other modules
 def setup_ffmpeg():
     """Find and add FFmpeg to PATH if not already available"""
-    # Check if ffmpeg is already in PATH
-    import subprocess
-    try:
-        subprocess.run(['ffmpeg', '-version'], capture_output=True, timeout=2)
+    # Check if ffmpeg is already in PATH (a PATH lookup, no subprocess)
+    import shutil
+    if shutil.which('ffmpeg'):
         return  # FFmpeg already available
-    except:
-        pass
     
     # Search for local FFmpeg installation
     search_paths = [
@@ -40,12 +54,23 @@ def setup_ffmpeg():
     print("  Run: python setup_ffmpeg.py")
 
 # Setup FFmpeg before importing libraries that need it
+step = time.perf_counter()
 setup_ffmpeg()
+startup_times['ffmpeg_check'] = round(time.perf_counter() - step, 3)
 
-from flask import Flask, request, jsonify, send_from_directory
+# transformers/torch are only imported when the models load (see warm-up below)
+step = time.perf_counter()
+from flask import Flask, Response, g, request, jsonify, send_from_directory
 from flask_cors import CORS
 from voice_analyzer import VoiceAnalyzer
-from werkzeug.utils import secure_filename
+from job_queue import JobQueue, QueueFullError
+from result_cache import ResultCache, cache_key
+from upload_spool import UploadSpool
+from long_audio import analyze_long
+from pcm_spool import remove_stale_spools
+from streaming import StreamingSessions, StreamTooLongError
+from metrics import REGISTRY, histogram_lines, metric_lines
+startup_times['imports'] = round(time.perf_counter() - step, 3)
 
 app = Flask(__name__, static_folder='../frontend', static_url_path='')
 CORS(app, resources={
@@ -59,23 +84,170 @@ CORS(app, resources={
 })
 
 # File Upload Configuration
-UPLOAD_FOLDER = 'uploads'
+# Uploads are decoded from memory; only large files spill to a private temp file
 ALLOWED_EXTENSIONS = {'wav', 'mp3', 'ogg', 'm4a', 'flac', 'webm'}
 
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_FILE_SIZE = int(os.environ.get('MAX_FILE_SIZE_MB', 10)) * 1024 * 1024  # 10MB by default
+MAX_BATCH_FILES = 20               # files per POST /analyze/batch
+
+# Async job configuration
+JOB_WORKERS = 2          # analyses running at the same time
+JOB_QUEUE_SIZE = 16      # queued jobs before new submissions get a 429
+JOB_RESULT_TTL = 600     # seconds a finished job's result is kept
+
+# Result cache: identical uploads are answered from here instead of re-running the models
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR')  # set to keep results across restarts
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')            # /admin/* is disabled without it
+
+# Recordings longer than this are decoded and analyzed in chunks (bounded memory)
+LONG_AUDIO_SECONDS = float(os.environ.get('LONG_AUDIO_SECONDS', 600))
+LONG_AUDIO_CHUNK = float(os.environ.get('LONG_AUDIO_CHUNK', 60))
+
+# Live streaming sessions
+STREAM_MAX_SESSIONS = 8
+STREAM_IDLE_TIMEOUT = 120   # seconds without frames before a session is dropped
+STREAM_WINDOW = 3.0         # seconds of audio per incremental analysis window
+# A session holds at most LONG_AUDIO_SECONDS of audio; frames past that get a 413
+
+# Shared model server (python model_server.py); when set, workers load no models
+MODEL_SERVER = os.environ.get('MODEL_SERVER')
+# Inference backend for locally loaded models: torch, onnx or onnx-int8
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'torch')
+# Analyses running at once in this process (threaded servers, e.g. gunicorn -k gthread)
+ANALYSIS_CONCURRENCY = int(os.environ.get('ANALYSIS_CONCURRENCY', os.cpu_count() or 1))
+# Pipelines per model running forward passes side by side (0: one per four cores)
+MODEL_REPLICAS = int(os.environ.get('MODEL_REPLICAS', 0))
+# Load and warm up the models in the background at startup (0: on first request)
+MODEL_WARMUP = os.environ.get('MODEL_WARMUP', '1') != '0'
 
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
 # Initialize analyzer
 print("Initializing Voice Analyzer...")
-analyzer = VoiceAnalyzer()
-print("Server ready!")
+step = time.perf_counter()
+analyzer = VoiceAnalyzer(model_server=MODEL_SERVER, backend=INFERENCE_BACKEND,
+                         max_workers=max(4, ANALYSIS_CONCURRENCY), replicas=MODEL_REPLICAS or None,
+                         max_concurrent=ANALYSIS_CONCURRENCY)
+jobs = JobQueue(workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE, ttl=JOB_RESULT_TTL)
+result_cache = ResultCache(max_entries=RESULT_CACHE_SIZE, disk_dir=RESULT_CACHE_DIR)
+streams = StreamingSessions(analyzer, max_sessions=STREAM_MAX_SESSIONS,
+                            idle_timeout=STREAM_IDLE_TIMEOUT, window=STREAM_WINDOW,
+                            max_seconds=LONG_AUDIO_SECONDS)
+# Spool files a crashed worker left behind (live ones are already unlinked on POSIX)
+stale_spools = remove_stale_spools()
+if stale_spools:
+    print(f"✓ Removed {stale_spools} stale spool files")
+startup_times['init'] = round(time.perf_counter() - step, 3)
+startup_times['to_live'] = round(time.perf_counter() - STARTUP_BEGAN, 3)
+
+def warm_up_models():
+    """Load the models and run a dummy inference so the first request is fast"""
+    try:
+        analyzer.warm_up()
+        startup_times['to_ready'] = round(time.perf_counter() - STARTUP_BEGAN, 3)
+        print(f"✓ Models ready ({startup_times['to_ready']}s after start)")
+    except Exception as e:
+        print(f"✗ Model warm-up failed: {e}")
+
+if MODEL_WARMUP:
+    threading.Thread(target=warm_up_models, name='model-warmup', daemon=True).start()
+print(f"Server ready! (live after {startup_times['to_live']}s; models "
+      f"{'loading in the background' if MODEL_WARMUP else 'load on first request'})")
+
+# Request metrics; stage latencies are recorded by VoiceAnalyzer itself
+HTTP_REQUESTS = REGISTRY.counter('voice_http_requests_total', 'HTTP requests by endpoint and status',
+                                 labels=('endpoint', 'method', 'status'))
+HTTP_SECONDS = REGISTRY.histogram('voice_http_request_seconds', 'HTTP request latency',
+                                  labels=('endpoint',))
+
+@REGISTRY.collector
+def service_metrics():
+    """Cache, queue, streaming and model batching state at scrape time"""
+    cache = result_cache.stats()
+    lines = metric_lines('voice_result_cache_lookups_total', 'Result cache lookups by outcome', 'counter',
+                         [(('memory_hit',), cache['hits']), (('disk_hit',), cache['disk_hits']),
+                          (('miss',), cache['misses'])], ('outcome',))
+    lines += metric_lines('voice_result_cache_entries', 'Results held in memory', 'gauge', [((), cache['entries'])])
+    lines += metric_lines('voice_job_queue_depth', 'Jobs waiting for a worker', 'gauge', [((), jobs.depth())])
+    lines += metric_lines('voice_stream_sessions', 'Open live streaming sessions', 'gauge', [((), len(streams))])
+    lines += metric_lines('voice_models_ready', 'Models loaded (1) or not yet (0)', 'gauge',
+                          [((), int(analyzer.ready))])
+
+    lines += ['# HELP voice_model_batch_size Inputs per model forward pass',
+              '# TYPE voice_model_batch_size histogram']
+    for model, stats in analyzer.batching_stats().items():
+        running, cumulative = 0, []
+        for bound, count in stats['batch_size_histogram'].items():
+            running += count
+            cumulative.append((float(bound), running))
+        lines += histogram_lines('voice_model_batch_size', cumulative, stats['items'],
+                                 stats['forward_passes'], ('model',), (model,))
+    return lines
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    if 'request_started' in g:
+        HTTP_SECONDS.observe(time.perf_counter() - g.request_started, endpoint=endpoint)
+    return response
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def file_suffix(filename):
+    return '.' + filename.rsplit('.', 1)[1].lower()
+
+def decode_upload(upload):
+    """(AudioContext, None) for a spooled upload, or (None, chunks) if it needs chunked mode
+
+    Small uploads can be long too (an hour of Opus fits in a few MB). The
+    duration in the header decides without decoding (read from memory for
+    in-memory uploads); long ones give (None, None) and are decoded by
+    analyze_long. Uploads without one, like MediaRecorder WebM, are decoded
+    as a stream (from memory if they are held there); past LONG_AUDIO_SECONDS
+    the decode stops and `chunks` carries on from where it is (see
+    UploadSpool.load_or_chunk).
+    """
+    duration = upload.duration()
+    if duration is None:
+        return upload.load_or_chunk(LONG_AUDIO_SECONDS, LONG_AUDIO_CHUNK)
+    if duration > LONG_AUDIO_SECONDS:
+        return None, None
+    return upload.to_context(), None
+
+def analyze_long_upload(upload, chunks=None):
+    """Chunked analysis of a long upload, read back from disk (spilled first if needed)"""
+    return analyze_long(analyzer, upload.to_file(), chunk_seconds=LONG_AUDIO_CHUNK, chunks=chunks)
+
+def analyze_upload(upload):
+    """Full analysis of a spooled upload; long recordings go through chunked mode"""
+    ctx, chunks = decode_upload(upload)
+    if ctx is None:
+        return analyze_long_upload(upload, chunks)
+    return analyzer.analyze(ctx)
+
+def analyze_cached(upload, key):
+    """Decode the spooled upload, run the analysis and cache the result"""
+    result = analyze_upload(upload)
+    result_cache.put(key, result)
+    return result
+
+def admin_authorized():
+    """X-Admin-Token must match ADMIN_TOKEN; without a token /admin/* is disabled
+
+    The caller's address is no proof of anything: behind a reverse proxy on
+    the same host every request comes from loopback.
+    """
+    if not ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+
 @app.route('/')
 def landing():
     """Serve the landing page"""
@@ -92,9 +264,29 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "service": "Voice Analysis API",
-        "version": "1.0"
+        "version": "1.0",
+        "live": True,
+        "ready": analyzer.ready,
+        "startup": dict(startup_times, **{f"load_{k}": v for k, v in analyzer.load_times.items()})
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/health/live', methods=['GET'])
+def liveness():
+    """The process is up and serving requests"""
+    return jsonify({"live": True})
+
+@app.route('/health/ready', methods=['GET'])
+def readiness():
+    """Models are loaded; 503 until then so no traffic is routed here"""
+    if not analyzer.ready:
+        return jsonify({"ready": False}), 503
+    return jsonify({"ready": True})
+
 @app.route('/analyze', methods=['POST', 'OPTIONS'])
 def analyze_audio():
     """Analyze uploaded audio file"""
@@ -119,21 +311,23 @@ def analyze_audio():
         if not allowed_file(file.filename):
             return jsonify({"error": f"File type not allowed. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"}), 400
         
-        # Save file
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        print(f"Analyzing file: {filename}")
-        
-        # Analyze audio
-        result = analyzer.analyze(filepath)
-        
-        # Clean up
-        os.remove(filepath)
+        # Read the upload into memory (hashing as we go); the spool is
+        # always released, even if the analysis fails
+        with UploadSpool(file.stream, suffix=file_suffix(file.filename)) as upload:
+            # Identical uploads (retries, reloads) are served from the result cache
+            key = cache_key(upload.sha256, analyzer.cache_signature())
+            result = result_cache.get(key)
+            cached = result is not None
+            
+            if cached:
+                print(f"Cache hit for file: {file.filename}")
+            else:
+                print(f"Analyzing file: {file.filename} ({upload.size} bytes)")
+                result = analyze_cached(upload, key)
         
         response_data = {
             "success": True,
+            "cached": cached,
             "data": result
         }
         print(f"Sending response: success={response_data['success']}, data keys={list(result.keys())}")
@@ -155,9 +349,219 @@ def analyze_audio():
         response.headers.add('Access-Control-Allow-Methods', 'POST, OPTIONS')
         return response, 500
 
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_audio_batch():
+    """Analyze several uploaded files with batched model inference"""
+    files = request.files.getlist('audio')
+    if not files:
+        return jsonify({"error": "No audio files provided"}), 400
+    if len(files) > MAX_BATCH_FILES:
+        return jsonify({"error": f"Too many files. Maximum is {MAX_BATCH_FILES} per batch"}), 400
+    
+    results = [None] * len(files)
+    uploads = []  # (index, cache key, spooled upload) of cache misses
+    try:
+        # Reading the request body has to happen here, on the request thread
+        for i, file in enumerate(files):
+            entry = {"filename": file.filename}
+            results[i] = entry
+            if file.filename == '' or not allowed_file(file.filename):
+                entry.update(success=False, error=f"File type not allowed. Allowed: {', '.join(ALLOWED_EXTENSIONS)}")
+                continue
+            upload = UploadSpool(file.stream, suffix=file_suffix(file.filename))
+            key = cache_key(upload.sha256, analyzer.cache_signature())
+            cached = result_cache.get(key)
+            if cached is not None:
+                upload.close()
+                entry.update(success=True, cached=True, data=cached)
+                continue
+            uploads.append((i, key, upload))
+        
+        # Decoding is the slow part: all files at once on the analyzer's pool
+        def decode(upload):
+            try:
+                return decode_upload(upload)
+            except Exception as e:
+                return e
+        decoded = list(analyzer.thread_pool.map(decode, [upload for _, _, upload in uploads]))
+        
+        # Long recordings go through chunked mode, one at a time, like on /analyze
+        for (i, key, upload), outcome in zip(uploads, decoded):
+            if not isinstance(outcome, Exception) and outcome[0] is None:
+                try:
+                    output = analyze_long_upload(upload, outcome[1])
+                    result_cache.put(key, output)
+                    results[i].update(success=True, cached=False, data=output)
+                except Exception as e:
+                    results[i].update(success=False, error=str(e))
+    finally:
+        for _, _, upload in uploads:
+            upload.close()
+    
+    pending = []  # (index, cache key, decoded audio) of cache misses
+    for (i, key, _), outcome in zip(uploads, decoded):
+        if isinstance(outcome, Exception):
+            results[i].update(success=False, error=str(outcome))
+        elif outcome[0] is not None:
+            pending.append((i, key, outcome[0]))
+    
+    if pending:
+        print(f"Analyzing batch of {len(pending)} files")
+        outputs = analyzer.analyze_batch([ctx for _, _, ctx in pending])
+        for (i, key, _), output in zip(pending, outputs):
+            if isinstance(output, Exception):
+                results[i].update(success=False, error=str(output))
+            else:
+                result_cache.put(key, output)
+                results[i].update(success=True, cached=False, data=output)
+    
+    return jsonify({"success": True, "results": results})
+
+@app.route('/analyze/jobs', methods=['POST'])
+def submit_analysis_job():
+    """Queue an uploaded audio file for analysis and return its job id"""
+    if 'audio' not in request.files:
+        return jsonify({"error": "No audio file provided"}), 400
+    
+    file = request.files['audio']
+    
+    if file.filename == '':
+        return jsonify({"error": "No file selected"}), 400
+    
+    if not allowed_file(file.filename):
+        return jsonify({"error": f"File type not allowed. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"}), 400
+    
+    upload = UploadSpool(file.stream, suffix=file_suffix(file.filename))
+    key = cache_key(upload.sha256, analyzer.cache_signature())
+    result = result_cache.get(key)
+    if result is not None:
+        upload.close()
+        job_id = jobs.complete(result)
+        print(f"Cache hit for file: {file.filename} (job {job_id})")
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "status": "done",
+            "cached": True,
+            "status_url": f"/analyze/jobs/{job_id}"
+        }), 200
+    
+    # The job owns the spool from here on and releases it when it finishes
+    try:
+        job_id = jobs.submit(analyze_cached, upload, key, cleanup=upload.close)
+    except QueueFullError as e:
+        upload.close()
+        response = jsonify({"success": False, "error": str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+    
+    print(f"Queued job {job_id} for file: {file.filename}")
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/analyze/jobs/{job_id}"
+    }), 202
+
+@app.route('/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Job status, plus the analysis result once it is done"""
+    job = jobs.store.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown or expired job id"}), 404
+    
+    response_data = {
+        "success": job['status'] != 'failed',
+        "job_id": job_id,
+        "status": job['status'],
+        "queue_depth": jobs.depth()
+    }
+    if job['status'] == 'done':
+        response_data['data'] = job['result']
+    elif job['status'] == 'failed':
+        response_data['error'] = job['error']
+    return jsonify(response_data)
+
+@app.route('/stream/sessions', methods=['POST'])
+def start_stream():
+    """Start a live analysis session for PCM frames sent while recording"""
+    options = request.get_json(silent=True) or {}
+    try:
+        session = streams.create(options.get('sample_rate', 16000), options.get('format', 'f32le'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    if session is None:
+        return jsonify({"success": False, "error": "Too many live sessions, try again later"}), 429
+    
+    print(f"Started stream {session.id} at {session.input_sr} Hz ({session.sample_format})")
+    return jsonify({
+        "success": True,
+        "session_id": session.id,
+        "window": session.window
+    }), 201
+
+@app.route('/stream/sessions/<session_id>/frames', methods=['POST'])
+def stream_frames(session_id):
+    """Append raw PCM (request body) and return any partial results ready so far"""
+    session = streams.get(session_id)
+    if session is None or session.finished:
+        return jsonify({"success": False, "error": "Unknown or finished session"}), 404
+    
+    try:
+        received = streams.feed(session, request.get_data())
+    except StreamTooLongError as e:
+        return jsonify({"success": False, "error": str(e)}), 413
+    response_data = {"success": True, "received": round(received, 2)}
+    response_data.update(session.updates())
+    return jsonify(response_data)
+
+@app.route('/stream/sessions/<session_id>/stop', methods=['POST'])
+def stop_stream(session_id):
+    """Process the final window and return the complete analysis"""
+    session = streams.get(session_id)
+    if session is None or session.finished:
+        return jsonify({"success": False, "error": "Unknown or finished session"}), 404
+    
+    try:
+        data = request.get_data()
+        if data:
+            session.feed(data)
+        result = session.finish()
+        return jsonify({"success": True, "data": result})
+    except StreamTooLongError as e:
+        return jsonify({"success": False, "error": str(e)}), 413
+    except Exception as e:
+        print(f"Stream error: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+    finally:
+        streams.close(session_id)
+
+@app.route('/admin/cache', methods=['GET'])
+def cache_stats():
+    """Result cache hit/miss counters"""
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(result_cache.stats())
+
+@app.route('/admin/batching', methods=['GET'])
+def batching_stats():
+    """Micro-batching counters and batch-size histograms of the models"""
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(analyzer.batching_stats())
+
+@app.route('/admin/cache', methods=['DELETE'])
+@app.route('/admin/cache/<prefix>', methods=['DELETE'])
+def invalidate_cache(prefix=None):
+    """Drop cached results: all of them, or those for one content hash / key"""
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    removed = result_cache.invalidate(prefix)
+    return jsonify({"success": True, "removed": removed})
+
 @app.errorhandler(413)
 def request_entity_too_large(error):
-    return jsonify({"error": "File too large. Maximum size is 10MB"}), 413
+    return jsonify({"error": f"File too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB"}), 413
 
 if __name__ == '__main__':
     print("\n" + "="*50)
@@ -166,7 +570,15 @@ if __name__ == '__main__':
     print("Server running on: http://localhost:5000")
     print("Endpoints:")
     print("  - GET  /health  - Health check")
+    print("  - GET  /health/live, /health/ready - Liveness / readiness probes")
+    print("  - GET  /metrics - Prometheus metrics")
     print("  - POST /analyze - Analyze audio")
+    print("  - POST /analyze/batch - Analyze several files")
+    print("  - POST /analyze/jobs - Queue analysis job")
+    print("  - GET  /analyze/jobs/<id> - Job status/result")
+    print("  - POST /stream/sessions - Live analysis while recording")
+    print("  - GET  /admin/cache - Result cache stats")
+    print("  - GET  /admin/batching - Model batching stats")
     print("="*50 + "\n")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,288 @@
+"""
+Audio Context Module
+Decodes an upload once and shares the samples across every analysis stage
+"""
+
+import io
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import parselmouth
+import librosa
+import soundfile as sf
+import soxr
+import numpy as np
+from praat_features import PraatFeatures
+from spectral_features import SpectralFeatures
+from memo import KeyedMemo
+from vad import detect_speech, frame_features
+from pcm_spool import SPOOL_DIR, map_pcm, resample_pcm
+
+
+# Every stage reads from a buffer at this rate; librosa's default keeps the
+# spectral features identical to what the stages computed before
+CANONICAL_SR = 22050
+
+# Below this much detected speech the stages keep the whole recording
+MIN_SPEECH_SECONDS = 0.5
+
+# Seconds per block when a file is decoded as a stream (see decode_chunks)
+DECODE_CHUNK_SECONDS = 60.0
+
+
+class AudioContext:
+    """In-memory mono audio with lazily created, memoized variants
+
+    A `mapped` context reads its samples from a memory-mapped PCM spool
+    (see pcm_spool.py) and spools its resampled and speech-only variants
+    the same way.
+    """
+
+    def __init__(self, samples, sr, source=None, mapped=False):
+        self.samples = np.ascontiguousarray(samples, dtype=np.float32)
+        self.sr = int(sr)
+        self.source = source
+        self.mapped = mapped
+        self.decode_seconds = None  # time from_file/from_bytes spent decoding
+        self._memo = KeyedMemo()
+        self._memo.set(('rate', self.sr), self.samples)
+
+    def __getstate__(self):
+        # Only the raw samples travel to worker processes; derived objects
+        # are rebuilt on demand on the other side
+        return {'samples': self.samples, 'sr': self.sr, 'source': self.source}
+
+    def __setstate__(self, state):
+        self.__init__(state['samples'], state['sr'], state['source'])
+
+    @classmethod
+    def from_file(cls, audio_file, sr=CANONICAL_SR, mapped=False):
+        """Decode an audio file (any format ffmpeg/soundfile can read) once
+
+        With `mapped`, the file is decoded chunk by chunk into a
+        memory-mapped PCM spool, so no full-length copy is held in RAM.
+        """
+        started = time.perf_counter()
+        if mapped:
+            y = map_pcm(decode_chunks(audio_file, sr))
+        else:
+            y, sr = librosa.load(audio_file, sr=sr, mono=True)
+        if len(y) == 0:
+            raise ValueError("Audio file is empty or unreadable")
+        ctx = cls(y, sr, source=audio_file, mapped=mapped)
+        ctx.decode_seconds = time.perf_counter() - started
+        return ctx
+
+    @classmethod
+    def from_bytes(cls, data, sr=CANONICAL_SR, source=None):
+        """Decode an in-memory upload without touching the disk
+
+        soundfile handles WAV/FLAC/OGG directly; everything else is piped
+        through ffmpeg (stdin -> raw float32 on stdout).
+        """
+        started = time.perf_counter()
+        try:
+            y, file_sr = sf.read(io.BytesIO(data), dtype='float32', always_2d=True)
+            y = y.mean(axis=1)
+            if file_sr != sr:
+                y = librosa.resample(y, orig_sr=file_sr, target_sr=sr)
+        except Exception:
+            y = _ffmpeg_decode(data, sr)
+        if len(y) == 0:
+            raise ValueError("Audio file is empty or unreadable")
+        ctx = cls(y, sr, source=source)
+        ctx.decode_seconds = time.perf_counter() - started
+        return ctx
+
+    @property
+    def duration(self):
+        """Duration in seconds"""
+        return len(self.samples) / self.sr if self.sr else 0
+
+    def at_rate(self, sr):
+        """Samples resampled to `sr`, computed on first use"""
+        sr = int(sr)
+        if self.mapped:
+            return self._memo.get(('rate', sr), lambda: resample_pcm(self.samples, self.sr, sr))
+        return self._memo.get(('rate', sr), lambda: librosa.resample(
+            self.samples, orig_sr=self.sr, target_sr=sr
+        ).astype(np.float32, copy=False))
+
+    def slice(self, start, end, sr=None):
+        """View of the samples between `start` and `end` seconds (no copy)"""
+        sr = sr or self.sr
+        y = self.at_rate(sr)
+        return y[int(start * sr):int(end * sr)]
+
+    def model_input(self, sr, start=None, end=None):
+        """Pipeline input dict so transformers skips its own ffmpeg decode"""
+        if start is None and end is None:
+            y = self.at_rate(sr)
+        else:
+            y = self.slice(start or 0, end if end is not None else self.duration, sr)
+        return {"raw": y, "sampling_rate": int(sr)}
+
+    def frame_features(self):
+        """Per-frame level (dBFS) and zero-crossing rate every vad.HOP seconds"""
+        return self._memo.get('frame_features', lambda: frame_features(self.samples, self.sr))
+
+    def speech_segments(self):
+        """(start, end) seconds of detected speech (see vad.py)"""
+        return self._memo.get('speech_segments', lambda: detect_speech(
+            self.samples, self.sr, features=self.frame_features()))
+
+    @property
+    def speech_ratio(self):
+        """Fraction of the recording that is speech"""
+        total = sum(end - start for start, end in self.speech_segments())
+        return total / self.duration if self.duration else 0.0
+
+    def speech(self):
+        """AudioContext holding only the speech regions, joined end to end
+
+        Returns this context itself when there is (almost) no silence to
+        drop, or too little speech to analyse on its own.
+        """
+        def build():
+            segments = self.speech_segments()
+            total = sum(end - start for start, end in segments)
+            if total < MIN_SPEECH_SECONDS or total >= 0.98 * self.duration:
+                return self
+            if self.mapped:
+                return AudioContext(map_pcm(self.slice(start, end) for start, end in segments),
+                                    self.sr, source=self.source, mapped=True)
+            return AudioContext(np.concatenate([self.slice(start, end) for start, end in segments]),
+                                self.sr, source=self.source)
+        return self._memo.get('speech', build)
+
+    @property
+    def sound(self):
+        """parselmouth.Sound built from the shared buffer"""
+        return self._memo.get('sound', lambda: parselmouth.Sound(
+            self.samples.astype(np.float64), sampling_frequency=self.sr
+        ))
+
+    @property
+    def praat(self):
+        """Shared Praat feature cache for this audio"""
+        return self._memo.get('praat', lambda: PraatFeatures(self.sound))
+
+    @property
+    def spectral(self):
+        """Shared STFT/mel feature bank for this audio"""
+        return self._memo.get('spectral', lambda: SpectralFeatures(self.samples, self.sr))
+
+
+def _ffmpeg_decode(data, sr):
+    """Decode any ffmpeg-readable bytes to mono float32 at `sr` via pipes
+
+    Containers that need seeking (an MP4/M4A whose moov atom sits at the
+    end) cannot be demuxed from a pipe; those are retried from a private
+    temp file that is always removed.
+    """
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0',
+               '-f', 'f32le', '-ac', '1', '-ar', str(sr), 'pipe:1']
+    try:
+        proc = subprocess.run(command, input=data, capture_output=True)
+        if proc.returncode != 0 or not proc.stdout:
+            handle, path = tempfile.mkstemp(prefix='voice_upload_', dir=SPOOL_DIR)
+            try:
+                with os.fdopen(handle, 'wb') as f:
+                    f.write(data)
+                command[command.index('pipe:0')] = path
+                proc = subprocess.run(command, capture_output=True)
+            finally:
+                os.remove(path)
+    except FileNotFoundError:
+        raise ValueError("FFmpeg not found - run setup_ffmpeg.py to decode this format")
+    if proc.returncode != 0 or not proc.stdout:
+        raise ValueError(f"ffmpeg could not decode audio: {proc.stderr.decode(errors='ignore').strip()}")
+    return np.frombuffer(proc.stdout, dtype=np.float32)
+
+
+def decode_chunks(source, sr=CANONICAL_SR, chunk_seconds=DECODE_CHUNK_SECONDS):
+    """Yield mono float32 chunks of `chunk_seconds` at `sr`, never the whole file
+
+    `source` is a path or the bytes of an in-memory upload (decoded without
+    touching the disk). Sources soundfile can read at the target rate are
+    read block by block; everything else (other rates, MP3/M4A/WebM) is
+    resampled by ffmpeg and read from its stdout pipe.
+    """
+    def opened():
+        return io.BytesIO(source) if isinstance(source, bytes) else source
+    try:
+        info = sf.info(opened())
+    except Exception:
+        info = None
+    if info is not None and info.samplerate == sr:
+        for block in sf.blocks(opened(), blocksize=int(chunk_seconds * sr), dtype='float32', always_2d=True):
+            yield block.mean(axis=1)
+        return
+    try:
+        yield from _ffmpeg_chunks(source, sr, chunk_seconds)
+    except FileNotFoundError:
+        if info is None:
+            raise ValueError("FFmpeg not found - run setup_ffmpeg.py to decode this format")
+        # No ffmpeg: resample the blocks with one continuous stream (no seams)
+        stream = soxr.ResampleStream(info.samplerate, sr, 1, dtype='float32', quality='HQ')
+        for block in sf.blocks(opened(), blocksize=int(chunk_seconds * info.samplerate),
+                               dtype='float32', always_2d=True):
+            yield stream.resample_chunk(block.mean(axis=1))
+        yield stream.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+
+
+def _ffmpeg_chunks(source, sr, chunk_seconds):
+    """Chunks of raw float32 read from an ffmpeg decode pipe
+
+    Bytes are written to ffmpeg's stdin from a helper thread. stderr is
+    drained by another one: nobody else reads it until stdout is done, and
+    a full stderr pipe would stall the decode.
+    """
+    piped = isinstance(source, bytes)
+    proc = subprocess.Popen(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0' if piped else source,
+         '-f', 'f32le', '-ac', '1', '-ar', str(sr), 'pipe:1'],
+        stdin=subprocess.PIPE if piped else subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    errors = []
+    helpers = [threading.Thread(target=lambda: errors.append(proc.stderr.read()), daemon=True)]
+    if piped:
+        helpers.append(threading.Thread(target=_feed, args=(proc.stdin, source), daemon=True))
+    for helper in helpers:
+        helper.start()
+    chunk_bytes = int(chunk_seconds * sr) * 4
+    decoded = 0
+    try:
+        while True:
+            data = proc.stdout.read(chunk_bytes)
+            if not data:
+                break
+            decoded += len(data)
+            yield np.frombuffer(data[:len(data) - len(data) % 4], dtype=np.float32)
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        for helper in helpers:
+            helper.join()
+        proc.stderr.close()
+    if proc.returncode != 0 and not decoded:
+        message = b''.join(errors).decode(errors='ignore').strip()
+        raise ValueError(f"ffmpeg could not decode audio: {message}")
+
+
+def _feed(pipe, data):
+    """Write `data` to a subprocess pipe and close it; a process that quit early is fine"""
+    try:
+        pipe.write(data)
+    except (BrokenPipeError, ValueError, OSError):
+        pass
+    finally:
+        try:
+            pipe.close()
+        except OSError:
+            pass
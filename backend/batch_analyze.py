@@ -0,0 +1,234 @@
+"""
+Batch Voice Analysis
+Re-scores a directory or manifest of recordings offline and writes one
+result per file as JSONL (or a Parquet table). Progress is resumable: files
+already analysed successfully in the output are skipped on the next run.
+
+Usage:
+    python batch_analyze.py recordings/ -o results.jsonl
+    python batch_analyze.py manifest.txt -o results.parquet --chunk 16 --workers 8
+
+Manifests may be .txt (one path per line), .csv (a `path` column or the
+first column) or .jsonl (objects with a `path` key); relative paths are
+resolved against the manifest's folder. Files longer than --long-seconds go
+through chunked mode (long_audio.py) one at a time, as on /analyze/batch.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from start_server import find_ffmpeg
+
+AUDIO_EXTENSIONS = {'wav', 'mp3', 'ogg', 'm4a', 'flac', 'webm'}
+LONG_AUDIO_SECONDS = float(os.environ.get('LONG_AUDIO_SECONDS', 600))
+LONG_AUDIO_CHUNK = float(os.environ.get('LONG_AUDIO_CHUNK', 60))
+
+
+def list_inputs(source):
+    """Audio file paths from a directory (recursive) or a manifest file"""
+    if os.path.isdir(source):
+        files = []
+        for root, dirs, names in os.walk(source):
+            dirs.sort()
+            for name in sorted(names):
+                if name.rsplit('.', 1)[-1].lower() in AUDIO_EXTENSIONS:
+                    files.append(os.path.join(root, name))
+        return files
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, newline='') as f:
+        if source.endswith('.jsonl'):
+            paths = [json.loads(line)['path'] for line in f if line.strip()]
+        elif source.endswith('.csv'):
+            rows = list(csv.reader(f))
+            header = [h.strip().lower() for h in rows[0]] if rows else []
+            column = header.index('path') if 'path' in header else 0
+            rows = rows[1:] if 'path' in header else rows
+            paths = [row[column] for row in rows if row]
+        else:
+            paths = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [p if os.path.isabs(p) else os.path.join(base, p) for p in paths]
+
+
+def progress_path(output):
+    """JSONL file that records progress (the output itself unless Parquet)"""
+    return output if output.endswith('.jsonl') else output + '.partial.jsonl'
+
+
+def load_done(path):
+    """Files already analysed successfully in a previous run"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # partially written last line of an interrupted run
+            if record.get('success'):
+                done.add(record['file'])
+    return done
+
+
+def route_input(path, long_seconds, chunk_seconds):
+    """(input for analyze_batch, None), or (None, chunks) when `path` needs chunked mode
+
+    Mirrors app.decode_upload: the header's duration decides without
+    decoding; files without one are decoded as a stream and stop at
+    `long_seconds` (see long_audio.load_or_chunk). `chunks` is None when
+    analyze_long should decode the file itself.
+    """
+    from long_audio import load_or_chunk, probe_duration
+    duration = probe_duration(path)
+    if duration is None:
+        return load_or_chunk(path, long_seconds, chunk_seconds)
+    if duration > long_seconds:
+        return None, None
+    return path, None
+
+
+def analyze_files(analyzer, paths, workers, long_seconds=LONG_AUDIO_SECONDS, chunk_seconds=LONG_AUDIO_CHUNK):
+    """One result (or exception) per path, in order
+
+    Short files share analyze_batch's batched inference; long ones are
+    analyzed in chunks, one at a time, so a chunk of files never holds
+    more than one long recording's worth of samples in memory.
+    """
+    from long_audio import analyze_long
+
+    def route(path):
+        try:
+            return route_input(path, long_seconds, chunk_seconds)
+        except Exception as e:
+            return e
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='route') as pool:
+        routes = list(pool.map(route, paths))
+
+    results = [route if isinstance(route, Exception) else None for route in routes]
+    short = [i for i, route in enumerate(routes) if results[i] is None and route[0] is not None]
+    if short:
+        for i, result in zip(short, analyzer.analyze_batch([routes[i][0] for i in short], workers=workers)):
+            results[i] = result
+    for i, route in enumerate(routes):
+        if results[i] is None:
+            try:
+                results[i] = analyze_long(analyzer, paths[i], chunk_seconds=chunk_seconds, chunks=route[1])
+            except Exception as e:
+                results[i] = e
+    return results
+
+
+def write_parquet(jsonl_path, output):
+    """Convert the JSONL progress file into a Parquet table"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("✗ pyarrow is not installed - results kept as JSONL only")
+        print(f"  File: {jsonl_path}")
+        return False
+
+    records = {}
+    with open(jsonl_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[record['file']] = record  # last attempt wins
+    table = pa.table({
+        'file': [r['file'] for r in records.values()],
+        'success': [r['success'] for r in records.values()],
+        'error': [r.get('error') for r in records.values()],
+        'result': [json.dumps(r['data']) if r.get('data') is not None else None
+                   for r in records.values()]
+    })
+    pq.write_table(table, output)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze a directory or manifest of recordings")
+    parser.add_argument('source', help="Directory of audio files or manifest (.txt/.csv/.jsonl)")
+    parser.add_argument('-o', '--output', default='results.jsonl', help="Output .jsonl or .parquet")
+    parser.add_argument('--chunk', type=int, default=16,
+                        help="Files whose timeline segments share one batched inference pass")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                        help="Threads for decoding and the acoustic stages")
+    parser.add_argument('--batch-size', type=int, default=16, help="Emotion model batch size")
+    parser.add_argument('--model-server', default=os.environ.get('MODEL_SERVER'),
+                        help="Address of a running model_server.py instead of loading the models")
+    parser.add_argument('--backend', default=os.environ.get('INFERENCE_BACKEND', 'torch'),
+                        choices=('torch', 'onnx', 'onnx-int8'), help="Inference backend for local models")
+    parser.add_argument('--long-seconds', type=float, default=LONG_AUDIO_SECONDS,
+                        help="Files longer than this are analyzed in chunks with bounded memory")
+    parser.add_argument('--long-chunk', type=float, default=LONG_AUDIO_CHUNK,
+                        help="Seconds decoded at a time in chunked mode")
+    parser.add_argument('--no-resume', action='store_true', help="Re-analyse files already in the output")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Batch Voice Analysis")
+    print("=" * 60)
+
+    if not find_ffmpeg():
+        print("⚠ WARNING: FFmpeg not found - only WAV/FLAC/OGG files can be decoded")
+
+    files = list_inputs(args.source)
+    progress = progress_path(args.output)
+    if args.no_resume and os.path.exists(progress):
+        os.remove(progress)
+    done = load_done(progress)
+    todo = [f for f in files if f not in done]
+    print(f"Found {len(files)} files, {len(done & set(files))} already done, {len(todo)} to analyse")
+    if not todo:
+        if not args.output.endswith('.jsonl'):
+            write_parquet(progress, args.output)
+        return 0
+
+    from voice_analyzer import VoiceAnalyzer
+    analyzer = VoiceAnalyzer(batch_size=args.batch_size, max_workers=args.workers,
+                             model_server=args.model_server, backend=args.backend)
+
+    started = time.time()
+    analysed = failed = 0
+    with open(progress, 'a') as out:
+        for offset in range(0, len(todo), args.chunk):
+            chunk = todo[offset:offset + args.chunk]
+            results = analyze_files(analyzer, chunk, args.workers, args.long_seconds, args.long_chunk)
+            for path, result in zip(chunk, results):
+                if isinstance(result, Exception):
+                    record = {'file': path, 'success': False, 'error': str(result)}
+                    failed += 1
+                else:
+                    record = {'file': path, 'success': True, 'data': result}
+                    analysed += 1
+                out.write(json.dumps(record, default=float) + '\n')
+            out.flush()
+
+            elapsed = time.time() - started
+            rate = (analysed + failed) / elapsed if elapsed else 0
+            print(f"  {offset + len(chunk)}/{len(todo)} files - {rate:.2f} files/s")
+
+    elapsed = time.time() - started
+    rate = (analysed + failed) / elapsed if elapsed else 0
+    cores = os.cpu_count() or 1
+    print("=" * 60)
+    print(f"✓ {analysed} analysed, {failed} failed in {elapsed:.1f}s")
+    print(f"  Throughput: {rate:.2f} files/s ({rate / cores:.3f} files/s per core, {cores} cores)")
+
+    if not args.output.endswith('.jsonl') and write_parquet(progress, args.output):
+        print(f"✓ Results written to {args.output}")
+    else:
+        print(f"✓ Results written to {progress}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""
+Benchmark Suite
+Measures the analysis pipeline on synthetic speech-like clips (1 s, 10 s,
+60 s and 5 min by default): per-stage and end-to-end latency, peak RSS and
+throughput of VoiceAnalyzer.analyze and of POST /analyze under concurrency.
+Peak RSS per clip length is measured in a fresh process for each clip, since
+a process's peak only ever grows. Results are written as JSON so runs on
+different commits can be compared.
+
+Usage:
+    python benchmark.py -o bench.json
+    python benchmark.py --durations 1 10 --repeat 5 --concurrency 4 -o bench.json
+    python benchmark.py --url http://localhost:5000 -o bench.json   # running server
+    python benchmark.py --compare before.json after.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+DEFAULT_DURATIONS = (1, 10, 60, 300)
+SAMPLE_RATE = 22050
+
+
+def synthetic_clip(seconds, sr=SAMPLE_RATE, seed=0):
+    """Speech-like test signal: voiced syllables at ~4/s with pauses and noise
+
+    Each syllable is a harmonic tone (gliding F0 around 110-240 Hz) under a
+    Hann envelope; every ~2 s there is a short pause. Deterministic per seed.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    y = rng.normal(0, 0.003, n)
+    t = 0.0
+    while t < seconds:
+        if rng.random() < 0.12:
+            t += rng.uniform(0.3, 0.6)          # pause between phrases
+            continue
+        length = rng.uniform(0.12, 0.25)
+        start, end = int(t * sr), min(int((t + length) * sr), n)
+        if end - start > 16:
+            time_axis = np.arange(end - start) / sr
+            f0 = rng.uniform(110, 240) * (1 + 0.1 * time_axis / length)
+            phase = 2 * np.pi * np.cumsum(f0) / sr
+            voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+            y[start:end] += 0.2 * voiced * np.hanning(end - start)
+        t += length + rng.uniform(0.02, 0.1)
+    return y.astype(np.float32)
+
+
+def wav_bytes(y, sr=SAMPLE_RATE):
+    buffer = io.BytesIO()
+    sf.write(buffer, y, sr, format='WAV', subtype='PCM_16')
+    return buffer.getvalue()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (MB), or None
+
+    This is a high-water mark over the process lifetime, so it only says
+    something about one clip in a process that analyzed nothing bigger
+    before (see clip_rss).
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except ImportError:
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().peak_wset / 2 ** 20, 1)
+        except Exception:
+            return None
+
+
+def summarize(values):
+    """Latency summary in seconds"""
+    values = sorted(values)
+    return {
+        'runs': len(values),
+        'mean': round(statistics.mean(values), 4),
+        'median': round(statistics.median(values), 4),
+        'p95': round(values[min(len(values) - 1, int(0.95 * len(values)))], 4),
+        'min': round(values[0], 4),
+        'max': round(values[-1], 4)
+    }
+
+
+def unique_wav(y, i):
+    """WAV bytes that differ per request, so the result cache never answers"""
+    y = y.copy()
+    y[0] += (i + 1) * 1e-4
+    return wav_bytes(y)
+
+
+def clip_rss(seconds, seed):
+    """Peak RSS (MB) of a fresh process that loads the models and analyzes one clip
+
+    Returns {'peak_rss_mb', 'baseline_rss_mb'}; the baseline is the peak
+    after warm-up, so the difference is what the analysis itself added.
+    """
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure-rss', str(seconds),
+                           '--seed', str(seed)], capture_output=True, text=True)
+    try:
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        print(f"  ✗ RSS measurement for the {seconds}s clip failed: {proc.stderr.strip()[-300:]}")
+        return {'peak_rss_mb': None, 'baseline_rss_mb': None}
+
+
+def measure_rss(seconds, seed):
+    """Body of `--measure-rss`: prints this process's peak RSS around one analysis as JSON"""
+    import contextlib
+    from audio_context import AudioContext
+    from voice_analyzer import VoiceAnalyzer
+    with contextlib.redirect_stdout(sys.stderr):
+        analyzer = VoiceAnalyzer()
+        analyzer.warm_up()
+        analyzer.analyze(AudioContext(synthetic_clip(2, seed=98), SAMPLE_RATE))
+        baseline = peak_rss_mb()
+        analyzer.analyze(AudioContext.from_bytes(wav_bytes(synthetic_clip(seconds, seed=seed))))
+    print(json.dumps({'peak_rss_mb': peak_rss_mb(), 'baseline_rss_mb': baseline}))
+
+
+def bench_analyzer(analyzer, clips, repeat, rss=True):
+    """Sequential VoiceAnalyzer.analyze latency per clip length, by stage
+
+    With `rss`, each clip's peak RSS comes from its own process (clip_rss).
+    """
+    from audio_context import AudioContext
+    report = {}
+    for seed, (seconds, y) in enumerate(clips.items()):
+        data = wav_bytes(y)
+        totals, stages = [], {}
+        for _ in range(repeat):
+            started = time.perf_counter()
+            ctx = AudioContext.from_bytes(data, source=f'bench-{seconds}s')
+            result = analyzer.analyze(ctx)
+            totals.append(time.perf_counter() - started)
+            for stage, value in result['raw'].get('timings', {}).items():
+                stages.setdefault(stage, []).append(value)
+        memory = clip_rss(seconds, seed) if rss else {}
+        report[f'{seconds}s'] = {
+            'end_to_end': summarize(totals),
+            'stages': {stage: summarize(values) for stage, values in stages.items()},
+            'realtime_factor': round(statistics.median(totals) / seconds, 4),
+            **memory
+        }
+        print(f"  ✓ {seconds:>4}s clip: median {report[f'{seconds}s']['end_to_end']['median']:.3f}s "
+              f"(RTF {report[f'{seconds}s']['realtime_factor']:.3f})"
+              + (f", peak RSS {memory['peak_rss_mb']} MB" if rss else ""))
+    return report
+
+
+def run_concurrent(call, requests, concurrency):
+    """Run `call(i)` for i in range(requests) on `concurrency` threads"""
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            call(i)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+        except Exception as e:
+            print(f"  ✗ request {i} failed: {e}")
+            with lock:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': errors,
+        'wall_seconds': round(elapsed, 3),
+        'throughput_per_s': round(len(latencies) / elapsed, 3) if elapsed else 0,
+        'latency': summarize(latencies) if latencies else None
+    }
+
+
+def bench_throughput(analyzer, y, requests, concurrency):
+    """VoiceAnalyzer.analyze throughput with concurrent callers"""
+    from audio_context import AudioContext
+    return run_concurrent(lambda i: analyzer.analyze(AudioContext.from_bytes(unique_wav(y, i))),
+                          requests, concurrency)
+
+
+def bench_endpoint(y, requests, concurrency, url=None, analyzer=None):
+    """POST /analyze under concurrency: a running server at `url`, or in-process
+
+    In-process, the Flask app is served by the benchmark's own `analyzer`
+    (already warm), instead of loading and warming a second copy of the models.
+    """
+    if url:
+        import urllib.request
+
+        def call(i):
+            boundary = f'bench{i}'
+            body = (f'--{boundary}\r\nContent-Disposition: form-data; name="audio"; filename="bench.wav"\r\n'
+                    f'Content-Type: audio/wav\r\n\r\n').encode() + unique_wav(y, i) + f'\r\n--{boundary}--\r\n'.encode()
+            req = urllib.request.Request(url.rstrip('/') + '/analyze', data=body, headers={
+                'Content-Type': f'multipart/form-data; boundary={boundary}'})
+            with urllib.request.urlopen(req, timeout=600) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+    else:
+        os.environ['MODEL_WARMUP'] = '0'
+        import app as server
+        server.analyzer = server.streams.analyzer = analyzer
+        client = server.app.test_client()
+
+        def call(i):
+            response = client.post('/analyze', data={'audio': (io.BytesIO(unique_wav(y, i)), 'bench.wav')})
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.get_json()}")
+
+    return run_concurrent(call, requests, concurrency)
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'commit': commit or None,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare(before_path, after_path):
+    """Print median latency changes between two result files"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before['environment'].get('commit')} -> {after['environment'].get('commit')}")
+    for clip, new in after.get('analyzer', {}).items():
+        old = before.get('analyzer', {}).get(clip)
+        if not old:
+            continue
+        print(f"\n{clip} clip")
+        rows = [('end_to_end', old['end_to_end'], new['end_to_end'])]
+        rows += [(stage, old['stages'][stage], summary)
+                 for stage, summary in new['stages'].items() if stage in old['stages']]
+        for name, a, b in rows:
+            change = (b['median'] - a['median']) / a['median'] * 100 if a['median'] else 0
+            print(f"  {name:<12} {a['median']:>9.4f}s -> {b['median']:>9.4f}s  ({change:+.1f}%)")
+    for section in ('throughput', 'endpoint'):
+        a, b = before.get(section), after.get(section)
+        if a and b:
+            print(f"\n{section}: {a['throughput_per_s']} -> {b['throughput_per_s']} req/s "
+                  f"at concurrency {b['concurrency']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the voice analysis pipeline")
+    parser.add_argument('-o', '--output', default='bench.json', help="JSON results file")
+    parser.add_argument('--durations', type=float, nargs='+', default=DEFAULT_DURATIONS,
+                        help="Clip lengths in seconds")
+    parser.add_argument('--repeat', type=int, default=3, help="Sequential runs per clip length")
+    parser.add_argument('--concurrency', type=int, default=4, help="Concurrent callers for throughput")
+    parser.add_argument('--requests', type=int, default=16, help="Requests per throughput run")
+    parser.add_argument('--throughput-clip', type=float, default=10, help="Clip length for throughput runs")
+    parser.add_argument('--url', help="Benchmark a running server instead of the in-process app")
+    parser.add_argument('--skip-endpoint', action='store_true', help="Skip the /analyze runs")
+    parser.add_argument('--skip-rss', action='store_true', help="Skip the per-clip peak RSS processes")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help="Compare two result files")
+    parser.add_argument('--measure-rss', type=float, help=argparse.SUPPRESS)   # used by clip_rss
+    parser.add_argument('--seed', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    if args.measure_rss:
+        measure_rss(args.measure_rss, args.seed)
+        return 0
+
+    print("=" * 60)
+    print("Voice Analysis Benchmark")
+    print("=" * 60)
+    durations = [int(d) if float(d).is_integer() else d for d in args.durations]
+    clips = {seconds: synthetic_clip(seconds, seed=i) for i, seconds in enumerate(durations)}
+    throughput_clip = synthetic_clip(args.throughput_clip, seed=99)
+    results = {'environment': environment(), 'config': vars(args)}
+
+    from voice_analyzer import VoiceAnalyzer
+    started = time.perf_counter()
+    analyzer = VoiceAnalyzer()
+    analyzer.warm_up()
+    results['startup'] = {'seconds': round(time.perf_counter() - started, 3), **analyzer.load_times}
+
+    # One untimed analysis so lazy imports and first-call JIT costs stay out of the numbers
+    from audio_context import AudioContext
+    started = time.perf_counter()
+    analyzer.analyze(AudioContext(synthetic_clip(2, seed=98), SAMPLE_RATE))
+    results['startup']['first_analysis'] = round(time.perf_counter() - started, 3)
+    results['environment']['backend'] = analyzer.backend
+
+    print("\nLatency per clip length (VoiceAnalyzer.analyze)")
+    results['analyzer'] = bench_analyzer(analyzer, clips, args.repeat, rss=not args.skip_rss)
+
+    print(f"\nThroughput: {args.requests} x {args.throughput_clip}s clips, concurrency {args.concurrency}")
+    results['throughput'] = bench_throughput(analyzer, throughput_clip, args.requests, args.concurrency)
+    print(f"  ✓ {results['throughput']['throughput_per_s']} analyses/s")
+
+    if not args.skip_endpoint:
+        print(f"\nPOST /analyze ({args.url or 'in-process app'}), concurrency {args.concurrency}")
+        results['endpoint'] = bench_endpoint(throughput_clip, args.requests, args.concurrency, args.url, analyzer)
+        print(f"  ✓ {results['endpoint']['throughput_per_s']} requests/s")
+
+    results['process_peak_rss_mb'] = peak_rss_mb()   # whole benchmark run, all clips
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print("=" * 60)
+    print(f"✓ Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Inference Backend Module
+Builds the audio-classification pipelines on PyTorch (default) or ONNX
+Runtime, optionally with dynamic int8 quantization. ONNX exports are cached
+on disk, so only the first start with a new backend pays for the export.
+
+Parity check against the PyTorch outputs:
+    python inference_backend.py --backend onnx-int8 sample1.wav sample2.wav
+"""
+
+import argparse
+import os
+import platform
+import sys
+
+import numpy as np
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+ONNX_CACHE_DIR = os.environ.get('ONNX_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'onnx_models'))
+QUANTIZED_FILE = 'model_quantized.onnx'
+
+
+def default_replicas():
+    """Model replicas per pipeline: one per four cores"""
+    return max(1, (os.cpu_count() or 1) // 4)
+
+
+def default_threads(replicas=1):
+    """Intra-op threads per forward pass, so `replicas` concurrent passes fill the cores"""
+    return max(1, (os.cpu_count() or 1) // replicas)
+
+
+def load_pipeline(model_id, backend='torch', cache_dir=ONNX_CACHE_DIR, threads=None, revision=None):
+    """audio-classification pipeline for `model_id` on the given backend
+
+    `threads` caps the intra-op threads of each forward pass (torch's
+    process-wide setting, or the ONNX Runtime session's). `revision` is the
+    hub revision (branch, tag or commit hash) to load; ONNX exports are
+    cached per revision.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' (choose from {', '.join(BACKENDS)})")
+    from transformers import pipeline
+    if backend == 'torch':
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return pipeline("audio-classification", model=model_id, revision=revision)
+
+    try:
+        from optimum.onnxruntime import ORTModelForAudioClassification
+    except ImportError:
+        raise RuntimeError("The ONNX backends need optimum with ONNX Runtime: "
+                           "pip install 'optimum[onnxruntime]'")
+
+    model_dir = _export(model_id, cache_dir, revision)
+    file_name = 'model.onnx'
+    if backend == 'onnx-int8':
+        model_dir = _quantize(model_dir)
+        file_name = QUANTIZED_FILE
+    from transformers import AutoFeatureExtractor
+    session_options = None
+    if threads:
+        import onnxruntime
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = threads
+    model = ORTModelForAudioClassification.from_pretrained(model_dir, file_name=file_name,
+                                                           session_options=session_options)
+    feature_extractor = AutoFeatureExtractor.from_pretrained(model_id, revision=revision)
+    return pipeline("audio-classification", model=model, feature_extractor=feature_extractor)
+
+
+def replicate(pipe, copies):
+    """`copies` pipelines over the same weights, each with its own call state
+
+    transformers pipelines keep per-call parameters on the instance, so
+    concurrent callers need separate pipeline objects; the model (PyTorch
+    module in eval mode or ONNX Runtime session) is shared and safe to run
+    from several threads, so replicas cost no extra weight memory.
+    """
+    from transformers import pipeline
+    return [pipe] + [pipeline(getattr(pipe, 'task', 'audio-classification'), model=pipe.model,
+                              feature_extractor=pipe.feature_extractor)
+                     for _ in range(copies - 1)]
+
+
+def _export(model_id, cache_dir, revision=None):
+    """Export `model_id` at `revision` to ONNX once; returns the export folder"""
+    from optimum.onnxruntime import ORTModelForAudioClassification
+    model_dir = os.path.join(cache_dir, model_id.replace('/', '--') + f"--{revision or 'main'}")
+    if not os.path.exists(os.path.join(model_dir, 'model.onnx')):
+        print(f"  → Exporting {model_id} ({revision or 'main'}) to ONNX...")
+        model = ORTModelForAudioClassification.from_pretrained(model_id, export=True, revision=revision)
+        model.save_pretrained(model_dir)
+        print(f"  ✓ Saved to {model_dir}")
+    return model_dir
+
+
+def _quantize(model_dir):
+    """Dynamic int8 quantization of an exported model; returns its folder"""
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    quantized_dir = model_dir + '-int8'
+    if not os.path.exists(os.path.join(quantized_dir, QUANTIZED_FILE)):
+        print(f"  → Quantizing {os.path.basename(model_dir)} to int8...")
+        if platform.machine().lower() in ('arm64', 'aarch64'):
+            config = AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+        else:
+            config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        ORTQuantizer.from_pretrained(model_dir).quantize(save_dir=quantized_dir, quantization_config=config)
+        print(f"  ✓ Saved to {quantized_dir}")
+    return quantized_dir
+
+
+def _score_table(results, labels):
+    """Pipeline outputs (top_k = all labels) as an (inputs, labels) array"""
+    table = np.zeros((len(results), len(labels)))
+    for row, result in enumerate(results):
+        scores = {r['label']: r['score'] for r in result}
+        table[row] = [scores.get(label, 0.0) for label in labels]
+    return table
+
+
+def parity_check(model_id, backend, inputs, batch_size=8, revision=None):
+    """Compare a backend's scores with the PyTorch pipeline on the same inputs
+
+    `inputs` are pipeline inputs ({"raw": ..., "sampling_rate": ...} dicts).
+    Returns the largest absolute score difference and the top-1 agreement.
+    """
+    reference = load_pipeline(model_id, 'torch', revision=revision)
+    candidate = load_pipeline(model_id, backend, revision=revision)
+    labels = list(reference.model.config.id2label.values())
+    expected = _score_table(reference(inputs, batch_size=batch_size, top_k=len(labels)), labels)
+    actual = _score_table(candidate(inputs, batch_size=batch_size, top_k=len(labels)), labels)
+    return {
+        'model': model_id,
+        'backend': backend,
+        'inputs': len(inputs),
+        'max_abs_diff': round(float(np.max(np.abs(expected - actual))), 5),
+        'mean_abs_diff': round(float(np.mean(np.abs(expected - actual))), 5),
+        'top1_agreement': round(float(np.mean(expected.argmax(axis=1) == actual.argmax(axis=1))), 4)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check an ONNX backend against the PyTorch models")
+    parser.add_argument('files', nargs='*', help="Audio files to compare on (default: synthetic clips)")
+    parser.add_argument('--backend', default='onnx-int8', choices=BACKENDS[1:])
+    parser.add_argument('--segment', type=float, default=3.0, help="Seconds per compared segment")
+    parser.add_argument('--min-agreement', type=float, default=0.9,
+                        help="Fail when top-1 agreement is below this")
+    args = parser.parse_args()
+
+    from audio_context import AudioContext
+    from voice_analyzer import EMOTION_MODEL, EMOTION_REVISION, KEYWORD_MODEL, KEYWORD_REVISION
+
+    contexts = [AudioContext.from_file(path) for path in args.files]
+    if not contexts:
+        # Harmonic tones with noise: enough to exercise every layer
+        rng = np.random.default_rng(0)
+        sr = 16000
+        t = np.arange(int(args.segment * sr * 4)) / sr
+        for f0 in (110, 180, 260):
+            y = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6)) * 0.1
+            contexts.append(AudioContext(y + rng.normal(0, 0.01, len(t)), sr))
+
+    failed = False
+    for model_id, revision, segment in ((EMOTION_MODEL, EMOTION_REVISION, args.segment),
+                                        (KEYWORD_MODEL, KEYWORD_REVISION, 1.0)):
+        inputs = [ctx.model_input(16000, start, start + segment)
+                  for ctx in contexts
+                  for start in np.arange(0, max(ctx.duration - segment, 0) + 1e-9, segment)]
+        report = parity_check(model_id, args.backend, inputs, revision=revision)
+        ok = report['top1_agreement'] >= args.min_agreement
+        failed |= not ok
+        print(f"{'✓' if ok else '✗'} {model_id} [{args.backend}]: top-1 agreement "
+              f"{report['top1_agreement']:.1%}, max |Δscore| {report['max_abs_diff']}, "
+              f"mean |Δscore| {report['mean_abs_diff']} over {report['inputs']} segments")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Job Queue Module
+Bounded background queue for analysis jobs with an in-process result store
+"""
+
+import queue
+import threading
+import time
+import uuid
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work (HTTP 429)"""
+
+
+class JobStore:
+    """In-process job records, evicted `ttl` seconds after they finish"""
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._evict()
+            self._jobs[job_id] = {
+                'id': job_id,
+                'status': 'queued',
+                'created': time.time(),
+                'started': None,
+                'finished': None,
+                'result': None,
+                'error': None
+            }
+        return job_id
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            self._evict()
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def delete(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _evict(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished'] and now - job['finished'] > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._jobs)
+
+
+class JobQueue:
+    """Fixed pool of worker threads fed by a bounded queue"""
+
+    def __init__(self, workers=2, max_queued=16, ttl=600):
+        self.store = JobStore(ttl=ttl)
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._workers = []
+        for i in range(workers):
+            worker = threading.Thread(target=self._work, name=f'analysis-job-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, func, *args, cleanup=None):
+        """Queue `func(*args)`; returns the job id or raises QueueFullError
+
+        `cleanup()` (if given) runs after the job, whether it succeeded or not.
+        """
+        job_id = self.store.create()
+        try:
+            self._queue.put_nowait((job_id, func, args, cleanup))
+        except queue.Full:
+            self.store.delete(job_id)
+            raise QueueFullError("Analysis queue is full, try again later")
+        return job_id
+
+    def complete(self, result):
+        """Record an already finished job (e.g. a cache hit); returns its id"""
+        job_id = self.store.create()
+        now = time.time()
+        self.store.update(job_id, status='done', result=result, started=now, finished=now)
+        return job_id
+
+    def depth(self):
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize()
+
+    def _work(self):
+        while True:
+            job_id, func, args, cleanup = self._queue.get()
+            self.store.update(job_id, status='running', started=time.time())
+            try:
+                result = func(*args)
+                self.store.update(job_id, status='done', result=result, finished=time.time())
+            except Exception as e:
+                print(f"Job {job_id} failed: {e}")
+                self.store.update(job_id, status='failed', error=str(e), finished=time.time())
+            finally:
+                if cleanup:
+                    try:
+                        cleanup()
+                    except Exception as e:
+                        print(f"Job {job_id} cleanup error: {e}")
+                self._queue.task_done()
@@ -0,0 +1,102 @@
+"""
+Keyword Spotting Module
+Slides a 1 s window over the shared audio buffer, skips silent windows and
+batches the rest through the keyword model, a bounded number per call
+"""
+
+import numpy as np
+from vad import overlap
+
+
+class KeywordSpotter:
+    """Sliding-window keyword spotting with an energy gate"""
+
+    # Labels the superb keyword model uses for "nothing to report"
+    IGNORED_LABELS = ('_silence_', '_unknown_')
+
+    def __init__(self, model, window=1.0, hop=0.5, threshold=0.5,
+                 relative_gate_db=-35.0, floor_gate_db=-60.0, batch_size=16, speech_only=True,
+                 chunk=64):
+        self.model = model
+        self.window = window                      # seconds, matches the model's training clips
+        self.hop = hop                            # seconds between window starts
+        self.threshold = threshold                # minimum score to report a keyword
+        self.relative_gate_db = relative_gate_db  # silence = this far below the loudest window
+        self.floor_gate_db = floor_gate_db        # ...or below this absolute level (dBFS)
+        self.batch_size = batch_size
+        self.speech_only = speech_only            # also skip windows the VAD marks as non-speech
+        self.chunk = chunk                        # windows per model call (bounds each batcher job)
+
+    def _sampling_rate(self):
+        return getattr(getattr(self.model, 'feature_extractor', None), 'sampling_rate', 16000)
+
+    def windows(self, y, sr):
+        """(start, end) sample offsets of the windows that pass the energy gate"""
+        win = max(int(self.window * sr), 1)
+        hop = max(int(self.hop * sr), 1)
+        if len(y) <= win:
+            starts = np.array([0])
+        else:
+            starts = np.arange(0, len(y) - win + 1, hop)
+            if starts[-1] + win < len(y):
+                starts = np.append(starts, len(y) - win)
+        ends = np.minimum(starts + win, len(y))
+
+        # Window energies from a running sum of squares (no per-window copies)
+        power = np.concatenate(([0.0], np.cumsum(np.square(y, dtype=np.float64))))
+        rms = np.sqrt((power[ends] - power[starts]) / np.maximum(ends - starts, 1))
+        level_db = 20 * np.log10(rms + 1e-10)
+
+        gate_db = max(level_db.max() + self.relative_gate_db, self.floor_gate_db)
+        keep = level_db >= gate_db
+        return list(zip(starts[keep].tolist(), ends[keep].tolist()))
+
+    def detect(self, ctx):
+        """Timestamped detections, overlapping hits of the same keyword merged"""
+        sr = self._sampling_rate()
+        y = ctx.at_rate(sr)
+        spans = self.windows(y, sr)
+        if self.speech_only:
+            regions = ctx.speech_segments()
+            spans = [(start, end) for start, end in spans if overlap(regions, start / sr, end / sr) > 0]
+        if not spans:
+            return []
+
+        results = []
+        for i in range(0, len(spans), self.chunk):
+            results += self.model(
+                [{"raw": y[start:end], "sampling_rate": sr} for start, end in spans[i:i + self.chunk]],
+                batch_size=self.batch_size,
+                top_k=1
+            )
+
+        detections = []
+        for (start, end), result in zip(spans, results):
+            best = result[0] if result else None
+            if not best or best['label'] in self.IGNORED_LABELS or best['score'] <= self.threshold:
+                continue
+            detections.append({
+                'keyword': best['label'],
+                'start': start / sr,
+                'end': end / sr,
+                'score': best['score']
+            })
+        return self.merge(detections)
+
+    @staticmethod
+    def merge(detections):
+        """Merge detections of the same keyword whose windows overlap"""
+        merged = []
+        for det in sorted(detections, key=lambda d: d['start']):
+            last = merged[-1] if merged else None
+            if last and last['keyword'] == det['keyword'] and det['start'] <= last['end']:
+                last['end'] = max(last['end'], det['end'])
+                last['score'] = max(last['score'], det['score'])
+            else:
+                merged.append(dict(det))
+        return [{
+            'keyword': d['keyword'],
+            'start': round(d['start'], 2),
+            'end': round(d['end'], 2),
+            'score': round(d['score'] * 100, 2)
+        } for d in merged]
@@ -0,0 +1,302 @@
+"""
+Long Audio Module
+Analyzes recordings too long to decode in one piece: the file is read as a
+stream of fixed-length chunks (soundfile blocks or an ffmpeg pipe), every
+chunk runs through the analysis stages, and the per-chunk results are merged
+with mergeable aggregates, so peak memory depends on the chunk length, not
+on the length of the recording
+
+Usage:
+    python long_audio.py meeting.mp3 -o result.json
+    python long_audio.py lecture.flac --chunk-seconds 30
+"""
+
+import argparse
+import io
+import itertools
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+import soundfile as sf
+
+from aggregates import HistogramCounts, RunningStats
+from audio_context import AudioContext, CANONICAL_SR, MIN_SPEECH_SECONDS, decode_chunks
+from metrics import STAGE_SECONDS
+from pcm_spool import map_pcm
+
+CHUNK_SECONDS = 60.0  # seconds decoded and analyzed at a time
+PITCH_EDGES = np.arange(50, 510, 10)  # Hz; voiced pitch histogram bins
+PERSONALITY_TRAITS = ('extraversion', 'emotional_stability', 'openness', 'agreeableness', 'conscientiousness')
+
+
+def probe_duration(path=None, data=None):
+    """Duration in seconds from the header (soundfile, then ffprobe), or None
+
+    Pass the file's bytes as `data` instead of a path to probe an in-memory
+    upload through a pipe, without writing it to disk. Nothing is decoded:
+    browser recordings (WebM/Opus from MediaRecorder) often carry no
+    duration at all and give None.
+    """
+    try:
+        return sf.info(io.BytesIO(data) if data is not None else path).duration
+    except Exception:
+        pass
+    try:
+        proc = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', 'pipe:0' if data is not None else path],
+            input=data, capture_output=True
+        )
+        return float(proc.stdout.strip())
+    except (OSError, ValueError):
+        return None
+
+
+class LongAudioAnalysis:
+    """Stage results of one recording, merged chunk by chunk
+
+    Only aggregates are kept between chunks: running statistics of the
+    acoustic measures and stage outputs, a pitch histogram, the emotion
+    timeline points and keyword detections (a few numbers per segment), and
+    the last second of audio so keywords spanning a chunk boundary are seen
+    whole.
+    """
+
+    def __init__(self, analyzer, source=None):
+        self.analyzer = analyzer
+        self.source = source
+        self.chunks = 0
+        self.duration = 0.0
+        self.speech_seconds = 0.0
+
+        self._bounds = []
+        self._segment_results = []
+        self._detections = []
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._health = {name: RunningStats() for name in ('jitter', 'shimmer', 'hnr_mean')}
+        self._pitch = RunningStats()
+        self._pitch_histogram = HistogramCounts(PITCH_EDGES)
+        self._age = {}
+        self._gender = {}
+        self._personality = {}
+
+    def add_chunk(self, samples):
+        """Run the per-chunk stages on the next `samples` (CANONICAL_SR mono)"""
+        analyzer = self.analyzer
+        ctx = AudioContext(samples, CANONICAL_SR, source=self.source)
+        start = self.duration
+
+        # Emotion timeline: pause-aware segments of this chunk
+        bounds = analyzer._timeline_bounds(ctx)
+        self._segment_results += analyzer._classify_segments(ctx, bounds)
+        self._bounds += [(start + s, start + e) for s, e in bounds]
+
+        # Keywords, with the previous chunk's last window prepended
+        try:
+            spotter = analyzer.keyword_spotter
+            kw_ctx = AudioContext(np.concatenate([self._tail, ctx.samples]), CANONICAL_SR)
+            kw_start = start - len(self._tail) / CANONICAL_SR
+            self._detections += [dict(det, start=det['start'] + kw_start, end=det['end'] + kw_start,
+                                      score=det['score'] / 100) for det in spotter.detect(kw_ctx)]
+            self._tail = ctx.samples[-int(spotter.window * CANONICAL_SR):].copy()
+        except Exception as e:
+            print(f"Long audio keyword error: {e}")
+
+        # Acoustic stages, weighted by the speech in this chunk
+        speech = sum(e - s for s, e in ctx.speech_segments()) if analyzer.vad else ctx.duration
+        if speech >= MIN_SPEECH_SECONDS:
+            try:
+                measures = analyzer._vocal_health_measures(ctx)
+                for name, stats in self._health.items():
+                    stats.add([measures[name]], weight=speech)
+                self._pitch.add(measures['pitch_values'])
+                self._pitch_histogram.add(measures['pitch_values'])
+            except Exception as e:
+                print(f"Long audio vocal health error: {e}")
+
+            age = analyzer._estimate_age(ctx)
+            if age.get('features'):
+                _add(self._age, {'age': age['age'], 'confidence': age['confidence'], **age['features']}, speech)
+                self._gender[age['gender']] = self._gender.get(age['gender'], 0.0) + speech
+
+            personality = analyzer._analyze_personality(ctx)
+            if personality.get('acoustic_features'):
+                _add(self._personality, {**{t: personality[t] for t in PERSONALITY_TRAITS},
+                                         **personality['acoustic_features']}, speech)
+
+        self.chunks += 1
+        self.duration += ctx.duration
+        self.speech_seconds += speech
+
+    def stages(self):
+        """Stage results for VoiceAnalyzer._build_result from the merged aggregates"""
+        analyzer = self.analyzer
+        timeline = analyzer._summarize_timeline(self._bounds, self._segment_results)
+        # Pooled from the timeline; without any scored segment there is no
+        # whole-recording audio left to classify, so the emotion is neutral
+        if analyzer._pool_emotions(timeline):
+            emotion = analyzer._analyze_emotion(None, timeline)
+        else:
+            emotion = {'emotion': 'neutral', 'confidence': 0, 'all_emotions': []}
+        health = analyzer._score_vocal_health(
+            jitter=self._health['jitter'].mean if self._health['jitter'].count else float('nan'),
+            shimmer=self._health['shimmer'].mean if self._health['shimmer'].count else float('nan'),
+            hnr_mean=self._health['hnr_mean'].mean if self._health['hnr_mean'].count else float('nan'),
+            pitch_values=self._pitch
+        )
+        return {
+            'timeline': timeline,
+            'emotion': emotion,
+            'health': health,
+            'stress': analyzer._estimate_stress(emotion, health),
+            'keywords': analyzer._summarize_keywords(analyzer.keyword_spotter.merge(self._detections)),
+            'age': self._merged_age(),
+            'personality': self._merged_personality()
+        }
+
+    def _merged_age(self):
+        if not self._age:
+            return {"age": 30, "confidence": 0.3, "gender": "unknown"}
+        features = {name: round(stats.mean, 4) for name, stats in self._age.items()
+                    if name not in ('age', 'confidence')}
+        return {
+            "age": int(round(self._age['age'].mean)),
+            "confidence": round(self._age['confidence'].mean, 2),
+            "gender": max(self._gender, key=self._gender.get),
+            "features": features
+        }
+
+    def _merged_personality(self):
+        if not self._personality:
+            return {**{t: 50 for t in PERSONALITY_TRAITS}, 'confidence': 0.2, 'acoustic_features': {}}
+        return {
+            **{t: round(self._personality[t].mean, 2) for t in PERSONALITY_TRAITS},
+            'confidence': 0.65,
+            'acoustic_features': {name: round(stats.mean, 4) for name, stats in self._personality.items()
+                                  if name not in PERSONALITY_TRAITS}
+        }
+
+    def summary(self):
+        """Chunking details and the merged pitch distribution for result['raw']"""
+        return {
+            'chunks': self.chunks,
+            'speech_seconds': round(self.speech_seconds, 2),
+            'pitch': dict(self._pitch.summary(2), median=round(self._pitch_histogram.quantile(0.5), 2)
+                          if self._pitch_histogram.total else None),
+            'pitch_histogram': self._pitch_histogram.summary()
+        }
+
+
+def _add(stats, values, weight):
+    """Add each named value to its RunningStats in `stats` with `weight`"""
+    for name, value in values.items():
+        stats.setdefault(name, RunningStats()).add([value], weight=weight)
+
+
+def load_or_chunk(source, max_seconds, chunk_seconds=CHUNK_SECONDS):
+    """Decode audio of unknown length as a stream, stopping past `max_seconds`
+
+    `source` is a path or the bytes of an in-memory upload. Returns
+    (AudioContext, None) when the whole recording fits: a path's samples go
+    to a memory-mapped PCM spool as they are decoded, while bytes are
+    decoded in memory and never touch the disk. Longer recordings give
+    (None, chunks) for analyze_long(): the chunks decoded so far, read back
+    from a spool, followed by the rest of the same decode, so nothing is
+    decoded twice.
+    """
+    started = time.perf_counter()
+    stream = decode_chunks(source, chunk_seconds=chunk_seconds)
+    limit = max_seconds * CANONICAL_SR
+    decoded = 0
+
+    def head():
+        nonlocal decoded
+        for chunk in stream:
+            yield chunk
+            decoded += len(chunk)
+            if decoded > limit:
+                return
+    in_memory = isinstance(source, bytes)
+    samples = list(head()) if in_memory else map_pcm(head())
+    if decoded == 0:
+        raise ValueError("Audio file is empty or unreadable")
+    if decoded <= limit:
+        if in_memory:
+            ctx = AudioContext(np.concatenate(samples), CANONICAL_SR, source='upload')
+        else:
+            ctx = AudioContext(samples, CANONICAL_SR, source=source, mapped=True)
+        ctx.decode_seconds = time.perf_counter() - started
+        return ctx, None
+    if in_memory:
+        samples = map_pcm(samples)   # past the limit: only now does it go to disk
+    step = int(chunk_seconds * CANONICAL_SR)
+    return None, itertools.chain((samples[i:i + step] for i in range(0, len(samples), step)), stream)
+
+
+def analyze_long(analyzer, path, chunk_seconds=CHUNK_SECONDS, chunks=None):
+    """VoiceAnalyzer-compatible result for a long file, decoded chunk by chunk
+
+    `chunks` continues a decode that is already under way (see
+    load_or_chunk); by default the file is decoded here. Holds one of the
+    analyzer's max_concurrent slots for the whole file, like
+    VoiceAnalyzer.analyze(); the wait is reported as timings['queue'].
+    """
+    with analyzer.slot() as queued:
+        if chunks is None:
+            chunks = decode_chunks(path, chunk_seconds=chunk_seconds)
+        return _analyze_long(analyzer, path, chunks, chunk_seconds, queued)
+
+
+def _analyze_long(analyzer, path, chunks, chunk_seconds, queued):
+    print(f"Starting long-audio analysis of: {path} ({chunk_seconds:g}s chunks)")
+    started = time.perf_counter()
+    analysis = LongAudioAnalysis(analyzer, source=path)
+    timings = {'queue': queued, 'chunks': 0.0}
+    for samples in chunks:
+        step = time.perf_counter()
+        analysis.add_chunk(samples)
+        timings['chunks'] += time.perf_counter() - step
+        print(f"  → Chunk {analysis.chunks} done ({analysis.duration:.0f}s analyzed)")
+    if analysis.chunks == 0:
+        raise ValueError("Audio file is empty or unreadable")
+
+    step = time.perf_counter()
+    result = analyzer._build_result(analysis.stages(), round(analysis.duration, 2), timings)
+    timings['merge'] = time.perf_counter() - step
+    timings['total'] = time.perf_counter() - started
+    timings['decode'] = max(timings['total'] - timings['chunks'] - timings['merge'], 0.0)
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    result['raw']['timings'] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+    result['raw']['long_audio'] = dict(analysis.summary(), chunk_seconds=chunk_seconds)
+    print(f"✓ Long-audio analysis complete! ({timings['total']:.2f}s)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze a long recording with bounded memory")
+    parser.add_argument('file', help="Audio file (any format soundfile or ffmpeg can read)")
+    parser.add_argument('-o', '--output', help="Write the JSON result here instead of stdout")
+    parser.add_argument('--chunk-seconds', type=float, default=CHUNK_SECONDS, help="Seconds decoded at a time")
+    parser.add_argument('--model-server', help="Address of a running model_server.py")
+    parser.add_argument('--backend', default='torch', help="Inference backend for local models")
+    args = parser.parse_args()
+
+    from voice_analyzer import VoiceAnalyzer
+    analyzer = VoiceAnalyzer(model_server=args.model_server, backend=args.backend)
+    result = analyze_long(analyzer, args.file, args.chunk_seconds)
+    text = json.dumps(result, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+        print(f"✓ Result written to {args.output}")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
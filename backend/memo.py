@@ -0,0 +1,38 @@
+"""
+Keyed Memo
+Build-once cache shared by the per-analysis feature stores; safe to use from
+stages running on different threads (each value is built exactly once)
+"""
+
+import threading
+
+
+class KeyedMemo:
+    """Thread-safe build-once cache keyed by hashable parameters"""
+
+    def __init__(self):
+        self._values = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get(self, key, build):
+        """Return the value for `key`, calling `build()` the first time"""
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._values:
+                self._values[key] = build()
+        return self._values[key]
+
+    def set(self, key, value):
+        self._values[key] = value
+
+    def keys(self):
+        return list(self._values.keys())
+
+    def __contains__(self, key):
+        return key in self._values
@@ -0,0 +1,137 @@
+"""
+Metrics Module
+Minimal Prometheus registry (counters and histograms rendered in the text
+exposition format) for the /metrics endpoint, without extra dependencies
+"""
+
+import threading
+
+# Latency buckets in seconds: from fast cache hits up to long recordings
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + '}'
+
+
+def histogram_lines(name, cumulative, total, count, label_names=(), label_values=()):
+    """Sample lines of one histogram series; `cumulative` is [(upper bound, count)]"""
+    lines = []
+    for bound, value in cumulative:
+        le = '+Inf' if bound == float('inf') else f'{bound:g}'
+        lines.append(f'{name}_bucket{_labels(label_names + ("le",), label_values + (le,))} {value}')
+    lines.append(f'{name}_sum{_labels(label_names, label_values)} {total:g}')
+    lines.append(f'{name}_count{_labels(label_names, label_values)} {count}')
+    return lines
+
+
+def metric_lines(name, help, kind, samples, label_names=()):
+    """Lines for a gauge/counter read at scrape time; `samples` is [(label values, value)]"""
+    lines = [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+    for label_values, value in samples:
+        lines.append(f'{name}{_labels(label_names, tuple(label_values))} {value:g}')
+    return lines
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, '') for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.label_names, key)} {value:g}')
+        return lines
+
+
+class Histogram:
+    """Bucketed observations (e.g. latencies), optionally split by labels"""
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labels=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self.label_names = tuple(labels)
+        self._series = {}   # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, '') for n in self.label_names)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                running, cumulative = 0, []
+                for bound, n in zip(self.buckets, counts):
+                    running += n
+                    cumulative.append((bound, running))
+                lines += histogram_lines(self.name, cumulative, total, count, self.label_names, key)
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics owned by the process plus collectors that read live state"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, labels=()):
+        metric = Histogram(name, help, buckets, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, func):
+        """Register `func()`, called at scrape time, returning exposition lines"""
+        self._collectors.append(func)
+        return func
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collect in self._collectors:
+            try:
+                lines += collect()
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# Filled in by VoiceAnalyzer.analyze for every stage it runs
+STAGE_SECONDS = REGISTRY.histogram(
+    'voice_analysis_stage_seconds', 'Time spent in each analysis stage', labels=('stage',))
@@ -0,0 +1,146 @@
+"""
+Micro-Batching Module
+Puts a small queue in front of a transformers pipeline: inputs from
+concurrent callers are collected for up to `max_batch` items or `max_wait_ms`,
+run through one padded forward pass and the results handed back to each caller
+"""
+
+import queue
+import threading
+import time
+
+# Upper bounds of the batch-size histogram buckets (items per forward pass)
+HISTOGRAM_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+# Seconds a caller waits for its results before giving up
+REQUEST_TIMEOUT = 600.0
+
+
+class MicroBatcher:
+    """Pipeline wrapper that merges concurrent calls into shared forward passes
+
+    Calls look exactly like pipeline calls; attributes other than the
+    batching ones (feature_extractor, model, ...) are read from the pipeline.
+    `model` may be a list of replicas (see inference_backend.replicate): each
+    gets its own worker thread, so that many passes can run at once. A
+    pipeline is only ever called from its own worker thread. Requests share
+    a pass only if they were made with the same keyword arguments; a caller
+    gets a TimeoutError after `timeout` seconds without a result.
+    """
+
+    def __init__(self, model, max_batch=32, max_wait_ms=5.0, name=None, timeout=REQUEST_TIMEOUT):
+        replicas = model if isinstance(model, list) else [model]
+        self.pipeline = replicas[0]
+        self.replicas = len(replicas)
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._histogram = [0] * (len(HISTOGRAM_BUCKETS) + 1)  # last bucket: larger batches
+        self._requests = 0
+        self._items = 0
+        self._passes = 0
+        for i, replica in enumerate(replicas):
+            threading.Thread(target=self._run, args=(replica,), name=f'batcher-{name or "model"}-{i}',
+                             daemon=True).start()
+
+    def __getattr__(self, attr):
+        # Only reached for attributes not set in __init__
+        if 'pipeline' not in self.__dict__:
+            raise AttributeError(attr)
+        return getattr(self.__dict__['pipeline'], attr)
+
+    def __call__(self, inputs, **kwargs):
+        single = not isinstance(inputs, list)
+        items = [inputs] if single else list(inputs)
+        if not items:
+            return []
+        request = {'inputs': items, 'kwargs': kwargs, 'done': threading.Event(),
+                   'result': None, 'error': None}
+        self._queue.put(request)
+        if not request['done'].wait(self.timeout):
+            raise TimeoutError(f"No result from the {self.name or 'model'} batcher after {self.timeout:g}s")
+        if request['error']:
+            raise request['error']
+        return request['result'][0] if single else request['result']
+
+    def _collect(self):
+        """Block for one request, then gather more until the batch is full or time is up"""
+        pending = [self._queue.get()]
+        size = len(pending[0]['inputs'])
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while size < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            pending.append(request)
+            size += len(request['inputs'])
+        return pending
+
+    def _run(self, pipeline):
+        while True:
+            pending = self._collect()
+            try:
+                # Only requests with identical call arguments can share a pass
+                groups = {}
+                for request in pending:
+                    key = tuple(sorted((name, repr(value)) for name, value in request['kwargs'].items()))
+                    groups.setdefault(key, []).append(request)
+                for group in groups.values():
+                    self._forward(pipeline, group, group[0]['kwargs'])
+            except BaseException as e:
+                # Never leave a caller waiting on a request this worker dropped
+                for request in pending:
+                    if not request['done'].is_set():
+                        request['error'] = e
+                        request['done'].set()
+                if not isinstance(e, Exception):
+                    raise
+
+    def _forward(self, pipeline, group, kwargs):
+        inputs = [x for request in group for x in request['inputs']]
+        # The caller's batch_size is kept (capped at max_batch)
+        batch_size = min(kwargs.get('batch_size') or len(inputs), len(inputs), self.max_batch)
+        try:
+            results = pipeline(inputs, **dict(kwargs, batch_size=batch_size))
+            offset = 0
+            for request in group:
+                request['result'] = results[offset:offset + len(request['inputs'])]
+                offset += len(request['inputs'])
+        except Exception as e:
+            for request in group:
+                request['error'] = e
+        self._record(len(group), len(inputs), batch_size)
+        for request in group:
+            request['done'].set()
+
+    def _record(self, requests, items, batch_size):
+        with self._stats_lock:
+            self._requests += requests
+            self._items += items
+            # The pipeline splits a large call into passes of `batch_size` items
+            for start in range(0, items, batch_size):
+                size = min(batch_size, items - start)
+                bucket = next((i for i, bound in enumerate(HISTOGRAM_BUCKETS) if size <= bound),
+                              len(HISTOGRAM_BUCKETS))
+                self._histogram[bucket] += 1
+                self._passes += 1
+
+    def stats(self):
+        """Request/pass counters and the batch-size histogram"""
+        with self._stats_lock:
+            labels = [str(bound) for bound in HISTOGRAM_BUCKETS] + ['+Inf']
+            return {
+                'max_batch': self.max_batch,
+                'replicas': self.replicas,
+                'max_wait_ms': self.max_wait_ms,
+                'requests': self._requests,
+                'items': self._items,
+                'forward_passes': self._passes,
+                'mean_batch_size': round(self._items / self._passes, 2) if self._passes else 0,
+                'queued': self._queue.qsize(),
+                'batch_size_histogram': dict(zip(labels, self._histogram))
+            }
@@ -0,0 +1,221 @@
+"""
+Model Server
+Loads the emotion and keyword pipelines once in a separate process and serves
+them over a local socket, so every Flask worker can share one copy of the
+models. Concurrent requests from all workers are micro-batched together.
+
+Usage:
+    python model_server.py                        # default socket
+    python model_server.py --address /run/voice-models.sock
+    MODEL_SERVER=/run/voice-models.sock gunicorn -w 8 app:app
+"""
+
+import argparse
+import os
+import secrets
+import sys
+import threading
+from multiprocessing.connection import Listener, Client
+from types import SimpleNamespace
+from micro_batcher import MicroBatcher
+from inference_backend import BACKENDS, default_replicas, default_threads, replicate
+
+# Unix socket on Linux/macOS, named pipe on Windows
+DEFAULT_ADDRESS = r'\\.\pipe\voice-analyzer-models' if sys.platform == 'win32' \
+    else '/tmp/voice-analyzer-models.sock'
+
+
+# Connection key shared by the server and its clients when MODEL_SERVER_KEY
+# is not set: generated by the server, readable by its user only
+KEY_FILE = os.environ.get('MODEL_SERVER_KEY_FILE',
+                          os.path.join(os.path.expanduser('~'), '.voice-analyzer-model-server.key'))
+
+
+def _authkey():
+    """Key clients authenticate with: MODEL_SERVER_KEY, else the server's key file"""
+    if os.environ.get('MODEL_SERVER_KEY'):
+        return os.environ['MODEL_SERVER_KEY'].encode()
+    try:
+        with open(KEY_FILE, 'rb') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        raise RuntimeError(f"No model server key: set MODEL_SERVER_KEY or start model_server.py "
+                           f"as this user (it writes {KEY_FILE})") from None
+
+
+def _server_authkey():
+    """MODEL_SERVER_KEY, or a new random key written to KEY_FILE (mode 0600)
+
+    There is no built-in fallback key: connections deliver pickled data, so
+    anyone holding the key can run code in the server process.
+    """
+    if os.environ.get('MODEL_SERVER_KEY'):
+        return os.environ['MODEL_SERVER_KEY'].encode()
+    key = secrets.token_hex(32).encode()
+    tmp = f"{KEY_FILE}.{os.getpid()}"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    os.replace(tmp, KEY_FILE)
+    print(f"✓ Model server key written to {KEY_FILE}")
+    return key
+
+
+def _model_info(model):
+    """Attributes a RemoteModel needs to stand in for `model`"""
+    config = getattr(getattr(model, 'model', None), 'config', None)
+    return {
+        'sampling_rate': getattr(getattr(model, 'feature_extractor', None), 'sampling_rate', 16000),
+        'id2label': getattr(config, 'id2label', None),
+        'name': getattr(config, '_name_or_path', getattr(model, 'model_name', None)),
+        'revision': getattr(config, '_commit_hash', None)
+    }
+
+
+class ModelServer:
+    """Serves named pipelines to RemoteModel clients"""
+
+    def __init__(self, models, address=DEFAULT_ADDRESS, max_batch=None, max_wait_ms=5.0,
+                 backend='torch'):
+        """`models` maps names to pipelines (or lists of replicas); `max_batch` maps names to batch limits"""
+        self.address = address
+        self.backend = backend
+        max_batch = max_batch or {}
+        self.batchers = {name: MicroBatcher(model, max_batch=max_batch.get(name, 16),
+                                            max_wait_ms=max_wait_ms, name=name)
+                         for name, model in models.items()}
+
+    def serve_forever(self):
+        if not self.address.startswith('\\\\') and os.path.exists(self.address):
+            os.remove(self.address)  # stale socket from a previous run
+        # Created under a restrictive umask, so the socket is never reachable
+        # by other users, not even between bind() and a chmod
+        umask = os.umask(0o077)
+        try:
+            listener = Listener(self.address, authkey=_server_authkey())
+        finally:
+            os.umask(umask)
+        print(f"✓ Model server listening on {self.address}")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"✗ Model server rejected a connection: {e}")
+                    continue
+                threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+
+    def _serve(self, conn):
+        try:
+            while True:
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    return
+                conn.send(self._handle(message))
+        except Exception as e:
+            print(f"Model server connection error: {e}")
+        finally:
+            conn.close()
+
+    def _handle(self, message):
+        try:
+            op = message['op']
+            if op == 'stats':
+                return {'ok': True, 'result': self.stats()}
+            batcher = self.batchers[message['model']]
+            if op == 'info':
+                return {'ok': True, 'result': dict(_model_info(batcher.pipeline), backend=self.backend)}
+            if op == 'call':
+                return {'ok': True, 'result': batcher(message['inputs'], **(message.get('kwargs') or {}))}
+            raise ValueError(f"Unknown operation: {op}")
+        except Exception as e:
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+    def stats(self):
+        return {name: batcher.stats() for name, batcher in self.batchers.items()}
+
+
+class RemoteModel:
+    """Pipeline stand-in that forwards calls to a ModelServer
+
+    Exposes the attributes VoiceAnalyzer reads from a pipeline
+    (feature_extractor.sampling_rate, model.config), so it can be used
+    wherever a local pipeline is.
+    """
+
+    def __init__(self, address, name):
+        self.address = address
+        self.name = name
+        self._local = threading.local()
+        info = self._request({'op': 'info', 'model': name})
+        self.model_name = info['name']
+        self.backend = info['backend']
+        self.feature_extractor = SimpleNamespace(sampling_rate=info['sampling_rate'])
+        self.model = SimpleNamespace(config=SimpleNamespace(
+            id2label=info['id2label'], _name_or_path=info['name'], _commit_hash=info['revision']
+        ))
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = Client(self.address, authkey=_authkey())
+        return conn
+
+    def _request(self, message):
+        # One connection per thread; reconnect once if the server restarted
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send(message)
+                reply = conn.recv()
+                break
+            except (EOFError, OSError):
+                self._local.conn = None
+                if attempt:
+                    raise
+        if not reply['ok']:
+            raise RuntimeError(f"Model server error: {reply['error']}")
+        return reply['result']
+
+    def stats(self):
+        """Micro-batching stats of every model on the server"""
+        return self._request({'op': 'stats'})
+
+    def __call__(self, inputs, **kwargs):
+        single = not isinstance(inputs, list)
+        results = self._request({'op': 'call', 'model': self.name,
+                                 'inputs': [inputs] if single else inputs, 'kwargs': kwargs})
+        return results[0] if single else results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the voice analysis models over a local socket")
+    parser.add_argument('--address', default=os.environ.get('MODEL_SERVER', DEFAULT_ADDRESS),
+                        help="Unix socket path (named pipe on Windows)")
+    parser.add_argument('--backend', default=os.environ.get('INFERENCE_BACKEND', 'torch'), choices=BACKENDS,
+                        help="Inference backend (see inference_backend.py)")
+    parser.add_argument('--emotion-batch', type=int, default=8, help="Max segments per emotion forward pass")
+    parser.add_argument('--keyword-batch', type=int, default=16, help="Max windows per keyword forward pass")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help="How long a batch waits for more requests before running")
+    parser.add_argument('--replicas', type=int, default=default_replicas(),
+                        help="Pipelines per model running forward passes side by side (shared weights)")
+    parser.add_argument('--threads', type=int, help="Intra-op threads per forward pass (default: cores / replicas)")
+    args = parser.parse_args()
+
+    from voice_analyzer import load_models
+    threads = args.threads or default_threads(args.replicas)
+    print(f"Loading AI models ({args.replicas} replicas x {threads} threads)...")
+    models = {name: replicate(model, args.replicas)
+              for name, model in load_models(args.backend, threads=threads).items()}
+    print("Models loaded successfully!")
+    max_batch = {'emotion': args.emotion_batch, 'keyword': args.keyword_batch}
+    ModelServer(models, args.address, max_batch=max_batch, max_wait_ms=args.max_wait_ms,
+                backend=args.backend).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
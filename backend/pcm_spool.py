@@ -0,0 +1,94 @@
+"""
+PCM Spool Module
+Keeps decoded audio in a private raw float32 file that is memory-mapped, so
+a large upload is decoded once and the stages read zero-copy views of it
+instead of holding full-length copies in RAM. Spool files are unlinked as
+soon as they are mapped (POSIX) or when the mapping is released
+"""
+
+import os
+import tempfile
+import time
+import weakref
+
+import numpy as np
+import soxr
+
+SPOOL_DIR = os.environ.get('SPOOL_DIR')           # default: the system temp dir
+RESAMPLE_BLOCK = 1 << 20                          # samples per resampler call
+SPOOL_PREFIXES = ('voice_pcm_', 'voice_upload_')  # files owned by this service
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Could not remove PCM spool {path}: {e}")
+
+
+def map_pcm(chunks, directory=SPOOL_DIR):
+    """Write float32 sample `chunks` to a spool file; returns it memory-mapped (read-only)
+
+    Slices of the result are views into the mapping. On POSIX the file is
+    unlinked right away (the mapping keeps the data until the last view is
+    gone); elsewhere it is removed when the mapping is garbage-collected.
+    """
+    handle, path = tempfile.mkstemp(prefix='voice_pcm_', suffix='.f32', dir=directory)
+    count = 0
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            for chunk in chunks:
+                chunk = np.ascontiguousarray(chunk, dtype=np.float32)
+                chunk.tofile(f)
+                count += len(chunk)
+        if count == 0:
+            _remove(path)
+            return np.zeros(0, dtype=np.float32)
+        samples = np.memmap(path, dtype=np.float32, mode='r', shape=(count,))
+    except BaseException:
+        _remove(path)
+        raise
+    if os.name == 'posix':
+        _remove(path)
+    else:
+        weakref.finalize(samples, _remove, path)
+    return samples
+
+
+def resample_pcm(samples, orig_sr, target_sr, directory=SPOOL_DIR):
+    """`samples` at `target_sr` in a new spool, resampled as one continuous stream
+
+    Only RESAMPLE_BLOCK samples are in memory at a time; soxr carries its
+    filter state across blocks, so there are no seams.
+    """
+    stream = soxr.ResampleStream(orig_sr, target_sr, 1, dtype='float32', quality='HQ')
+
+    def blocks():
+        for start in range(0, len(samples), RESAMPLE_BLOCK):
+            end = start + RESAMPLE_BLOCK
+            yield stream.resample_chunk(np.asarray(samples[start:end]), last=end >= len(samples))
+    return map_pcm(blocks(), directory)
+
+
+def remove_stale_spools(directory=SPOOL_DIR, max_age=3600):
+    """Delete spool/upload files older than `max_age` seconds left by a crashed process"""
+    directory = directory or tempfile.gettempdir()
+    removed = 0
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    cutoff = time.time() - max_age
+    for name in names:
+        if not name.startswith(SPOOL_PREFIXES):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,193 @@
+"""
+Praat Feature Cache
+Builds each expensive Praat object (pitch, point process, jitter, ...) once
+per analysis and shares it between the stages that need it
+"""
+
+import parselmouth
+import numpy as np
+from memo import KeyedMemo
+
+
+# Defaults used by every stage (Praat's standard voice report settings)
+PITCH_FLOOR = 75.0
+PITCH_CEILING = 600.0
+PERIOD_FLOOR = 0.0001
+PERIOD_CEILING = 0.02
+MAX_PERIOD_FACTOR = 1.3
+MAX_AMPLITUDE_FACTOR = 1.6
+
+
+def prominent_peaks(values, threshold, min_dip_db):
+    """Indices of local maxima above `threshold` that rise at least
+    `min_dip_db` over the lowest value since the previous such maximum"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 3:
+        return np.array([], dtype=int)
+    is_peak = (values[1:-1] > values[:-2]) & (values[1:-1] >= values[2:]) & (values[1:-1] > threshold)
+    peaks = np.flatnonzero(is_peak) + 1
+    if len(peaks) == 0:
+        return peaks
+
+    # Lowest point in values[previous peak:peak]; reduceat over interleaved
+    # (start, peak) indices, keeping the even slots
+    starts = np.append(0, peaks[:-1])
+    dips = np.minimum.reduceat(values, np.column_stack([starts, peaks]).ravel())[::2]
+    dips[0] = -np.inf  # the first peak has nothing to dip from
+    return peaks[values[peaks] - dips >= min_dip_db]
+
+
+class PraatFeatures:
+    """Per-analysis feature store, keyed by Praat parameters"""
+
+    def __init__(self, sound):
+        self.sound = sound
+        self._cache = KeyedMemo()
+
+    def _get(self, key, build):
+        return self._cache.get(key, build)
+
+    def pitch(self, time_step=None, pitch_floor=PITCH_FLOOR, pitch_ceiling=PITCH_CEILING):
+        """Pitch object (sound.to_pitch)"""
+        return self._get(
+            ('pitch', time_step, pitch_floor, pitch_ceiling),
+            lambda: self.sound.to_pitch(time_step=time_step, pitch_floor=pitch_floor,
+                                        pitch_ceiling=pitch_ceiling)
+        )
+
+    def voiced_pitch(self, **params):
+        """Frequencies of voiced pitch frames (unvoiced frames removed)"""
+        key = ('voiced_pitch',) + tuple(sorted(params.items()))
+
+        def build():
+            values = self.pitch(**params).selected_array['frequency']
+            return values[values > 0]
+        return self._get(key, build)
+
+    def point_process(self, pitch_floor=PITCH_FLOOR, pitch_ceiling=PITCH_CEILING):
+        """Glottal pulses ("To PointProcess (periodic, cc)")"""
+        return self._get(
+            ('point_process', pitch_floor, pitch_ceiling),
+            lambda: parselmouth.praat.call(self.sound, "To PointProcess (periodic, cc)",
+                                           pitch_floor, pitch_ceiling)
+        )
+
+    def _over_regions(self, measure, regions, pitch_floor, pitch_ceiling, period_floor,
+                      period_ceiling, max_period_factor):
+        """`measure(start, end)` over the whole sound, or averaged over `regions`
+
+        Each (start, end) region is measured on its own and weighted by the
+        number of periods in it, so no period ever spans two regions.
+        """
+        if regions is None:
+            return measure(0, 0)
+        point_process = self.point_process(pitch_floor, pitch_ceiling)
+        values, weights = [], []
+        for start, end in regions:
+            periods = parselmouth.praat.call(point_process, "Get number of periods", start, end,
+                                             period_floor, period_ceiling, max_period_factor)
+            if periods < 2:
+                continue
+            value = measure(start, end)
+            if np.isfinite(value):
+                values.append(value)
+                weights.append(periods)
+        return float(np.average(values, weights=weights)) if values else float('nan')
+
+    def jitter(self, pitch_floor=PITCH_FLOOR, pitch_ceiling=PITCH_CEILING,
+               period_floor=PERIOD_FLOOR, period_ceiling=PERIOD_CEILING,
+               max_period_factor=MAX_PERIOD_FACTOR, regions=None):
+        """Local jitter over the whole sound, or over `regions` only (may be NaN)"""
+        def measure(start, end):
+            point_process = self.point_process(pitch_floor, pitch_ceiling)
+            return parselmouth.praat.call(point_process, "Get jitter (local)", start, end,
+                                          period_floor, period_ceiling, max_period_factor)
+        regions = tuple(regions) if regions is not None else None
+        return self._get(
+            ('jitter', pitch_floor, pitch_ceiling, period_floor, period_ceiling,
+             max_period_factor, regions),
+            lambda: self._over_regions(measure, regions, pitch_floor, pitch_ceiling,
+                                       period_floor, period_ceiling, max_period_factor)
+        )
+
+    def shimmer(self, pitch_floor=PITCH_FLOOR, pitch_ceiling=PITCH_CEILING,
+                period_floor=PERIOD_FLOOR, period_ceiling=PERIOD_CEILING,
+                max_period_factor=MAX_PERIOD_FACTOR,
+                max_amplitude_factor=MAX_AMPLITUDE_FACTOR, regions=None):
+        """Local shimmer over the whole sound, or over `regions` only (may be NaN)"""
+        def measure(start, end):
+            point_process = self.point_process(pitch_floor, pitch_ceiling)
+            return parselmouth.praat.call([self.sound, point_process], "Get shimmer (local)",
+                                          start, end, period_floor, period_ceiling,
+                                          max_period_factor, max_amplitude_factor)
+        regions = tuple(regions) if regions is not None else None
+        return self._get(
+            ('shimmer', pitch_floor, pitch_ceiling, period_floor, period_ceiling,
+             max_period_factor, max_amplitude_factor, regions),
+            lambda: self._over_regions(measure, regions, pitch_floor, pitch_ceiling,
+                                       period_floor, period_ceiling, max_period_factor)
+        )
+
+    def harmonicity(self):
+        """Harmonicity (HNR) object"""
+        return self._get(('harmonicity',), self.sound.to_harmonicity)
+
+    def intensity(self):
+        """Intensity contour"""
+        return self._get(('intensity',), self.sound.to_intensity)
+
+    def formants(self):
+        """Burg formant tracks"""
+        return self._get(('formants',), self.sound.to_formant_burg)
+
+    def formant_tracks(self, max_formant=4):
+        """Formant frequencies as an array of shape (max_formant, frames)
+
+        Pulled out of Praat one whole track at a time ("To Matrix") instead
+        of querying every frame; undefined values are NaN. Row 0 is F1.
+        """
+        def build():
+            formants = self.formants()
+            tracks = np.vstack([
+                parselmouth.praat.call(formants, "To Matrix", n).values[0]
+                for n in range(1, max_formant + 1)
+            ])
+            tracks[~(tracks > 0)] = np.nan
+            return tracks
+        return self._get(('formant_tracks', max_formant), build)
+
+    def formant_times(self):
+        """Frame centre times (seconds) matching the columns of formant_tracks()"""
+        return self._get(('formant_times',), lambda: np.asarray(self.formants().xs()))
+
+    def syllable_nuclei(self, silence_db=-25.0, min_dip_db=2.0):
+        """Times (seconds) of syllable nuclei found in the intensity contour
+
+        Nuclei are intensity peaks above the silence threshold (the 99th
+        percentile + `silence_db`, but never below the median intensity, so
+        in recordings that are mostly speech the quieter half of the frames
+        cannot produce nuclei), separated from the previous peak by a dip of
+        at least `min_dip_db`, and voiced according to the shared pitch track.
+        """
+        def build():
+            intensity = self.intensity()
+            values = intensity.values[0]
+            times = np.asarray(intensity.xs())
+            if len(values) < 3:
+                return np.array([])
+
+            threshold = max(np.percentile(values, 99) + silence_db, np.median(values))
+            peaks = prominent_peaks(values, threshold, min_dip_db)
+            if len(peaks) == 0:
+                return np.array([])
+
+            # Keep voiced peaks only
+            pitch = self.pitch()
+            frequency = pitch.selected_array['frequency']
+            frames = np.clip(np.searchsorted(np.asarray(pitch.xs()), times[peaks]), 0, len(frequency) - 1)
+            return times[peaks][frequency[frames] > 0]
+        return self._get(('syllable_nuclei', silence_db, min_dip_db), build)
+
+    def cached(self):
+        """Keys of the objects built so far (handy for debugging)"""
+        return self._cache.keys()
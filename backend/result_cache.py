@@ -0,0 +1,146 @@
+"""
+Result Cache Module
+Content-addressed cache for analysis results: an in-memory LRU plus an
+optional on-disk tier that survives restarts
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def content_hash(data):
+    """SHA-256 of the uploaded bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def cache_key(audio_hash, signature):
+    """Key for an upload analysed by a given model/config signature"""
+    sig = hashlib.sha256(json.dumps(signature, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{audio_hash}:{sig[:16]}"
+
+
+def _served(result, started):
+    """Copy of a cached `result` with the cache lookup as its timings"""
+    result = copy.deepcopy(result)
+    if isinstance(result.get('raw'), dict):
+        result['raw']['timings'] = {'cache_hit': round(time.perf_counter() - started, 4)}
+    return result
+
+
+class ResultCache:
+    """Size-bounded LRU of analysis results with hit/miss counters
+
+    Stage timings describe one run, not the recording, so they are not
+    stored; a cached result carries raw.timings = {'cache_hit': seconds}
+    (the lookup) instead.
+    """
+
+    def __init__(self, max_entries=256, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key.replace(':', '_') + '.json')
+
+    def get(self, key):
+        """Cached result for `key` (a copy), or None"""
+        started = time.perf_counter()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _served(self._entries[key], started)
+
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, result)
+        return _served(result, started)
+
+    def put(self, key, result):
+        result = copy.deepcopy(result)
+        if isinstance(result.get('raw'), dict):
+            result['raw'].pop('timings', None)
+        with self._lock:
+            self._store(key, result)
+        self._write_disk(key, result)
+
+    def _store(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, result):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(result, f, default=float)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Result cache write error: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def invalidate(self, prefix=None):
+        """Drop entries whose key starts with `prefix` (all entries if None)
+
+        Passing an upload's content hash removes it for every signature.
+        Returns the number of entries removed.
+        """
+        removed = set()
+        with self._lock:
+            for key in list(self._entries):
+                if prefix is None or key.startswith(prefix):
+                    del self._entries[key]
+                    removed.add(key)
+        if self.disk_dir:
+            disk_prefix = prefix.replace(':', '_') if prefix else ''
+            for name in os.listdir(self.disk_dir):
+                if name.endswith('.json') and name.startswith(disk_prefix):
+                    try:
+                        os.remove(os.path.join(self.disk_dir, name))
+                        removed.add(name[:-5].replace('_', ':', 1))
+                    except OSError:
+                        pass
+        return len(removed)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'disk_tier': bool(self.disk_dir),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0
+            }
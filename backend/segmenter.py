@@ -0,0 +1,58 @@
+"""
+Timeline Segmenter
+Cuts a recording into emotion-timeline segments of about a target length,
+placing the boundaries at pauses: between speech regions where possible and
+at the quietest moment near the target length inside continuous speech
+"""
+
+import numpy as np
+
+
+def split_region(start, end, level_db, hop, target, max_len, min_len, search):
+    """Split one speech region longer than `max_len` at its quietest frames
+
+    The search window is clipped to the frames in `level_db`; where it has
+    no frames (a region running past the last one) the cut is at the target.
+    """
+    pieces = []
+    cut = start
+    while end - cut > max_len:
+        lo = max(cut + target - search, cut + min_len)
+        hi = min(cut + target + search, end - min_len)
+        first = min(int(lo / hop), len(level_db))
+        frames = level_db[first:min(max(int(hi / hop), first + 1), len(level_db))]
+        point = (first + int(np.argmin(frames))) * hop if len(frames) else cut + target
+        point = max(point, cut + hop)  # frame rounding must never stall the cut
+        pieces.append((cut, point))
+        cut = point
+    pieces.append((cut, end))
+    return pieces
+
+
+def plan_segments(regions, level_db, hop, target=3.0, max_len=None, min_len=1.0, search=0.75):
+    """Timeline segments as (start, end) seconds, one per ~`target` seconds of speech
+
+    `regions` are the speech regions (VAD output, or the whole recording);
+    `level_db` is the per-frame level every `hop` seconds. Consecutive
+    regions are merged while the segment is shorter than `target` and the
+    merged span stays within `max_len` (default 1.5 x target). `min_len` is
+    capped at half the target, so short targets still get a search window.
+    """
+    if target <= 0:
+        raise ValueError(f"Timeline target must be positive, got {target}")
+    max_len = max_len or 1.5 * target
+    min_len = min(min_len, target / 2)
+    pieces = []
+    for start, end in regions:
+        pieces += split_region(start, end, level_db, hop, target, max_len, min_len, search)
+
+    segments = []
+    for start, end in pieces:
+        if segments:
+            seg_start, seg_end = segments[-1]
+            short = seg_end - seg_start < target or end - start < min_len
+            if short and end - seg_start <= max_len + (min_len if end - start < min_len else 0):
+                segments[-1] = (seg_start, end)
+                continue
+        segments.append((start, end))
+    return segments
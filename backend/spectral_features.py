@@ -0,0 +1,93 @@
+"""
+Spectral Feature Bank
+Computes the magnitude STFT and mel spectrogram of an analysis once and
+derives the librosa descriptors (centroid, bandwidth, rolloff, MFCC,
+piptrack) from them on first use
+"""
+
+import librosa
+import numpy as np
+from memo import KeyedMemo
+
+
+# librosa's defaults, so the descriptors match the per-call versions
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+
+
+class SpectralFeatures:
+    """Per-analysis spectral store; every array is float32 and built lazily"""
+
+    def __init__(self, y, sr, n_fft=N_FFT, hop_length=HOP_LENGTH):
+        self.y = y
+        self.sr = int(sr)
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self._cache = KeyedMemo()
+
+    def _get(self, key, build):
+        return self._cache.get(key, build)
+
+    def magnitude(self):
+        """|STFT| of shape (1 + n_fft/2, frames)"""
+        return self._get(('magnitude',), lambda: np.abs(librosa.stft(
+            self.y, n_fft=self.n_fft, hop_length=self.hop_length
+        )).astype(np.float32, copy=False))
+
+    def power(self):
+        """|STFT|^2"""
+        return self._get(('power',), lambda: np.square(self.magnitude()))
+
+    def mel(self, n_mels=N_MELS):
+        """Mel power spectrogram built from the shared STFT"""
+        return self._get(('mel', n_mels), lambda: librosa.feature.melspectrogram(
+            S=self.power(), sr=self.sr, n_fft=self.n_fft, n_mels=n_mels
+        ).astype(np.float32, copy=False))
+
+    def rms(self):
+        """Frame RMS energy (shape: frames)
+
+        Taken from the waveform rather than the STFT: it needs no transform,
+        and the windowed spectrum would scale the values by the Hann window.
+        """
+        return self._get(('rms',), lambda: librosa.feature.rms(
+            y=self.y, frame_length=self.n_fft, hop_length=self.hop_length
+        )[0].astype(np.float32, copy=False))
+
+    def centroid(self):
+        """Spectral centroid per frame (Hz)"""
+        return self._get(('centroid',), lambda: librosa.feature.spectral_centroid(
+            S=self.magnitude(), sr=self.sr, n_fft=self.n_fft
+        )[0])
+
+    def bandwidth(self):
+        """Spectral bandwidth per frame (Hz)"""
+        return self._get(('bandwidth',), lambda: librosa.feature.spectral_bandwidth(
+            S=self.magnitude(), sr=self.sr, n_fft=self.n_fft
+        )[0])
+
+    def rolloff(self, roll_percent=0.85):
+        """Spectral rolloff frequency per frame (Hz)"""
+        return self._get(('rolloff', roll_percent), lambda: librosa.feature.spectral_rolloff(
+            S=self.magnitude(), sr=self.sr, n_fft=self.n_fft, roll_percent=roll_percent
+        )[0])
+
+    def mfcc(self, n_mfcc=13):
+        """MFCCs of shape (n_mfcc, frames) from the shared mel spectrogram"""
+        return self._get(('mfcc', n_mfcc), lambda: librosa.feature.mfcc(
+            S=librosa.power_to_db(self.mel()), n_mfcc=n_mfcc
+        ).astype(np.float32, copy=False))
+
+    def piptrack(self):
+        """(pitches, magnitudes) from the shared STFT
+
+        Not cached: both arrays are as large as the STFT and the only caller
+        reduces them to one pitch per frame straight away.
+        """
+        return librosa.piptrack(S=self.magnitude(), sr=self.sr, n_fft=self.n_fft,
+                                hop_length=self.hop_length)
+
+    def cached(self):
+        """Keys of the arrays built so far (handy for debugging)"""
+        return self._cache.keys()
@@ -0,0 +1,104 @@
+"""
+Stage Scheduler
+Runs the analysis stages as a small dependency graph: every stage starts as
+soon as the stages it depends on have finished, independent stages run
+side by side on a thread pool (or a process pool for CPU-heavy stages)
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+
+def timed_call(func, *args):
+    """Run `func(*args)` and return (result, seconds); module level so it pickles"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class StageScheduler:
+    """Dependency-aware executor for one analysis run"""
+
+    def __init__(self, thread_pool=None, process_pool=None):
+        self.thread_pool = thread_pool
+        self.process_pool = process_pool
+        self._stages = {}
+        self._preset = {}
+        self.timings = {}   # stage name -> seconds spent running it
+
+    def add(self, name, func, *args, deps=(), label=None, process=False):
+        """Register a stage; `func(*args, *dep_results)` is called when deps are done
+
+        `process=True` runs the stage in the process pool when one is
+        configured (func and args must then be picklable); otherwise it
+        falls back to the thread pool.
+        """
+        if name in self._preset:
+            return self
+        if name in self._stages:
+            raise ValueError(f"Stage '{name}' registered twice")
+        for dep in deps:
+            if dep not in self._stages and dep not in self._preset:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = {
+            'func': func,
+            'args': args,
+            'deps': tuple(deps),
+            'label': label,
+            'process': process
+        }
+        return self
+
+    def preset(self, name, result):
+        """Mark a stage as already done; a later add() with this name is ignored"""
+        self._preset[name] = result
+        return self
+
+    def _submit(self, name, results):
+        stage = self._stages[name]
+        if stage['label']:
+            print(f"  → {stage['label']}...")
+        args = stage['args'] + tuple(results[dep] for dep in stage['deps'])
+        pool = self.process_pool if stage['process'] and self.process_pool else self.thread_pool
+        return pool.submit(timed_call, stage['func'], *args)
+
+    def run(self):
+        """Run every stage and return {stage name: result}"""
+        owns_pool = self.thread_pool is None
+        if owns_pool:
+            self.thread_pool = ThreadPoolExecutor(max_workers=max(len(self._stages), 1))
+
+        results = dict(self._preset)
+        pending = dict(self._stages)
+        running = {}
+        try:
+            while pending or running:
+                ready = [name for name, stage in pending.items()
+                         if all(dep in results for dep in stage['deps'])]
+                for name in ready:
+                    del pending[name]
+                    running[self._submit(name, results)] = name
+
+                if not running:
+                    raise RuntimeError(f"Unresolvable stage dependencies: {sorted(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name], self.timings[name] = future.result()
+        except Exception:
+            for future in running:
+                future.cancel()
+            raise
+        finally:
+            if owns_pool:
+                self.thread_pool.shutdown(wait=False)
+                self.thread_pool = None
+        return results
+
+
+def make_pools(max_workers=4, process_workers=0):
+    """Thread pool for the stages plus an optional process pool"""
+    thread_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage')
+    process_pool = ProcessPoolExecutor(max_workers=process_workers) if process_workers else None
+    return thread_pool, process_pool
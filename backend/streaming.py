@@ -0,0 +1,262 @@
+"""
+Streaming Analysis Module
+Receives PCM frames while the user is still recording and runs the timeline
+emotion, vocal health and keyword stages window by window, so that when the
+recording stops only the last window (plus the whole-clip acoustic stages)
+is left to compute
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import soxr
+from audio_context import AudioContext, CANONICAL_SR
+
+
+SAMPLE_FORMATS = {'f32le': np.float32, 's16le': np.int16}
+MIN_WINDOW = 0.25  # seconds; shorter tails are kept as audio but not classified
+
+
+class StreamTooLongError(Exception):
+    """Raised when a session would grow past its audio limit"""
+
+
+class StreamingSession:
+    """One live recording: buffered PCM plus incrementally built stage results"""
+
+    def __init__(self, analyzer, sample_rate, sample_format='f32le', window=3.0, max_seconds=600.0):
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported sample format: {sample_format}")
+        if not 8000 <= int(sample_rate) <= 192000:
+            raise ValueError(f"Unsupported sample rate: {sample_rate}")
+        self.id = uuid.uuid4().hex
+        self.analyzer = analyzer
+        self.input_sr = int(sample_rate)
+        self.sample_format = sample_format
+        self.window = window
+        self.max_seconds = max_seconds
+        self.last_active = time.time()
+        self.finished = False
+
+        self._pending = []        # input-rate frames not yet in a window
+        self._pending_samples = 0
+        self._received_samples = 0
+        self._windows = []        # canonical-rate samples of processed windows
+        self._offset = 0.0        # seconds covered by processed windows
+        # One resampler for the whole session, so windows join without seams
+        self._resampler = soxr.ResampleStream(self.input_sr, CANONICAL_SR, 1, dtype='float32', quality='HQ') \
+            if self.input_sr != CANONICAL_SR else None
+        self._flushed = False
+        self._buffer_lock = threading.Lock()
+        self._process_lock = threading.Lock()   # one window processed at a time
+        self._state_lock = threading.Lock()     # guards the incremental results below
+
+        # Incremental stage state
+        self._bounds = []
+        self._segment_results = []
+        self._health = []         # (weight, measures) per window
+        self._detections = []
+        self._sent = 0            # timeline points already returned to the client
+
+    def feed(self, data):
+        """Append raw PCM bytes; returns the number of seconds received so far
+
+        Raises StreamTooLongError (and keeps nothing of `data`) once the
+        session would hold more than `max_seconds` of audio.
+        """
+        dtype = SAMPLE_FORMATS[self.sample_format]
+        frames = np.frombuffer(data[:len(data) - len(data) % np.dtype(dtype).itemsize], dtype=dtype)
+        if dtype == np.int16:
+            frames = frames.astype(np.float32) / 32768.0
+        with self._buffer_lock:
+            if (self._received_samples + len(frames)) / self.input_sr > self.max_seconds:
+                raise StreamTooLongError(f"Live sessions are limited to {self.max_seconds:g} seconds of audio")
+            self._pending.append(frames.astype(np.float32, copy=True))
+            self._pending_samples += len(frames)
+            self._received_samples += len(frames)
+            self.last_active = time.time()
+            return self._received_samples / self.input_sr
+
+    def _take(self, final=False):
+        """Pop the next complete window (or the whole tail when final) from the buffer"""
+        window_samples = int(self.window * self.input_sr)
+        with self._buffer_lock:
+            if self._pending_samples == 0 or (not final and self._pending_samples < window_samples):
+                return None
+            pending = np.concatenate(self._pending)
+            take = pending if final else pending[:window_samples]
+            rest = pending[len(take):]
+            self._pending = [rest] if len(rest) else []
+            self._pending_samples = len(rest)
+            return take
+
+    def process_ready(self, final=False):
+        """Run the incremental stages on every complete window in the buffer"""
+        with self._process_lock:
+            if self._flushed:
+                return
+            while True:
+                frames = self._take()
+                if frames is None:
+                    break
+                self._process_window(self._resample(frames))
+            if final:
+                # The tail, plus whatever the resampler still holds back
+                self._flushed = True
+                frames = self._take(final=True)
+                samples = self._resample(frames if frames is not None else np.zeros(0, np.float32), last=True)
+                if len(samples):
+                    self._process_window(samples)
+
+    def _resample(self, frames, last=False):
+        """Input-rate frames to the canonical rate, continuing the session's stream"""
+        if self._resampler is None:
+            return frames
+        return self._resampler.resample_chunk(frames, last=last)
+
+    def _process_window(self, samples):
+        ctx = AudioContext(samples, CANONICAL_SR, source=f'stream:{self.id}')
+        start = self._offset
+        duration = ctx.duration
+        spotter = self.analyzer.keyword_spotter
+
+        segment_results, measures, detections = [], None, []
+        if duration >= MIN_WINDOW:
+            # Timeline emotion for this window
+            segment_results = self.analyzer._classify_segments(ctx, [(0, duration)])
+
+            # Vocal health measures, combined across windows in live_health()
+            try:
+                measures = self.analyzer._vocal_health_measures(ctx)
+            except Exception as e:
+                print(f"Streaming vocal health error: {e}")
+
+            # Keywords: prepend the previous window's last second so words
+            # crossing the boundary are still seen whole
+            try:
+                overlap = self._windows[-1][-int(spotter.window * CANONICAL_SR):] if self._windows else samples[:0]
+                kw_ctx = AudioContext(np.concatenate([overlap, samples]), CANONICAL_SR)
+                kw_start = start - len(overlap) / CANONICAL_SR
+                detections = [dict(det, start=det['start'] + kw_start, end=det['end'] + kw_start,
+                                   score=det['score'] / 100) for det in spotter.detect(kw_ctx)]
+            except Exception as e:
+                print(f"Streaming keyword error: {e}")
+
+        with self._state_lock:
+            if segment_results:
+                self._segment_results.extend(segment_results)
+                self._bounds.append((start, start + duration))
+            if measures:
+                self._health.append((duration, measures))
+            self._detections.extend(detections)
+            self._windows.append(samples)
+            self._offset += duration
+
+    def live_health(self):
+        """Vocal health so far: duration-weighted measures of all windows"""
+        with self._state_lock:
+            health = list(self._health)
+        if not health:
+            return None
+
+        def weighted(name):
+            pairs = [(w, m[name]) for w, m in health if np.isfinite(m[name])]
+            total = sum(w for w, _ in pairs)
+            return sum(w * v for w, v in pairs) / total if total else float('nan')
+
+        pitch_values = np.concatenate([m['pitch_values'] for _, m in health])
+        return self.analyzer._score_vocal_health(
+            jitter=weighted('jitter'),
+            shimmer=weighted('shimmer'),
+            hnr_mean=weighted('hnr_mean'),
+            pitch_values=pitch_values
+        )
+
+    def updates(self):
+        """New emotion_timeline points since the last call plus a live snapshot"""
+        with self._state_lock:
+            timeline = self.analyzer._summarize_timeline(self._bounds, self._segment_results)
+            new_points = timeline['timeline'][self._sent:]
+            self._sent = len(timeline['timeline'])
+            duration = self._offset
+        health = self.live_health()
+        emotion = self.analyzer._pool_emotions(timeline)
+        return {
+            'emotion_timeline': new_points,
+            'live_analysis': {
+                'status': 'streaming',
+                'duration': round(duration, 2),
+                'emotion': emotion[0]['label'] if emotion else None,
+                'vocal_health_score': health['score'] if health else None,
+                'quality': ("good" if health['score'] > 70 else "needs improvement") if health else None
+            }
+        }
+
+    def finish(self):
+        """Process the last window and assemble the full analysis result"""
+        self.process_ready(final=True)
+        self.finished = True
+        with self._state_lock:
+            if not self._windows:
+                raise ValueError("No audio received")
+            ctx = AudioContext(np.concatenate(self._windows), CANONICAL_SR, source=f'stream:{self.id}')
+            precomputed = {}
+            if self._bounds:
+                precomputed['timeline'] = self.analyzer._summarize_timeline(self._bounds, self._segment_results)
+                precomputed['keywords'] = self.analyzer._summarize_keywords(
+                    self.analyzer.keyword_spotter.merge(self._detections))
+        health = self.live_health()
+        if health:
+            precomputed['health'] = health
+        return self.analyzer.analyze(ctx, precomputed=precomputed)
+
+
+class StreamingSessions:
+    """Registry of live sessions; idle ones are dropped after `idle_timeout`"""
+
+    def __init__(self, analyzer, max_sessions=8, idle_timeout=120, window=3.0, workers=2, max_seconds=600.0):
+        self.analyzer = analyzer
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.window = window
+        self.max_seconds = max_seconds
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='stream')
+
+    def create(self, sample_rate, sample_format='f32le'):
+        with self._lock:
+            self._evict()
+            if len(self._sessions) >= self.max_sessions:
+                return None
+            session = StreamingSession(self.analyzer, sample_rate, sample_format, self.window,
+                                       self.max_seconds)
+            self._sessions[session.id] = session
+            return session
+
+    def get(self, session_id):
+        with self._lock:
+            self._evict()
+            return self._sessions.get(session_id)
+
+    def feed(self, session, data):
+        """Buffer frames and process any complete windows in the background"""
+        received = session.feed(data)
+        self._pool.submit(session.process_ready)
+        return received
+
+    def close(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict(self):
+        now = time.time()
+        idle = [sid for sid, s in self._sessions.items() if now - s.last_active > self.idle_timeout]
+        for sid in idle:
+            del self._sessions[sid]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
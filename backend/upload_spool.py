@@ -0,0 +1,117 @@
+"""
+Upload Spool Module
+Reads an upload from the request stream, hashing it on the way. Small files
+stay in memory; large ones spill to a uniquely named temp file that is
+always removed
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+from audio_context import AudioContext, CANONICAL_SR
+from pcm_spool import SPOOL_DIR
+from long_audio import load_or_chunk, probe_duration
+
+
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024  # bytes kept in memory before spilling to disk
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadSpool:
+    """Upload bytes in memory (or a private temp file) plus their SHA-256"""
+
+    def __init__(self, stream, suffix='', max_memory=SPOOL_MAX_MEMORY):
+        self.suffix = suffix
+        self.size = 0
+        self.path = None
+        self._buffer = io.BytesIO()
+        self._file = None
+        digest = hashlib.sha256()
+        try:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                self.size += len(chunk)
+                if self._file is None and self.size > max_memory:
+                    self._spill()
+                (self._file or self._buffer).write(chunk)
+        except Exception:
+            self.close()
+            raise
+        if self._file is not None:
+            self._file.close()
+        self.sha256 = digest.hexdigest()
+
+    def _spill(self):
+        self._file = tempfile.NamedTemporaryFile(prefix='voice_upload_', suffix=self.suffix, delete=False,
+                                                 dir=SPOOL_DIR)
+        self.path = self._file.name
+        self._file.write(self._buffer.getvalue())
+        self._buffer = None
+
+    @property
+    def in_memory(self):
+        return self.path is None
+
+    def to_file(self):
+        """Path of the upload on disk, spilling an in-memory upload first"""
+        if self.in_memory:
+            self._spill()
+            self._file.close()
+        return self.path
+
+    def duration(self):
+        """Length in seconds from the header (see long_audio.probe_duration), or None
+
+        In-memory uploads are probed from memory and stay there.
+        """
+        if self.in_memory:
+            return probe_duration(data=self._buffer.getvalue())
+        return probe_duration(self.path)
+
+    def to_context(self, sr=CANONICAL_SR):
+        """Decode the upload into the analyzer's shared AudioContext
+
+        Spilled (large) uploads are decoded chunk by chunk into a
+        memory-mapped PCM spool instead of a full in-memory array.
+        """
+        if self.in_memory:
+            return AudioContext.from_bytes(self._buffer.getvalue(), sr=sr, source='upload')
+        return AudioContext.from_file(self.path, sr=sr, mapped=True)
+
+    def load_or_chunk(self, max_seconds, chunk_seconds):
+        """Stream-decode an upload of unknown length (see long_audio.load_or_chunk)
+
+        In-memory uploads are decoded from memory through ffmpeg's stdin and
+        touch the disk only if they run past `max_seconds`. Containers that
+        need seeking cannot be demuxed from a pipe; those are retried from
+        the spilled file.
+        """
+        if self.in_memory:
+            try:
+                return load_or_chunk(self._buffer.getvalue(), max_seconds, chunk_seconds)
+            except ValueError:
+                pass
+        return load_or_chunk(self.to_file(), max_seconds, chunk_seconds)
+
+    def close(self):
+        """Release the buffer and delete any spilled file"""
+        self._buffer = None
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        if self.path and os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                print(f"Could not remove upload spool {self.path}: {e}")
+        self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
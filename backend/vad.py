@@ -0,0 +1,79 @@
+"""
+Voice Activity Detection
+Finds the speech in a recording from short-time energy and zero-crossing
+rate, so the analysis stages can skip silence and background noise
+"""
+
+import numpy as np
+
+FRAME = 0.025          # seconds per analysis frame
+HOP = 0.010            # seconds between frames
+MARGIN_DB = 8.0        # speech must be this far above the noise floor...
+RANGE_DB = 45.0        # ...and no further than this below the loudest frames
+FLOOR_DB = -65.0       # ...and above this absolute level (dBFS)
+FRICATIVE_ZCR = 0.25   # quieter frames still count as speech at this crossing rate
+MIN_SILENCE = 0.30     # shorter pauses are bridged
+MIN_SPEECH = 0.15      # shorter bursts are dropped
+PADDING = 0.10         # seconds kept around each speech region
+
+
+def frame_features(y, sr, frame=FRAME, hop=HOP):
+    """Per-frame level (dBFS) and zero-crossing rate"""
+    frame_len = max(int(frame * sr), 1)
+    hop_len = max(int(hop * sr), 1)
+    if len(y) < frame_len:
+        y = np.pad(y, (0, frame_len - len(y)))
+    starts = np.arange(0, len(y) - frame_len + 1, hop_len)
+    ends = starts + frame_len
+
+    # Frame energies and crossing counts from running sums (no per-frame copies)
+    power = np.concatenate(([0.0], np.cumsum(np.square(y, dtype=np.float64))))
+    level_db = 10 * np.log10((power[ends] - power[starts]) / frame_len + 1e-10)
+    signs = np.signbit(y)
+    crossings = np.concatenate(([0], np.cumsum(signs[1:] != signs[:-1], dtype=np.int32)))
+    zcr = (crossings[ends - 1] - crossings[starts]) / max(frame_len - 1, 1)
+    return level_db, zcr
+
+
+def _runs(mask):
+    """(start, end) frame index pairs of the True runs in `mask`"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def detect_speech(y, sr, frame=FRAME, hop=HOP, features=None):
+    """Speech regions as a list of (start, end) seconds, sorted and disjoint
+
+    `features` may hold precomputed frame_features(y, sr, frame, hop).
+    """
+    if len(y) == 0:
+        return []
+    level_db, zcr = features if features is not None else frame_features(y, sr, frame, hop)
+    noise_db = np.percentile(level_db, 10)
+    peak_db = np.percentile(level_db, 99)
+    threshold = max(noise_db + MARGIN_DB, peak_db - RANGE_DB, FLOOR_DB)
+
+    # Voiced frames by level; unvoiced consonants are quieter but noisy
+    speech = (level_db > threshold) | ((level_db > threshold - MARGIN_DB / 2) & (zcr > FRICATIVE_ZCR))
+
+    # Bridge short pauses, then drop short bursts
+    for start, end in _runs(~speech):
+        if start > 0 and end < len(speech) and (end - start) * hop < MIN_SILENCE:
+            speech[start:end] = True
+    duration = len(y) / sr
+    regions = []
+    for start, end in _runs(speech):
+        if (end - start) * hop < MIN_SPEECH:
+            continue
+        begin = max(start * hop - PADDING, 0.0)
+        finish = min(end * hop + frame + PADDING, duration)
+        if regions and begin <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], finish)
+        else:
+            regions.append((begin, finish))
+    return regions
+
+
+def overlap(regions, start, end):
+    """Seconds of speech from `regions` that fall inside [start, end)"""
+    return sum(max(0.0, min(e, end) - max(s, start)) for s, e in regions)
@@ -3,125 +3,461 @@ Voice Analysis Module
 Analyzes audio files for emotion, vocal health, stress, personality, etc.
 """
 
-from transformers import pipeline
-import parselmouth
-import librosa
-import soundfile as sf
+from inference_backend import default_replicas, default_threads, load_pipeline, replicate
+from audio_context import AudioContext
+from keyword_spotter import KeywordSpotter
+from micro_batcher import MicroBatcher
+from stage_scheduler import StageScheduler, make_pools
+from segmenter import plan_segments
+from memo import KeyedMemo
+from metrics import STAGE_SECONDS
+from aggregates import RunningStats
+from vad import HOP
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import numpy as np
-import warnings
 import os
-import tempfile
+import parselmouth
+import threading
+import time
+import warnings
 warnings.filterwarnings('ignore')
 
+EMOTION_MODEL = "Hatman/audio-emotion-detection"
+KEYWORD_MODEL = "superb/wav2vec2-base-superb-ks"
+# Hub revisions the models are loaded at; set them to commit hashes to pin the
+# models. They are part of the result cache key, so changing one never serves
+# results of the other revision
+EMOTION_REVISION = os.environ.get('EMOTION_REVISION', 'main')
+KEYWORD_REVISION = os.environ.get('KEYWORD_REVISION', 'main')
+
+# Timeline segments (keyword windows) handed to the emotion (keyword) model
+# per call; long recordings are classified chunk by chunk so memory stays
+# flat as duration grows
+SEGMENT_CHUNK = 64
+# Shortest timeline segment target: ten VAD frames
+MIN_TIMELINE_WINDOW = 10 * HOP
+
+
+def load_models(backend='torch', timings=None, threads=None):
+    """The audio-classification pipelines used by the analysis, keyed by role
+
+    Seconds spent loading each one are recorded in `timings` when given;
+    `threads` caps the intra-op threads per forward pass.
+    """
+    models = {}
+    for role, model_id, revision in (('emotion', EMOTION_MODEL, EMOTION_REVISION),
+                                     ('keyword', KEYWORD_MODEL, KEYWORD_REVISION)):
+        start = time.perf_counter()
+        models[role] = load_pipeline(model_id, backend, threads=threads, revision=revision)
+        if timings is not None:
+            timings[f'{role}_model'] = round(time.perf_counter() - start, 3)
+    return models
+
+
+def run_detached_stage(method_name, ctx, vad=True):
+    """Run a model-free VoiceAnalyzer stage inside a worker process
+
+    The instance is created without __init__, so no models are loaded in
+    the worker; only stages that never touch the pipelines may run here.
+    """
+    analyzer = VoiceAnalyzer.__new__(VoiceAnalyzer)
+    analyzer.vad = vad
+    return getattr(analyzer, method_name)(ctx)
+
+
 class VoiceAnalyzer:
-    def __init__(self):
-        print("Loading AI models...")
+    def __init__(self, batch_size=8, keyword_hop=0.5, max_workers=4, process_workers=0,
+                 model_server=None, keyword_batch_size=16, batch_wait_ms=5.0, backend='torch',
+                 vad=True, timeline_window=3.0, timeline_overlap=0.5, replicas=None,
+                 inference_threads=None, max_concurrent=None):
+        # Max segments per padded forward pass through the emotion model
+        # (keyword windows: keyword_batch_size); concurrent analyses are
+        # micro-batched together for up to batch_wait_ms
+        self.batch_size = batch_size
+        self.batch_wait_ms = batch_wait_ms
+        # Independent stages run concurrently; process_workers > 0 moves the
+        # model-free librosa stages into a process pool
+        self.max_workers = max_workers
+        self.thread_pool, self.process_pool = make_pools(max_workers, process_workers)
+        # Skip silence: the acoustic stages, timeline and keywords only see speech
+        self.vad = vad
+        # Emotion timeline: one segment per ~timeline_window seconds of speech,
+        # cut at pauses; each segment's model input also gets
+        # timeline_overlap seconds of context shared with its neighbours
+        if timeline_window < MIN_TIMELINE_WINDOW or timeline_overlap < 0:
+            raise ValueError(f"timeline_window must be at least {MIN_TIMELINE_WINDOW}s "
+                             f"and timeline_overlap non-negative")
+        self.timeline_window = timeline_window
+        self.timeline_overlap = timeline_overlap
+        # Models are loaded on first use (or by warm_up()), not here, so the
+        # server can start answering health checks straight away
+        self.model_server = model_server
+        self.backend = backend  # 'torch', 'onnx' or 'onnx-int8' (see inference_backend.py)
+        self.keyword_hop = keyword_hop
+        self.keyword_batch_size = keyword_batch_size
+        self.load_times = {}
+        self._models = KeyedMemo()
+        # Concurrent analyze() calls are safe: each works on its own
+        # AudioContext and StageScheduler, and a pipeline is only called from
+        # its MicroBatcher worker thread. `replicas` pipelines per model (shared
+        # weights) run passes side by side on inference_threads intra-op
+        # threads each, so the cores are split instead of oversubscribed; at
+        # most max_concurrent analyses run at once, later ones wait their turn
+        self.replicas = replicas or default_replicas()
+        self.inference_threads = inference_threads or default_threads(self.replicas)
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+    
+    @property
+    def ready(self):
+        """True once the models are loaded (or the model server is connected)"""
+        return 'models' in self._models
+    
+    @property
+    def emotion_model(self):
+        return self.load_models()['emotion']
+    
+    @property
+    def keyword_model(self):
+        return self.load_models()['keyword']
+    
+    @property
+    def keyword_spotter(self):
+        return self.load_models()['spotter']
+    
+    def load_models(self):
+        """Load the models now; every later call returns them immediately"""
+        return self._models.get('models', self._load_models)
+    
+    def _load_models(self):
         try:
-            self.emotion_model = pipeline("audio-classification", model="Hatman/audio-emotion-detection")
-            self.keyword_model = pipeline("audio-classification", model="superb/wav2vec2-base-superb-ks")
+            if self.model_server:
+                # Models live in a shared model_server.py process
+                from model_server import RemoteModel
+                print(f"Connecting to model server at {self.model_server}...")
+                start = time.perf_counter()
+                emotion_model = RemoteModel(self.model_server, 'emotion')
+                keyword_model = RemoteModel(self.model_server, 'keyword')
+                self.backend = emotion_model.backend
+                self.load_times['model_server_connect'] = round(time.perf_counter() - start, 3)
+            else:
+                print(f"Loading AI models ({self.backend}, {self.replicas} replicas x "
+                      f"{self.inference_threads} threads)...")
+                models = load_models(self.backend, timings=self.load_times, threads=self.inference_threads)
+                emotion_model = MicroBatcher(replicate(models['emotion'], self.replicas),
+                                             max_batch=self.batch_size,
+                                             max_wait_ms=self.batch_wait_ms, name='emotion')
+                keyword_model = MicroBatcher(replicate(models['keyword'], self.replicas),
+                                             max_batch=self.keyword_batch_size,
+                                             max_wait_ms=self.batch_wait_ms, name='keyword')
+            spotter = KeywordSpotter(keyword_model, hop=self.keyword_hop, batch_size=self.keyword_batch_size,
+                                     speech_only=self.vad, chunk=SEGMENT_CHUNK)
             print("Models loaded successfully!")
         except Exception as e:
             print(f"Error loading models: {e}")
             raise
+        return {'emotion': emotion_model, 'keyword': keyword_model, 'spotter': spotter}
+    
+    def warm_up(self):
+        """Load the models and run one dummy inference through each
+
+        The first forward pass allocates buffers and picks kernels; doing it
+        here keeps that cost out of the first real request.
+        """
+        self.load_models()
+        start = time.perf_counter()
+        rng = np.random.default_rng(0)
+        for model in (self.emotion_model, self.keyword_model):
+            sr = self._model_rate(model)
+            model({"raw": (rng.standard_normal(sr) * 0.01).astype(np.float32), "sampling_rate": sr}, top_k=1)
+        self.load_times['warm_up'] = round(time.perf_counter() - start, 3)
+    
+    def cache_signature(self):
+        """Model ids, revisions and config that determine the analysis result
+
+        Built from the constants the models are loaded with, without touching
+        the models themselves, so a cold-start request can look
+        up (or queue) its analysis while they are still loading. With a
+        model server its address stands in for the backend, which is only
+        known once connected.
+        """
+        return {
+            'emotion_model': {'name': EMOTION_MODEL, 'revision': EMOTION_REVISION},
+            'keyword_model': {'name': KEYWORD_MODEL, 'revision': KEYWORD_REVISION},
+            'backend': f"server:{self.model_server}" if self.model_server else self.backend,
+            'batch_size': self.batch_size,
+            'keyword_hop': self.keyword_hop,
+            'vad': self.vad,
+            'timeline_window': self.timeline_window,
+            'timeline_overlap': self.timeline_overlap
+        }
+    
+    def batching_stats(self):
+        """Micro-batching counters and batch-size histograms per model"""
+        if not self.ready:
+            return {}
+        if isinstance(self.emotion_model, MicroBatcher):
+            return {'emotion': self.emotion_model.stats(), 'keyword': self.keyword_model.stats()}
+        return self.emotion_model.stats()  # RemoteModel: the server's batchers
+    
+    @contextmanager
+    def slot(self):
+        """Hold one of the max_concurrent analysis slots; yields the seconds spent waiting
+
+        Every entry point that runs the stages (analyze(), analyze_batch()'s
+        shared classification pass, long_audio's analyze_long) goes through
+        here, so together they never exceed max_concurrent.
+        """
+        waiting = time.perf_counter()
+        with self._slots:
+            yield time.perf_counter() - waiting
     
-    def analyze(self, audio_file):
-        """Main analysis function"""
+    def analyze(self, audio_file, precomputed=None):
+        """Main analysis function
+
+        `audio_file` may be a path or an already decoded AudioContext.
+        `precomputed` maps stage names to results that are already known
+        (e.g. built incrementally while streaming); those stages are skipped.
+        Seconds spent in each stage are returned in result['raw']['timings'],
+        including 'queue': the wait for one of the max_concurrent slots.
+        """
+        with self.slot() as queued:
+            return self._analyze(audio_file, precomputed, queued)
+    
+    def _analyze(self, audio_file, precomputed, queued):
         try:
-            print(f"Starting analysis of: {audio_file}")
-            
-            # Initialize result structure
-            result = {
-                "vocal_health_score": 0,
-                "emotion": "",
-                "stress_level": 0,
-                "timeline_emotion": "",
-                "issues_detected": [],
-                "early_illness_signals": [],
-                "personality_analysis": {},
-                "voice_age": 0,
-                "trigger_word_alert": [],
-                "suggestions": [],
-                "heatmap": {},
-                "live_analysis": {},
-                "raw": {}
-            }
-            
-            # 1. Emotion Detection
-            print("  → Analyzing emotion...")
-            emotion_data = self._analyze_emotion(audio_file)
-            result['emotion'] = emotion_data['emotion']
-            result['raw']['emotion'] = emotion_data
-            
-            # 2. Vocal Health Analysis
-            print("  → Analyzing vocal health...")
-            health_data = self._analyze_vocal_health(audio_file)
-            result['vocal_health_score'] = health_data['score']
-            result['issues_detected'] = health_data['issues']
-            result['early_illness_signals'] = health_data['illness_signals']
-            result['raw']['health'] = health_data
-            
-            # 3. Stress Level
-            print("  → Calculating stress level...")
-            stress_data = self._estimate_stress(emotion_data, health_data)
-            result['stress_level'] = stress_data['score']
-            result['stress_level_category'] = stress_data['level']
-            result['stress_components'] = stress_data['components']
-            
-            # 4. Timeline Analysis
-            print("  → Analyzing timeline...")
-            timeline_data = self._analyze_timeline(audio_file)
-            result['timeline_emotion'] = timeline_data['dominant']
-            result['heatmap'] = timeline_data['heatmap']
-            result['emotion_timeline'] = timeline_data['timeline']
-            result['emotion_distribution'] = timeline_data.get('emotion_distribution', {})
-            
-            # 5. Trigger Words
-            print("  → Detecting keywords...")
-            keywords = self._detect_keywords(audio_file)
-            result['trigger_word_alert'] = keywords
-            
-            # 6. Voice Age
-            print("  → Estimating voice age...")
-            age_data = self._estimate_age(audio_file)
-            result['voice_age'] = age_data['age']
-            result['age_confidence'] = age_data['confidence']
-            result['detected_gender'] = age_data['gender']
-            result['age_features'] = age_data.get('features', {})
-            
-            # 7. Personality Analysis
-            print("  → Analyzing personality...")
-            personality_data = self._analyze_personality(audio_file)
-            result['personality_analysis'] = {
-                'extraversion': personality_data['extraversion'],
-                'emotional_stability': personality_data['emotional_stability'],
-                'openness': personality_data['openness'],
-                'agreeableness': personality_data.get('agreeableness', 50),
-                'conscientiousness': personality_data.get('conscientiousness', 50)
-            }
-            result['personality_confidence'] = personality_data.get('confidence', 0.5)
+            print(f"Starting analysis of: {getattr(audio_file, 'source', audio_file)}")
+            started = time.perf_counter()
+            timings = {'queue': queued}
+            
+            # 0. Decode once - every stage below shares this buffer. Uploads
+            # usually arrive decoded already; the context carries the time its
+            # decode took, wherever that happened
+            print("  → Decoding audio...")
+            ctx = self._load_context(audio_file)
+            if ctx.decode_seconds is not None:
+                timings['decode'] = ctx.decode_seconds
+            
+            # Stages run as a dependency graph: independent stages in parallel,
+            # stress waits for emotion + health, emotion waits for the timeline
+            scheduler = StageScheduler(self.thread_pool, self.process_pool)
+            for name, stage_result in (precomputed or {}).items():
+                scheduler.preset(name, stage_result)
+            scheduler.add('timeline', self._analyze_timeline, ctx, label="Analyzing timeline")
+            scheduler.add('emotion', self._analyze_emotion, ctx, deps=['timeline'],
+                          label="Analyzing emotion")
+            scheduler.add('health', self._analyze_vocal_health, ctx, label="Analyzing vocal health")
+            scheduler.add('stress', self._estimate_stress, deps=['emotion', 'health'],
+                          label="Calculating stress level")
+            scheduler.add('keywords', self._detect_keywords, ctx, label="Detecting keywords")
+            scheduler.add('age', self._estimate_age, ctx, label="Estimating voice age")
+            if self.process_pool:
+                scheduler.add('personality', run_detached_stage, '_analyze_personality', ctx, self.vad,
+                              label="Analyzing personality", process=True)
+            else:
+                scheduler.add('personality', self._analyze_personality, ctx,
+                              label="Analyzing personality")
+            stages = scheduler.run()
+            timings.update(scheduler.timings)
             
-            # 8. Suggestions
-            print("  → Generating suggestions...")
-            result['suggestions'] = self._generate_suggestions(result)
+            result = self._build_result(stages, self._get_duration(ctx), timings)
             
-            # 9. Live Analysis
-            result['live_analysis'] = {
-                "status": "completed",
-                "duration": self._get_duration(audio_file),
-                "quality": "good" if result['vocal_health_score'] > 70 else "needs improvement"
-            }
+            timings['total'] = time.perf_counter() - started
+            for stage, seconds in timings.items():
+                STAGE_SECONDS.observe(seconds, stage=stage)
+            result['raw']['timings'] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
             
-            print("✓ Analysis complete!")
+            print(f"✓ Analysis complete! ({timings['total']:.2f}s)")
             return result
             
         except Exception as e:
             print(f"Analysis error: {e}")
             raise
     
-    def _analyze_emotion(self, audio_file):
-        """Detect emotion from audio"""
+    def _build_result(self, stages, duration, timings=None):
+        """Assemble the API result from the stage outputs
+
+        `stages` maps timeline, emotion, health, stress, keywords, age and
+        personality to their results for a recording `duration` seconds long.
+        """
+        # Initialize result structure
+        result = {
+            "vocal_health_score": 0,
+            "emotion": "",
+            "stress_level": 0,
+            "timeline_emotion": "",
+            "issues_detected": [],
+            "early_illness_signals": [],
+            "personality_analysis": {},
+            "voice_age": 0,
+            "trigger_word_alert": [],
+            "suggestions": [],
+            "heatmap": {},
+            "live_analysis": {},
+            "raw": {}
+        }
+        
+        # 1. Timeline Analysis (one batched pass over all segments)
+        timeline_data = stages['timeline']
+        result['timeline_emotion'] = timeline_data['dominant']
+        result['heatmap'] = timeline_data['heatmap']
+        result['emotion_timeline'] = timeline_data['timeline']
+        result['emotion_distribution'] = timeline_data.get('emotion_distribution', {})
+        
+        # 2. Emotion Detection (pooled from the timeline segments)
+        emotion_data = stages['emotion']
+        result['emotion'] = emotion_data['emotion']
+        result['raw']['emotion'] = emotion_data
+        
+        # 3. Vocal Health Analysis
+        health_data = stages['health']
+        result['vocal_health_score'] = health_data['score']
+        result['issues_detected'] = health_data['issues']
+        result['early_illness_signals'] = health_data['illness_signals']
+        result['raw']['health'] = health_data
+        
+        # 4. Stress Level
+        stress_data = stages['stress']
+        result['stress_level'] = stress_data['score']
+        result['stress_level_category'] = stress_data['level']
+        result['stress_components'] = stress_data['components']
+        
+        # 5. Trigger Words
+        keyword_data = stages['keywords']
+        result['trigger_word_alert'] = keyword_data['keywords']
+        result['trigger_word_detections'] = keyword_data['detections']
+        
+        # 6. Voice Age
+        age_data = stages['age']
+        result['voice_age'] = age_data['age']
+        result['age_confidence'] = age_data['confidence']
+        result['detected_gender'] = age_data['gender']
+        result['age_features'] = age_data.get('features', {})
+        
+        # 7. Personality Analysis
+        personality_data = stages['personality']
+        result['personality_analysis'] = {
+            'extraversion': personality_data['extraversion'],
+            'emotional_stability': personality_data['emotional_stability'],
+            'openness': personality_data['openness'],
+            'agreeableness': personality_data.get('agreeableness', 50),
+            'conscientiousness': personality_data.get('conscientiousness', 50)
+        }
+        result['personality_confidence'] = personality_data.get('confidence', 0.5)
+        
+        # 8. Suggestions
+        print("  → Generating suggestions...")
+        step = time.perf_counter()
+        result['suggestions'] = self._generate_suggestions(result)
+        if timings is not None:
+            timings['suggestions'] = time.perf_counter() - step
+        
+        # 9. Live Analysis
+        result['live_analysis'] = {
+            "status": "completed",
+            "duration": duration,
+            "quality": "good" if result['vocal_health_score'] > 70 else "needs improvement"
+        }
+        
+        return result
+    
+    def analyze_batch(self, audio_files, workers=None):
+        """Analyze several recordings, batching emotion inference across files
+
+        Every timeline segment of every file goes through the emotion model
+        in shared padded batches; the acoustic stages then run per file on a
+        pool of `workers` threads. Returns one entry per input, in order:
+        the result dict, or the exception raised for that file.
+        """
+        workers = workers or self.max_workers
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch') as pool:
+            # 1. Decode every file (failures are reported per file)
+            contexts = list(pool.map(self._try_load_context, audio_files))
+            
+            # 2. One batched pass over the timeline segments of all files,
+            #    counted against max_concurrent like any other analysis
+            print(f"  → Classifying timeline segments of {len(audio_files)} files...")
+            with self.slot():
+                bounds = {i: self._timeline_bounds(ctx) for i, ctx in enumerate(contexts)
+                          if isinstance(ctx, AudioContext)}
+                flat = [(i, start, end) for i, file_bounds in bounds.items() for start, end in file_bounds]
+                scores = self._classify_inputs([(contexts[i], start, end) for i, start, end in flat])
+            per_file = {i: [] for i in bounds}
+            for (i, _, _), segment_result in zip(flat, scores):
+                per_file[i].append(segment_result)
+            
+            # 3. Remaining stages per file, several files at a time
+            def finish(i):
+                ctx = contexts[i]
+                if not isinstance(ctx, AudioContext):
+                    return ctx
+                timeline = self._summarize_timeline(bounds[i], per_file[i])
+                try:
+                    return self.analyze(ctx, precomputed={'timeline': timeline})
+                except Exception as e:
+                    return e
+            return list(pool.map(finish, range(len(contexts))))
+    
+    def _try_load_context(self, audio_file):
+        try:
+            return self._load_context(audio_file)
+        except Exception as e:
+            return e
+    
+    def _load_context(self, audio_file):
+        """Return a shared AudioContext, decoding `audio_file` if needed"""
+        if isinstance(audio_file, AudioContext):
+            return audio_file
+        try:
+            return AudioContext.from_file(audio_file)
+        except Exception as e:
+            print(f"✗ Audio decoding failed: {e}")
+            print(f"  File: {audio_file}")
+            print(f"  Tip: Ensure the audio file is valid and not corrupted")
+            raise ValueError(f"Could not process audio file: {e}")
+    
+    def _speech(self, ctx):
+        """Speech-only view of `ctx` for the acoustic stages (ctx itself without VAD)"""
+        return ctx.speech() if self.vad else ctx
+    
+    def _model_rate(self, model):
+        """Sampling rate the pipeline's feature extractor expects"""
+        return getattr(getattr(model, 'feature_extractor', None), 'sampling_rate', 16000)
+    
+    def _num_labels(self, model):
+        """Number of classes, so pipelines return the full score distribution"""
+        id2label = getattr(getattr(getattr(model, 'model', None), 'config', None), 'id2label', None)
+        return len(id2label) if id2label else 10
+    
+    def _pool_emotions(self, timeline_data):
+        """Whole-clip emotion scores pooled from the timeline segment scores"""
+        scores = timeline_data.get('segment_scores') or []
+        weights = timeline_data.get('segment_weights') or [1.0] * len(scores)
+        pooled = {}
+        total = 0.0
+        for segment, weight in zip(scores, weights):
+            if not segment:
+                continue
+            total += weight
+            for label, score in segment.items():
+                pooled[label] = pooled.get(label, 0.0) + score * weight
+        if total == 0:
+            return []
+        ranked = sorted(pooled.items(), key=lambda item: item[1], reverse=True)
+        return [{'label': label, 'score': score / total} for label, score in ranked]
+    
+    def _analyze_emotion(self, ctx, timeline_data=None):
+        """Detect emotion from audio
+
+        When timeline segment scores are available the whole-clip emotion is
+        pooled from them (duration-weighted) instead of running another
+        forward pass over the full recording.
+        """
         try:
-            results = self.emotion_model(audio_file)
+            results = self._pool_emotions(timeline_data) if timeline_data else []
+            if not results:
+                results = self.emotion_model(ctx.model_input(self._model_rate(self.emotion_model)))
             return {
                 'emotion': results[0]['label'],
                 'confidence': round(results[0]['score'] * 100, 2),
@@ -131,27 +467,62 @@ class VoiceAnalyzer:
             print(f"Emotion analysis error: {e}")
             return {'emotion': 'neutral', 'confidence': 0, 'all_emotions': []}
     
-    def _analyze_vocal_health(self, audio_file):
+    def _analyze_vocal_health(self, ctx):
         """Analyze vocal health metrics"""
         try:
-            # Convert audio to compatible format for parselmouth
-            audio_file = self._ensure_compatible_audio(audio_file)
-            sound = parselmouth.Sound(audio_file)
-            
-            # Pitch analysis
-            pitch = sound.to_pitch()
-            pitch_values = pitch.selected_array['frequency']
-            pitch_values = pitch_values[pitch_values > 0]
-            
-            # Harmonics-to-Noise Ratio
-            harmonicity = sound.to_harmonicity()
-            hnr_values = harmonicity.values[harmonicity.values != -200]
-            hnr_mean = np.mean(hnr_values) if len(hnr_values) > 0 else 0
-            
-            # Jitter and Shimmer
-            point_process = parselmouth.praat.call(sound, "To PointProcess (periodic, cc)", 75, 600)
-            jitter = parselmouth.praat.call(point_process, "Get jitter (local)", 0, 0, 0.0001, 0.02, 1.3)
-            shimmer = parselmouth.praat.call([sound, point_process], "Get shimmer (local)", 0, 0, 0.0001, 0.02, 1.3, 1.6)
+            measures = self._vocal_health_measures(ctx)
+            return self._score_vocal_health(**measures)
+        except Exception as e:
+            print(f"Vocal health error: {e}")
+            return {'score': 0, 'issues': ['Analysis failed'], 'illness_signals': [], 'metrics': {}}
+    
+    def _vocal_health_measures(self, ctx):
+        """Raw Praat measures behind the vocal health score (may contain NaN)"""
+        praat = self._speech(ctx).praat
+        
+        # Pitch analysis
+        pitch_values = praat.voiced_pitch()
+        
+        # Harmonics-to-Noise Ratio
+        harmonicity = praat.harmonicity()
+        hnr_values = harmonicity.values[harmonicity.values != -200]
+        hnr_mean = np.mean(hnr_values) if len(hnr_values) > 0 else 0
+        
+        # Jitter and Shimmer (shared with age estimation)
+        jitter, shimmer = self._perturbation(ctx)
+        return {
+            'jitter': jitter,
+            'shimmer': shimmer,
+            'hnr_mean': hnr_mean,
+            'pitch_values': pitch_values
+        }
+    
+    def _perturbation(self, ctx):
+        """Jitter and shimmer of the speech in `ctx`
+
+        The glottal pulses come from the joined speech (the silence never
+        reaches Praat), but each speech region is measured on its own span
+        of it, so the period across a join between two regions never counts.
+        """
+        speech = self._speech(ctx)
+        regions = None
+        if speech is not ctx:
+            # Where each region landed in the joined signal
+            regions, offset = [], 0.0
+            for start, end in ctx.speech_segments():
+                length = len(ctx.slice(start, end)) / ctx.sr
+                regions.append((offset, offset + length))
+                offset += length
+        return speech.praat.jitter(regions=regions), speech.praat.shimmer(regions=regions)
+    
+    def _score_vocal_health(self, jitter, shimmer, hnr_mean, pitch_values):
+        """Health score, issues and metrics from the raw measures
+
+        `pitch_values` is an array of voiced F0 values or their RunningStats
+        (merged across the chunks of a long recording).
+        """
+        try:
+            pitch = pitch_values if isinstance(pitch_values, RunningStats) else RunningStats.of(pitch_values)
             
             # Handle NaN values
             if np.isnan(jitter) or np.isinf(jitter):
@@ -183,8 +554,8 @@ class VoiceAnalyzer:
                 issues.append("Low HNR - rough or breathy voice")
                 illness_signals.append("Possible respiratory issue")
             
-            if len(pitch_values) > 0:
-                pitch_std = np.std(pitch_values)
+            if pitch.count > 0:
+                pitch_std = pitch.std
                 if pitch_std > 50:
                     issues.append("High pitch variation - emotional stress")
             
@@ -196,7 +567,7 @@ class VoiceAnalyzer:
                     'jitter': round(float(jitter), 4) if not np.isnan(jitter) else 0,
                     'shimmer': round(float(shimmer), 4) if not np.isnan(shimmer) else 0,
                     'hnr': round(float(hnr_mean), 2) if not np.isnan(hnr_mean) else 0,
-                    'pitch_mean': round(float(np.mean(pitch_values)), 2) if len(pitch_values) > 0 and not np.isnan(np.mean(pitch_values)) else 0
+                    'pitch_mean': round(float(pitch.mean), 2) if pitch.count > 0 else 0
                 }
             }
         except Exception as e:
@@ -282,114 +653,124 @@ class VoiceAnalyzer:
             }
         }
     
-    def _analyze_timeline(self, audio_file):
+    def _analyze_timeline(self, ctx):
         """Analyze emotion timeline with actual segmentation and analysis"""
         try:
-            y, sr = librosa.load(audio_file)
-            duration = len(y) / sr
-            
-            # Dynamic segmentation based on duration
-            if duration < 5:
-                segments = 3
-            elif duration < 15:
-                segments = 5
-            else:
-                segments = min(10, int(duration / 3))  # Max 10 segments
-            
-            segment_duration = duration / segments
-            timeline = []
-            emotion_counts = {}
-            
-            # Create temporary directory for segments
-            import tempfile
-            temp_dir = tempfile.mkdtemp()
-            
-            for i in range(segments):
-                start_sample = int(i * segment_duration * sr)
-                end_sample = int((i + 1) * segment_duration * sr)
-                segment_audio = y[start_sample:end_sample]
-                
-                # Save segment temporarily
-                segment_path = os.path.join(temp_dir, f'segment_{i}.wav')
-                sf.write(segment_path, segment_audio, sr)
-                
-                # Analyze emotion for this segment
-                try:
-                    segment_emotion_results = self.emotion_model(segment_path)
-                    segment_emotion = segment_emotion_results[0]['label']
-                    segment_confidence = round(segment_emotion_results[0]['score'] * 100, 2)
-                except Exception as seg_error:
-                    print(f"Segment {i} emotion error: {seg_error}")
-                    segment_emotion = 'neutral'
-                    segment_confidence = 50
-                
-                # Count emotions for dominant calculation
-                emotion_counts[segment_emotion] = emotion_counts.get(segment_emotion, 0) + 1
-                
-                timeline.append({
-                    'time': f"{i * segment_duration:.1f}s",
-                    'emotion': segment_emotion,
-                    'confidence': segment_confidence
-                })
-                
-                # Clean up segment file
-                try:
-                    os.remove(segment_path)
-                except:
-                    pass
+            bounds = self._timeline_bounds(ctx)
             
-            # Clean up temp directory
-            try:
-                os.rmdir(temp_dir)
-            except:
-                pass
-            
-            # Find dominant emotion
-            dominant_emotion = max(emotion_counts, key=emotion_counts.get) if emotion_counts else 'neutral'
-            
-            # Create heatmap data
-            heatmap = {
-                'times': [t['time'] for t in timeline],
-                'emotions': [t['emotion'] for t in timeline],
-                'confidences': [t['confidence'] for t in timeline]
-            }
-            
-            return {
-                'dominant': dominant_emotion,
-                'timeline': timeline,
-                'heatmap': heatmap,
-                'emotion_distribution': emotion_counts
-            }
+            # Segments go through the model as in-memory arrays in padded batches
+            segment_results = self._classify_segments(ctx, bounds)
+            return self._summarize_timeline(bounds, segment_results)
         except Exception as e:
             print(f"Timeline error: {e}")
             import traceback
             traceback.print_exc()
             return {'dominant': 'neutral', 'timeline': [], 'heatmap': {}, 'emotion_distribution': {}}
     
-    def _detect_keywords(self, audio_file):
-        """Detect trigger words"""
+    def _timeline_bounds(self, ctx):
+        """(start, end) seconds of each timeline segment, cut at pauses (see segmenter.py)"""
+        regions = ctx.speech_segments() if self.vad else []
+        if sum(end - start for start, end in regions) < 0.25:
+            regions = [(0.0, ctx.duration)]
+        level_db, _ = ctx.frame_features()
+        return plan_segments(regions, level_db, HOP, target=self.timeline_window)
+    
+    def _classify_segments(self, ctx, bounds):
+        """Full emotion score lists for each (start, end) segment, batched"""
+        return self._classify_inputs([(ctx, start, end) for start, end in bounds])
+    
+    def _classify_inputs(self, segments):
+        """Emotion scores for (ctx, start, end) segments, possibly from several files
+
+        Each segment is widened by half the timeline overlap on both sides
+        (within its recording) and at most SEGMENT_CHUNK segments are sliced
+        and classified at a time.
+        """
+        rate = self._model_rate(self.emotion_model)
+        pad = self.timeline_overlap / 2
+        results = []
+        for i in range(0, len(segments), SEGMENT_CHUNK):
+            chunk = segments[i:i + SEGMENT_CHUNK]
+            try:
+                results += self.emotion_model(
+                    [ctx.model_input(rate, max(start - pad, 0.0), min(end + pad, ctx.duration))
+                     for ctx, start, end in chunk],
+                    batch_size=self.batch_size,
+                    top_k=self._num_labels(self.emotion_model)
+                )
+            except Exception as seg_error:
+                print(f"Segment emotion error: {seg_error}")
+                results += [[] for _ in chunk]
+        return results
+    
+    def _summarize_timeline(self, bounds, segment_results):
+        """Timeline, heatmap and distribution from classified segments"""
+        timeline = []
+        emotion_counts = {}
+        segment_scores = []
+        for (start, end), results in zip(bounds, segment_results):
+            if results:
+                segment_emotion = results[0]['label']
+                segment_confidence = round(results[0]['score'] * 100, 2)
+            else:
+                segment_emotion = 'neutral'
+                segment_confidence = 50
+            segment_scores.append({r['label']: r['score'] for r in results})
+            
+            # Count emotions for dominant calculation
+            emotion_counts[segment_emotion] = emotion_counts.get(segment_emotion, 0) + 1
+            
+            timeline.append({
+                'time': f"{start:.1f}s",
+                'emotion': segment_emotion,
+                'confidence': segment_confidence
+            })
+        
+        # Find dominant emotion
+        dominant_emotion = max(emotion_counts, key=emotion_counts.get) if emotion_counts else 'neutral'
+        
+        # Create heatmap data
+        heatmap = {
+            'times': [t['time'] for t in timeline],
+            'emotions': [t['emotion'] for t in timeline],
+            'confidences': [t['confidence'] for t in timeline]
+        }
+        
+        return {
+            'dominant': dominant_emotion,
+            'timeline': timeline,
+            'heatmap': heatmap,
+            'emotion_distribution': emotion_counts,
+            'segment_scores': segment_scores,
+            'segment_weights': [end - start for start, end in bounds]
+        }
+    
+    def _detect_keywords(self, ctx):
+        """Detect trigger words with a sliding 1 s window over the speech"""
         try:
-            results = self.keyword_model(audio_file)
-            keywords = [r['label'] for r in results if r['score'] > 0.5]
-            return keywords[:5]  # Top 5
+            return self._summarize_keywords(self.keyword_spotter.detect(ctx))
         except Exception as e:
             print(f"Keyword detection error: {e}")
-            return []
+            return {'keywords': [], 'detections': []}
     
-    def _estimate_age(self, audio_file):
+    def _summarize_keywords(self, detections):
+        """Distinct keywords (strongest first) plus the timestamped detections"""
+        best = {}
+        for det in detections:
+            best[det['keyword']] = max(best.get(det['keyword'], 0), det['score'])
+        keywords = sorted(best, key=best.get, reverse=True)
+        return {'keywords': keywords[:5], 'detections': detections}  # Top 5
+    
+    def _estimate_age(self, ctx):
         """Estimate voice age using multiple acoustic features"""
         try:
-            # Convert audio to compatible format
-            audio_file = self._ensure_compatible_audio(audio_file)
-            sound = parselmouth.Sound(audio_file)
-            
-            # Load with librosa for additional features
-            y, sr = librosa.load(audio_file)
+            # Praat objects and STFT of the speech only, shared with the other stages
+            speech = self._speech(ctx)
+            praat = speech.praat
+            spectral = speech.spectral
             
-            # Feature 1: Pitch analysis
-            pitch = sound.to_pitch()
-            pitch_values = pitch.selected_array['frequency']
-            pitch_values = pitch_values[pitch_values > 0]
+            # Feature 1: Pitch analysis (cached from vocal health)
+            pitch_values = praat.voiced_pitch()
             
             if len(pitch_values) == 0:
                 return {"age": 30, "confidence": 0.3, "gender": "unknown"}
@@ -398,27 +779,17 @@ class VoiceAnalyzer:
             pitch_std = np.std(pitch_values)
             
             # Feature 2: Formant frequencies (vocal tract length indicator)
-            formants = sound.to_formant_burg()
-            f1_values = []
-            f2_values = []
-            
-            for i in range(formants.get_number_of_frames()):
-                f1 = formants.get_value_at_time(1, formants.get_time_from_frame_number(i + 1))
-                f2 = formants.get_value_at_time(2, formants.get_time_from_frame_number(i + 1))
-                if f1 and not np.isnan(f1):
-                    f1_values.append(f1)
-                if f2 and not np.isnan(f2):
-                    f2_values.append(f2)
+            # F1-F4 for every frame at once (NaN where undefined)
+            tracks = praat.formant_tracks()
+            f1_values = tracks[0][np.isfinite(tracks[0])]
+            f2_values = tracks[1][np.isfinite(tracks[1])]
             
-            mean_f1 = np.mean(f1_values) if f1_values else 500
-            mean_f2 = np.mean(f2_values) if f2_values else 1500
+            mean_f1 = np.mean(f1_values) if len(f1_values) > 0 else 500
+            mean_f2 = np.mean(f2_values) if len(f2_values) > 0 else 1500
             
             # Feature 3: Jitter (voice quality - increases with age)
-            point_process = parselmouth.praat.call(sound, "To PointProcess (periodic, cc)", 75, 600)
-            jitter = parselmouth.praat.call(point_process, "Get jitter (local)", 0, 0, 0.0001, 0.02, 1.3)
-            
             # Feature 4: Shimmer (amplitude variation - increases with age)
-            shimmer = parselmouth.praat.call([sound, point_process], "Get shimmer (local)", 0, 0, 0.0001, 0.02, 1.3, 1.6)
+            jitter, shimmer = self._perturbation(ctx)
             
             # Handle NaN values
             if np.isnan(jitter) or np.isinf(jitter):
@@ -431,15 +802,15 @@ class VoiceAnalyzer:
                 pitch_std = 30
             
             # Feature 5: Speaking rate approximation
-            intensity = sound.to_intensity()
+            intensity = praat.intensity()
             intensity_values = intensity.values[0]
             intensity_threshold = np.mean(intensity_values) - np.std(intensity_values)
             voiced_frames = np.sum(intensity_values > intensity_threshold)
             speaking_rate = voiced_frames / len(intensity_values) if len(intensity_values) > 0 else 0.5
             
             # Feature 6: Spectral features
-            spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))
-            spectral_rolloff = np.mean(librosa.feature.spectral_rolloff(y=y, sr=sr))
+            spectral_centroid = np.mean(spectral.centroid())
+            spectral_rolloff = np.mean(spectral.rolloff())
             
             # Gender estimation (helps with age accuracy)
             if mean_pitch > 165:
@@ -551,60 +922,63 @@ class VoiceAnalyzer:
             print(f"Age estimation error: {e}")
             return {"age": 30, "confidence": 0.2, "gender": "unknown", "features": {}}
     
-    def _analyze_personality(self, audio_file):
+    def _analyze_personality(self, ctx):
         """Enhanced personality analysis using multiple acoustic features"""
         try:
-            y, sr = librosa.load(audio_file)
+            # One STFT/mel spectrogram of the speech shared by every spectral feature below
+            speech = self._speech(ctx)
+            spectral = speech.spectral
             
             # Feature 1: Speaking rate and energy (Extraversion)
+            # Syllable nuclei from the shared Praat intensity/pitch contours,
+            # per second of the whole recording (pauses included); Praat
+            # rejects speech too short for its contours, which counts as none
             try:
-                tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-            except (AttributeError, Exception) as e:
-                print(f"Beat tracking failed, using alternative: {e}")
-                # Alternative: use zero-crossing rate for tempo estimation
-                zcr = librosa.feature.zero_crossing_rate(y)
-                tempo = np.mean(zcr) * 1000  # Normalize to tempo-like range
+                speaking_rate = len(speech.praat.syllable_nuclei()) / ctx.duration if ctx.duration else 0
+            except parselmouth.PraatError as rate_error:
+                print(f"Speaking rate error: {rate_error}")
+                speaking_rate = 0
             
-            energy = np.mean(librosa.feature.rms(y=y))
+            rms = spectral.rms()
+            energy = np.mean(rms)
             
             # Feature 2: Pitch variation (Emotional expressiveness)
-            pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-            pitch_values = []
-            for t in range(pitches.shape[1]):
-                index = magnitudes[:, t].argmax()
-                pitch = pitches[index, t]
-                if pitch > 0:
-                    pitch_values.append(pitch)
+            pitches, magnitudes = spectral.piptrack()
+            # Strongest bin of every frame in one argmax + gather
+            strongest = magnitudes.argmax(axis=0)
+            pitch_track = pitches[strongest, np.arange(pitches.shape[1])]
+            pitch_values = pitch_track[pitch_track > 0]
+            del pitches, magnitudes
             
             pitch_std = np.std(pitch_values) if len(pitch_values) > 0 else 20
             pitch_mean = np.mean(pitch_values) if len(pitch_values) > 0 else 150
             
             # Feature 3: Spectral features
-            spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))
-            spectral_bandwidth = np.mean(librosa.feature.spectral_bandwidth(y=y, sr=sr))
-            spectral_rolloff = np.mean(librosa.feature.spectral_rolloff(y=y, sr=sr))
+            spectral_centroid = np.mean(spectral.centroid())
+            spectral_bandwidth = np.mean(spectral.bandwidth())
+            spectral_rolloff = np.mean(spectral.rolloff())
             
             # Feature 4: MFCCs for voice quality
-            mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+            mfccs = spectral.mfcc(n_mfcc=13)
             mfcc_mean = np.mean(mfccs, axis=1)
             mfcc_std = np.std(mfccs, axis=1)
             
-            # Feature 5: Pause analysis (speaking pattern)
-            rms = librosa.feature.rms(y=y)[0]
-            silence_threshold = np.mean(rms) * 0.3
-            silence_frames = np.sum(rms < silence_threshold)
-            speech_frames = len(rms) - silence_frames
-            speech_ratio = speech_frames / len(rms) if len(rms) > 0 else 0.5
+            # Feature 5: Pause analysis (speaking pattern) from the VAD;
+            # without it, frames above 30% of the mean RMS count as speech
+            if self.vad:
+                speech_ratio = ctx.speech_ratio
+            else:
+                speech_ratio = np.mean(rms >= np.mean(rms) * 0.3) if len(rms) > 0 else 0.5
             
             # Feature 6: Dynamic range
             dynamic_range = np.max(rms) - np.min(rms) if len(rms) > 0 else 0
             
             # EXTRAVERSION (outgoing, energetic, talkative)
-            # Higher tempo, energy, speech ratio = more extraverted
-            tempo_score = min(tempo / 150 * 40, 40)  # Max 40 points
+            # Higher speaking rate, energy, speech ratio = more extraverted
+            rate_score = min(speaking_rate / 6 * 40, 40)  # Max 40 points (~6 syllables/s)
             energy_score = min(energy * 500, 30)      # Max 30 points
             speech_score = speech_ratio * 30         # Max 30 points
-            extraversion = tempo_score + energy_score + speech_score
+            extraversion = rate_score + energy_score + speech_score
             extraversion = np.clip(extraversion, 0, 100)
             
             # EMOTIONAL STABILITY (calm, stable, consistent)
@@ -645,7 +1019,7 @@ class VoiceAnalyzer:
                 'conscientiousness': round(float(conscientiousness), 2),
                 'confidence': 0.65,  # Moderate confidence for personality
                 'acoustic_features': {
-                    'tempo': round(float(tempo), 2),
+                    'speaking_rate': round(float(speaking_rate), 2),
                     'energy': round(float(energy), 4),
                     'pitch_std': round(float(pitch_std), 2),
                     'speech_ratio': round(float(speech_ratio), 2),
@@ -687,42 +1061,9 @@ class VoiceAnalyzer:
         
         return suggestions
     
-    def _get_duration(self, audio_file):
+    def _get_duration(self, ctx):
         """Get audio duration in seconds"""
         try:
-            y, sr = librosa.load(audio_file)
-            return round(len(y) / sr, 2)
+            return round(ctx.duration, 2)
         except:
             return 0
-    
-    def _ensure_compatible_audio(self, audio_file):
-        """Convert audio to format compatible with parselmouth (16-bit PCM WAV)"""
-        try:
-            # Try to load with parselmouth first
-            parselmouth.Sound(audio_file)
-            return audio_file
-        except Exception as e:
-            print(f"Converting audio format for compatibility: {e}")
-            try:
-                # Load with librosa and convert
-                y, sr = librosa.load(audio_file, sr=16000)
-                
-                # Check if audio was actually loaded
-                if len(y) == 0:
-                    raise ValueError("Audio file is empty or unreadable")
-                
-                # Create temporary WAV file
-                temp_wav = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-                temp_wav_path = temp_wav.name
-                temp_wav.close()
-                
-                # Save as 16-bit PCM WAV
-                sf.write(temp_wav_path, y, sr, subtype='PCM_16')
-                
-                print(f"✓ Audio converted successfully: {len(y)} samples at {sr}Hz")
-                return temp_wav_path
-            except Exception as conv_error:
-                print(f"✗ Audio conversion failed: {conv_error}")
-                print(f"  File: {audio_file}")
-                print(f"  Tip: Ensure the audio file is valid and not corrupted")
-                raise ValueError(f"Could not process audio file: {conv_error}")
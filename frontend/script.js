@@ -23,6 +23,12 @@ let audioContext = null;
 let analyser = null;
 let microphone = null;
 let analysisData = null; // Store the complete analysis data for chatbot
+let liveSessionId = null;   // Streaming session while recording
+let liveProcessor = null;
+let liveFrames = [];
+let liveFlushInterval = null;
+let liveSendChain = Promise.resolve();
+let liveResult = null;      // Full result returned when the live session stops
 
 // DOM Elements
 const fileInput = document.getElementById('fileInput');
@@ -39,6 +45,7 @@ fileInput.addEventListener('change', (e) => {
     if (file) {
         selectedFile = file;
         recordedBlob = null;
+        liveResult = null;
         fileInfo.textContent = `Selected: ${file.name}`;
         analyzeBtn.disabled = false;
     }
@@ -70,12 +77,18 @@ recordBtn.addEventListener('click', async () => {
             
             // Setup volume meter
             setupVolumeMeter(stream);
+            
+            // Stream PCM to the backend while recording (falls back to upload if unavailable)
+            startLiveStream();
 
             mediaRecorder.ondataavailable = (event) => {
                 audioChunks.push(event.data);
             };
 
             mediaRecorder.onstop = async () => {
+                // Send the last frames and collect the live analysis result
+                const liveDone = finishLiveStream();
+                
                 // Create blob from recorded chunks
                 const mimeType = mediaRecorder.mimeType || 'audio/webm';
                 const rawBlob = new Blob(audioChunks, { type: mimeType });
@@ -88,6 +101,14 @@ recordBtn.addEventListener('click', async () => {
                     
                     // Normalize audio to boost quiet recordings
                     const normalizedBuffer = await normalizeAudio(audioBuffer, audioContext);
+                    if (normalizedBuffer !== audioBuffer) {
+                        // The live session saw the raw, quiet microphone level;
+                        // analyse the boosted recording through the upload path instead
+                        liveDone.then(() => {
+                            liveResult = null;
+                            recordInfo.textContent = 'Recording ready for analysis';
+                        });
+                    }
                     
                     // Convert AudioBuffer to WAV
                     recordedBlob = audioBufferToWav(normalizedBuffer);
@@ -125,6 +146,86 @@ recordBtn.addEventListener('click', async () => {
     }
 });
 
+// Poll a queued analysis job until it finishes
+async function pollAnalysisJob(jobId, intervalMs = 1000) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+        
+        const response = await fetch(`${API_URL}/analyze/jobs/${jobId}`, {
+            mode: 'cors',
+            credentials: 'omit'
+        });
+        const job = await response.json();
+        
+        if (!response.ok || job.status === 'failed') {
+            throw new Error(job.error || 'Analysis failed');
+        }
+        if (job.status === 'done') {
+            return { success: true, data: job.data };
+        }
+        console.log('Job status:', job.status, '- queue depth:', job.queue_depth);
+    }
+}
+
+// Upload the selected file / recording as an analysis job and wait for it
+async function uploadForAnalysis() {
+    // Prepare form data
+    const formData = new FormData();
+    
+    if (selectedFile) {
+        formData.append('audio', selectedFile);
+    } else if (recordedBlob) {
+        formData.append('audio', recordedBlob, 'recording.wav');
+    }
+
+    // Submit analysis job to API
+    console.log('Sending request to:', `${API_URL}/analyze/jobs`);
+    console.log('FormData contents:', {
+        hasFile: formData.has('audio'),
+        fileName: selectedFile ? selectedFile.name : 'recording.wav'
+    });
+    
+    const response = await fetch(`${API_URL}/analyze/jobs`, {
+        method: 'POST',
+        body: formData,
+        mode: 'cors',
+        credentials: 'omit'
+    });
+
+    console.log('Response received!');
+    console.log('Response status:', response.status);
+    console.log('Response ok:', response.ok);
+    console.log('Response headers:', {
+        contentType: response.headers.get('content-type'),
+        corsOrigin: response.headers.get('access-control-allow-origin')
+    });
+    
+    if (!response.ok) {
+        const contentType = response.headers.get('content-type');
+        let errorMessage = 'Analysis failed';
+        
+        if (contentType && contentType.includes('application/json')) {
+            try {
+                const error = await response.json();
+                console.error('Server error:', error);
+                errorMessage = error.error || errorMessage;
+            } catch (e) {
+                console.error('Could not parse error response:', e);
+            }
+        } else {
+            const textError = await response.text();
+            console.error('Non-JSON error response:', textError);
+            errorMessage = textError || errorMessage;
+        }
+        throw new Error(errorMessage);
+    }
+
+    const job = await response.json();
+    console.log('Job queued:', job.job_id);
+    
+    return await pollAnalysisJob(job.job_id);
+}
+
 // Analyze Button Handler
 analyzeBtn.addEventListener('click', async (e) => {
     e.preventDefault();
@@ -150,58 +251,14 @@ analyzeBtn.addEventListener('click', async (e) => {
     animateLoadingSteps();
 
     try {
-        // Prepare form data
-        const formData = new FormData();
-        
-        if (selectedFile) {
-            formData.append('audio', selectedFile);
-        } else if (recordedBlob) {
-            formData.append('audio', recordedBlob, 'recording.wav');
-        }
-
-        // Send to API
-        console.log('Sending request to:', `${API_URL}/analyze`);
-        console.log('FormData contents:', {
-            hasFile: formData.has('audio'),
-            fileName: selectedFile ? selectedFile.name : 'recording.wav'
-        });
-        
-        const response = await fetch(`${API_URL}/analyze`, {
-            method: 'POST',
-            body: formData,
-            mode: 'cors',
-            credentials: 'omit'
-        });
-
-        console.log('Response received!');
-        console.log('Response status:', response.status);
-        console.log('Response ok:', response.ok);
-        console.log('Response headers:', {
-            contentType: response.headers.get('content-type'),
-            corsOrigin: response.headers.get('access-control-allow-origin')
-        });
-        
-        if (!response.ok) {
-            const contentType = response.headers.get('content-type');
-            let errorMessage = 'Analysis failed';
-            
-            if (contentType && contentType.includes('application/json')) {
-                try {
-                    const error = await response.json();
-                    console.error('Server error:', error);
-                    errorMessage = error.error || errorMessage;
-                } catch (e) {
-                    console.error('Could not parse error response:', e);
-                }
-            } else {
-                const textError = await response.text();
-                console.error('Non-JSON error response:', textError);
-                errorMessage = textError || errorMessage;
-            }
-            throw new Error(errorMessage);
+        let result;
+        if (!selectedFile && liveResult) {
+            // The recording was already analysed live while it was captured
+            console.log('Using live streaming result');
+            result = { success: true, data: liveResult };
+        } else {
+            result = await uploadForAnalysis();
         }
-
-        const result = await response.json();
         console.log('Analysis result received!');
         console.log('Result success:', result.success);
         console.log('Result data keys:', result.data ? Object.keys(result.data) : 'no data');
@@ -481,6 +538,125 @@ async function normalizeAudio(audioBuffer, audioContext) {
     return audioBuffer;
 }
 
+// ==================== LIVE STREAMING ANALYSIS ====================
+// While recording, raw PCM is sent to the backend every second so the emotion
+// timeline and vocal health are analysed as the user speaks; at stop only the
+// last window is left to process
+async function startLiveStream() {
+    liveResult = null;
+    liveFrames = [];
+    liveSessionId = null;
+    if (!audioContext || !microphone || !audioContext.createScriptProcessor) {
+        return;
+    }
+    
+    try {
+        const response = await fetch(`${API_URL}/stream/sessions`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ sample_rate: audioContext.sampleRate, format: 'f32le' }),
+            mode: 'cors',
+            credentials: 'omit'
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        const session = await response.json();
+        liveSessionId = session.session_id;
+    } catch (error) {
+        console.warn('Live analysis unavailable, recording will be uploaded instead:', error);
+        return;
+    }
+    
+    liveProcessor = audioContext.createScriptProcessor(4096, 1, 1);
+    liveProcessor.onaudioprocess = (event) => {
+        liveFrames.push(new Float32Array(event.inputBuffer.getChannelData(0)));
+    };
+    microphone.connect(liveProcessor);
+    liveProcessor.connect(audioContext.destination);
+    liveFlushInterval = setInterval(sendLiveFrames, 1000);
+    console.log('Live analysis session started:', liveSessionId);
+}
+
+function takeLiveFrames() {
+    const total = liveFrames.reduce((sum, frame) => sum + frame.length, 0);
+    const merged = new Float32Array(total);
+    let offset = 0;
+    liveFrames.forEach(frame => {
+        merged.set(frame, offset);
+        offset += frame.length;
+    });
+    liveFrames = [];
+    return merged;
+}
+
+function sendLiveFrames() {
+    if (!liveSessionId || liveFrames.length === 0) {
+        return;
+    }
+    const sessionId = liveSessionId;
+    const frames = takeLiveFrames();
+    
+    // Chain the uploads so frames always arrive in order
+    liveSendChain = liveSendChain.then(async () => {
+        try {
+            const response = await fetch(`${API_URL}/stream/sessions/${sessionId}/frames`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: frames.buffer,
+                mode: 'cors',
+                credentials: 'omit'
+            });
+            const update = await response.json();
+            const live = update.live_analysis || {};
+            if (update.success && live.emotion && liveSessionId === sessionId) {
+                recordInfo.textContent = `Recording... live: ${capitalizeFirst(live.emotion)}` +
+                    (live.vocal_health_score !== null ? `, vocal health ${live.vocal_health_score.toFixed(0)}%` : '');
+            }
+        } catch (error) {
+            console.warn('Live frame upload failed:', error);
+        }
+    });
+}
+
+async function finishLiveStream() {
+    if (liveFlushInterval) {
+        clearInterval(liveFlushInterval);
+        liveFlushInterval = null;
+    }
+    if (liveProcessor) {
+        liveProcessor.disconnect();
+        liveProcessor.onaudioprocess = null;
+        liveProcessor = null;
+    }
+    if (!liveSessionId) {
+        return;
+    }
+    
+    const sessionId = liveSessionId;
+    const frames = takeLiveFrames();
+    liveSessionId = null;
+    
+    try {
+        await liveSendChain;
+        const response = await fetch(`${API_URL}/stream/sessions/${sessionId}/stop`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/octet-stream' },
+            body: frames.buffer,
+            mode: 'cors',
+            credentials: 'omit'
+        });
+        const result = await response.json();
+        if (result.success) {
+            liveResult = result.data;
+            recordInfo.textContent = 'Recording analysed live - click Analyze to view';
+            console.log('Live analysis result received');
+        }
+    } catch (error) {
+        console.warn('Live analysis failed, recording will be uploaded instead:', error);
+    }
+}
+
 // Setup volume meter for recording
 function setupVolumeMeter(stream) {
     try {
@@ -0,0 +1,64 @@
+"""
+Stub pipelines and synthetic audio shared by the tests that run a
+VoiceAnalyzer without the transformers models
+"""
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from audio_context import CANONICAL_SR
+from keyword_spotter import KeywordSpotter
+from micro_batcher import MicroBatcher
+from voice_analyzer import VoiceAnalyzer
+
+LABELS = ('happy', 'sad', 'angry', 'neutral', 'calm')
+
+
+class FeatureExtractor:
+    sampling_rate = 16000
+
+
+class StubPipeline:
+    """Audio-classification pipeline stand-in that records the threads calling it"""
+
+    feature_extractor = FeatureExtractor()
+
+    def __init__(self):
+        self.threads = set()
+
+    def __call__(self, inputs, top_k=5, **kwargs):
+        self.threads.add(threading.get_ident())
+        time.sleep(0.002)
+        scores = [{'label': label, 'score': 1.0 / (i + 2)} for i, label in enumerate(LABELS[:top_k])]
+        return [scores for _ in inputs] if isinstance(inputs, list) else scores
+
+
+def stub_analyzer(replicas=2, max_concurrent=2, spotter=None):
+    """A VoiceAnalyzer on batched stub pipelines, and the list of those pipelines
+
+    `spotter` replaces the KeywordSpotter over the keyword stubs.
+    """
+    analyzer = VoiceAnalyzer(replicas=replicas, max_concurrent=max_concurrent, max_workers=2)
+    emotion = [StubPipeline() for _ in range(replicas)]
+    keyword = [StubPipeline() for _ in range(replicas)]
+    keyword_model = MicroBatcher(keyword, name='keyword')
+    analyzer._models.set('models', {
+        'emotion': MicroBatcher(emotion, name='emotion'),
+        'keyword': keyword_model,
+        'spotter': spotter or KeywordSpotter(keyword_model, speech_only=analyzer.vad)
+    })
+    return analyzer, emotion + keyword
+
+
+def voice(seconds=2.0, sr=CANONICAL_SR, noise=0.01, seed=0):
+    """A pitched, amplitude-modulated tone with a little noise"""
+    t = np.arange(int(seconds * sr)) / sr
+    rng = np.random.default_rng(seed)
+    y = 0.3 * np.sin(2 * np.pi * 140 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    return (y + noise * rng.standard_normal(len(t))).astype(np.float32)
@@ -0,0 +1,89 @@
+"""
+Tests for the mergeable aggregates (aggregates.py) behind long-audio mode
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from aggregates import HistogramCounts, RunningStats
+
+
+def chunks(seed=0, count=5):
+    rng = np.random.default_rng(seed)
+    return [rng.normal(150, 30, rng.integers(1, 500)) for _ in range(count)]
+
+
+def test_running_stats_merge_matches_numpy_on_concatenated_data():
+    parts = chunks()
+    merged = RunningStats()
+    for part in parts:
+        merged.merge(RunningStats.of(part))
+    everything = np.concatenate(parts)
+    assert merged.count == len(everything)
+    assert merged.mean == pytest.approx(np.mean(everything))
+    assert merged.variance == pytest.approx(np.var(everything))
+    assert merged.std == pytest.approx(np.std(everything))
+    assert merged.min == everything.min()
+    assert merged.max == everything.max()
+
+
+def test_running_stats_add_in_pieces_equals_single_add():
+    parts = chunks(seed=1)
+    incremental = RunningStats()
+    for part in parts:
+        incremental.add(part)
+    single = RunningStats.of(np.concatenate(parts))
+    assert incremental.mean == pytest.approx(single.mean)
+    assert incremental.variance == pytest.approx(single.variance)
+
+
+def test_running_stats_weights_match_numpy_average():
+    values = np.array([1.0, 2.0, 10.0])
+    weights = np.array([3.0, 1.0, 0.5])
+    stats = RunningStats()
+    for value, weight in zip(values, weights):
+        stats.add([value], weight=weight)
+    mean = np.average(values, weights=weights)
+    assert stats.mean == pytest.approx(mean)
+    assert stats.variance == pytest.approx(np.average((values - mean) ** 2, weights=weights))
+
+
+def test_running_stats_ignores_non_finite_and_empty():
+    stats = RunningStats.of([np.nan, np.inf, 2.0, 4.0])
+    assert stats.count == 2
+    assert stats.mean == pytest.approx(3.0)
+    empty = RunningStats()
+    assert np.isnan(empty.variance)
+    assert stats.merge(empty).count == 2
+    assert empty.summary() == {'count': 0}
+
+
+def test_histogram_merge_matches_numpy_on_concatenated_data():
+    edges = np.arange(50, 510, 10)
+    parts = chunks(seed=2) + [np.array([10.0, 600.0, 700.0])]
+    merged = HistogramCounts(edges)
+    for part in parts:
+        merged.merge(HistogramCounts(edges).add(part))
+    everything = np.concatenate(parts)
+    assert merged.counts.tolist() == np.histogram(everything, edges)[0].tolist()
+    assert merged.below == int(np.sum(everything < edges[0]))
+    assert merged.above == int(np.sum(everything > edges[-1]))
+    assert merged.total == len(everything)
+
+
+def test_histogram_quantile_is_within_one_bin_of_numpy():
+    edges = np.arange(0, 301, 5)
+    values = np.concatenate(chunks(seed=3))
+    histogram = HistogramCounts(edges).add(values)
+    for q in (0.1, 0.5, 0.9):
+        assert abs(histogram.quantile(q) - np.quantile(values, q)) <= 5
+
+
+def test_histograms_with_different_bins_do_not_merge():
+    with pytest.raises(ValueError):
+        HistogramCounts([0, 1, 2]).merge(HistogramCounts([0, 2, 4]))
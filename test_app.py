@@ -0,0 +1,117 @@
+"""
+Tests for upload routing in the Flask app (app.py); no models are loaded
+"""
+
+import io
+import os
+import sys
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault('MODEL_WARMUP', '0')
+
+import app
+import long_audio
+from upload_spool import UploadSpool
+
+
+def ogg(seconds, sr=22050):
+    buffer = io.BytesIO()
+    t = np.arange(int(seconds * sr)) / sr
+    sf.write(buffer, (0.2 * np.sin(2 * np.pi * 140 * t)).astype(np.float32), sr, format='OGG')
+    return buffer.getvalue()
+
+
+def fail_spool():
+    raise AssertionError("a small upload was written to disk")
+
+
+def fail_decode(upload):
+    raise AssertionError("a long upload with a duration header was decoded")
+
+
+def test_short_upload_is_decoded_once_from_memory(monkeypatch):
+    monkeypatch.setattr(app, 'LONG_AUDIO_SECONDS', 5)
+    with UploadSpool(io.BytesIO(ogg(2))) as upload:
+        ctx, chunks = app.decode_upload(upload)
+        assert abs(ctx.duration - 2) < 0.05
+        assert chunks is None
+        assert upload.in_memory
+
+
+def test_long_upload_is_left_for_chunked_mode_without_decoding(monkeypatch):
+    monkeypatch.setattr(app, 'LONG_AUDIO_SECONDS', 5)
+    monkeypatch.setattr(UploadSpool, 'to_context', fail_decode)
+    with UploadSpool(io.BytesIO(ogg(8))) as upload:
+        assert app.decode_upload(upload) == (None, None)
+        assert upload.in_memory   # only analyze_long_upload spills it
+
+
+def test_upload_without_duration_header_is_decoded_as_a_stream(monkeypatch):
+    monkeypatch.setattr(app, 'LONG_AUDIO_SECONDS', 5)
+    monkeypatch.setattr(app, 'LONG_AUDIO_CHUNK', 1)
+    monkeypatch.setattr(UploadSpool, 'duration', lambda self: None)
+    monkeypatch.setattr(UploadSpool, 'to_context', fail_decode)
+    with UploadSpool(io.BytesIO(ogg(2))) as upload:
+        ctx, chunks = app.decode_upload(upload)
+        assert abs(ctx.duration - 2) < 0.05
+        assert chunks is None
+
+
+def test_small_upload_without_duration_header_never_touches_the_disk(monkeypatch):
+    monkeypatch.setattr(app, 'LONG_AUDIO_SECONDS', 5)
+    monkeypatch.setattr(UploadSpool, 'duration', lambda self: None)
+    monkeypatch.setattr(long_audio, 'map_pcm', lambda *args, **kwargs: fail_spool())
+    monkeypatch.setattr(UploadSpool, 'to_file', lambda self: fail_spool())
+    with UploadSpool(io.BytesIO(ogg(2))) as upload:
+        ctx, _ = app.decode_upload(upload)
+        assert not ctx.mapped and abs(ctx.duration - 2) < 0.05
+        assert upload.in_memory
+
+
+def test_long_upload_without_duration_header_reuses_the_decoded_chunks(monkeypatch):
+    monkeypatch.setattr(app, 'LONG_AUDIO_SECONDS', 5)
+    monkeypatch.setattr(app, 'LONG_AUDIO_CHUNK', 1)
+    monkeypatch.setattr(UploadSpool, 'duration', lambda self: None)
+    data = ogg(8)
+    with UploadSpool(io.BytesIO(data)) as upload:
+        ctx, chunks = app.decode_upload(upload)
+        assert ctx is None
+        chunks = [np.array(chunk) for chunk in chunks]
+    expected, _ = sf.read(io.BytesIO(data), dtype='float32')
+    assert [len(chunk) for chunk in chunks] == [22050] * 8
+    assert np.array_equal(np.concatenate(chunks), expected)
+
+
+def test_too_large_message_uses_the_configured_limit():
+    with app.app.test_request_context():
+        response, status = app.request_entity_too_large(None)
+    assert status == 413
+    assert f"{app.MAX_FILE_SIZE // (1024 * 1024)}MB" in response.get_json()['error']
+
+
+def test_stream_frames_past_the_session_limit_get_a_413(monkeypatch):
+    monkeypatch.setattr(app.streams, 'max_seconds', 1.0)
+    monkeypatch.setattr(app.streams, 'feed', lambda session, data: session.feed(data))
+    client = app.app.test_client()
+    session_id = client.post('/stream/sessions', json={'sample_rate': 16000}).get_json()['session_id']
+    try:
+        frames = np.zeros(12000, dtype=np.float32).tobytes()
+        assert client.post(f'/stream/sessions/{session_id}/frames', data=frames).status_code == 200
+        assert client.post(f'/stream/sessions/{session_id}/frames', data=frames).status_code == 413
+    finally:
+        app.streams.close(session_id)
+
+
+def test_admin_endpoints_are_refused_without_a_token_even_from_loopback(monkeypatch):
+    monkeypatch.setattr(app, 'ADMIN_TOKEN', None)
+    client = app.app.test_client()
+    local = {'REMOTE_ADDR': '127.0.0.1'}
+    assert client.get('/admin/cache', environ_base=local).status_code == 401
+    assert client.delete('/admin/cache', environ_base=local).status_code == 401
+
+    monkeypatch.setattr(app, 'ADMIN_TOKEN', 'secret')
+    assert client.get('/admin/cache', headers={'X-Admin-Token': 'wrong'}).status_code == 401
+    assert client.get('/admin/cache', headers={'X-Admin-Token': 'secret'}).status_code == 200
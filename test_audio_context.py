@@ -0,0 +1,74 @@
+"""
+Tests for AudioContext decoding (audio_context.py)
+"""
+
+import os
+import stat
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import audio_context
+from audio_context import _ffmpeg_decode
+
+# Stands in for ffmpeg: like an MP4 with its moov atom at the end, the input
+# cannot be read from a pipe, only from a (seekable) file
+FAKE_FFMPEG = '''#!{python}
+import sys
+import numpy as np
+source = sys.argv[sys.argv.index('-i') + 1]
+if source == 'pipe:0':
+    sys.stderr.write('moov atom not found')
+    sys.exit(1)
+data = open(source, 'rb').read()
+sys.stdout.buffer.write(np.full(len(data), 0.5, dtype=np.float32).tobytes())
+'''
+
+# A damaged file: ffmpeg logs far more than a pipe buffer holds before
+# (and while) it writes any samples
+NOISY_FFMPEG = '''#!{python}
+import sys
+sys.stderr.write('x' * (1 << 20))
+sys.stderr.flush()
+sys.stdout.buffer.write(b'\\x00' * 4 * 1000)
+'''
+
+
+def install_fake_ffmpeg(tmp_path, monkeypatch, script=FAKE_FFMPEG):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    ffmpeg = bin_dir / 'ffmpeg'
+    ffmpeg.write_text(script.format(python=sys.executable))
+    ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+
+
+def test_unseekable_pipe_input_is_retried_from_a_temp_file(tmp_path, monkeypatch):
+    install_fake_ffmpeg(tmp_path, monkeypatch)
+    spool = tmp_path / 'spool'
+    spool.mkdir()
+    monkeypatch.setattr(audio_context, 'SPOOL_DIR', str(spool))
+
+    y = _ffmpeg_decode(b'abcd', 22050)
+
+    assert y.dtype == np.float32
+    assert y.tolist() == [0.5] * 4
+    assert os.listdir(spool) == []   # temp copy removed
+
+
+def test_chunked_decode_does_not_stall_on_a_full_stderr(tmp_path, monkeypatch):
+    install_fake_ffmpeg(tmp_path, monkeypatch, NOISY_FFMPEG)
+    chunks = list(audio_context._ffmpeg_chunks(str(tmp_path / 'damaged.webm'), 22050, 0.01))
+    assert sum(len(chunk) for chunk in chunks) == 1000
+
+
+def test_audio_context_from_bytes_uses_soundfile_for_wav():
+    import io
+    import soundfile as sf
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(2205, dtype=np.float32), 22050, format='WAV')
+    ctx = audio_context.AudioContext.from_bytes(buffer.getvalue())
+    assert ctx.sr == 22050
+    assert abs(ctx.duration - 0.1) < 1e-6
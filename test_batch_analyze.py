@@ -0,0 +1,92 @@
+"""
+Tests for the offline batch CLI (batch_analyze.py); no models are loaded
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import long_audio
+from batch_analyze import analyze_files, list_inputs, load_done
+
+
+def test_directory_inputs_are_sorted_and_filtered_by_extension(tmp_path):
+    (tmp_path / 'b').mkdir()
+    for name in ('b/2.WAV', 'b/1.mp3', 'a.flac', 'notes.txt', 'c.webm'):
+        (tmp_path / name).write_bytes(b'')
+    assert list_inputs(str(tmp_path)) == [
+        str(tmp_path / 'a.flac'), str(tmp_path / 'c.webm'),
+        str(tmp_path / 'b' / '1.mp3'), str(tmp_path / 'b' / '2.WAV')
+    ]
+
+
+def test_manifest_paths_resolve_against_the_manifest_folder(tmp_path):
+    absolute = str(tmp_path / 'elsewhere.wav')
+    (tmp_path / 'list.txt').write_text(f"# comment\none.wav\n\n{absolute}\n")
+    (tmp_path / 'list.csv').write_text("speaker,path\nann,one.wav\nbob,two.wav\n")
+    (tmp_path / 'plain.csv').write_text("one.wav,ann\n")
+    (tmp_path / 'list.jsonl').write_text(json.dumps({'path': 'one.wav'}) + '\n\n')
+
+    one, two = str(tmp_path / 'one.wav'), str(tmp_path / 'two.wav')
+    assert list_inputs(str(tmp_path / 'list.txt')) == [one, absolute]
+    assert list_inputs(str(tmp_path / 'list.csv')) == [one, two]
+    assert list_inputs(str(tmp_path / 'plain.csv')) == [one]
+    assert list_inputs(str(tmp_path / 'list.jsonl')) == [one]
+
+
+def test_resume_skips_only_successes_and_tolerates_a_torn_last_line(tmp_path):
+    progress = tmp_path / 'results.jsonl'
+    assert load_done(str(progress)) == set()
+    progress.write_text(
+        json.dumps({'file': 'a.wav', 'success': True, 'data': {}}) + '\n' +
+        json.dumps({'file': 'b.wav', 'success': False, 'error': 'bad'}) + '\n' +
+        json.dumps({'file': 'b.wav', 'success': True, 'data': {}}) + '\n' +
+        json.dumps({'file': 'c.wav', 'success': False, 'error': 'bad'}) + '\n' +
+        '{"file": "d.wav", "succ'
+    )
+    assert load_done(str(progress)) == {'a.wav', 'b.wav'}
+
+
+class RecordingAnalyzer:
+    def __init__(self):
+        self.batched = []
+
+    def analyze_batch(self, inputs, workers=None):
+        self.batched.extend(inputs)
+        return [{'input': item} for item in inputs]
+
+
+def test_long_files_go_through_chunked_mode(tmp_path, monkeypatch):
+    short, long_ = str(tmp_path / 'short.wav'), str(tmp_path / 'long.wav')
+    sf.write(short, np.zeros(22050, dtype=np.float32), 22050)
+    sf.write(long_, np.zeros(22050 * 3, dtype=np.float32), 22050)
+    missing = str(tmp_path / 'missing.wav')
+    chunked = []
+    monkeypatch.setattr(long_audio, 'analyze_long', lambda analyzer, path, chunk_seconds, chunks:
+                        chunked.append((path, chunks)) or {'long': path})
+    analyzer = RecordingAnalyzer()
+
+    results = analyze_files(analyzer, [long_, short, missing], workers=2, long_seconds=2.0, chunk_seconds=1.0)
+
+    assert results[0] == {'long': long_} and results[1] == {'input': short}
+    assert isinstance(results[2], Exception)
+    assert analyzer.batched == [short]
+    assert chunked == [(long_, None)]   # the header says long: not decoded up front
+
+
+def test_files_without_a_duration_continue_their_decode_in_chunked_mode(tmp_path, monkeypatch):
+    path = str(tmp_path / 'recording.wav')
+    sf.write(path, np.zeros(22050 * 3, dtype=np.float32), 22050)
+    monkeypatch.setattr(long_audio, 'probe_duration', lambda path: None)
+    seen = []
+    monkeypatch.setattr(long_audio, 'analyze_long', lambda analyzer, path, chunk_seconds, chunks:
+                        seen.append(sum(len(chunk) for chunk in chunks)) or {})
+
+    analyze_files(RecordingAnalyzer(), [path], workers=1, long_seconds=2.0, chunk_seconds=1.0)
+
+    assert seen == [22050 * 3]
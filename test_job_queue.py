@@ -0,0 +1,80 @@
+"""
+Tests for the background analysis queue (job_queue.py)
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from job_queue import JobQueue, JobStore, QueueFullError
+
+
+def wait_for(queue, job_id, statuses=('done', 'failed'), timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.store.get(job_id)
+        if job and job['status'] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not reach {statuses}")
+
+
+def test_job_runs_and_stores_its_result():
+    jobs = JobQueue(workers=1)
+    job_id = jobs.submit(lambda a, b: a + b, 2, 3)
+    job = wait_for(jobs, job_id)
+    assert job['status'] == 'done'
+    assert job['result'] == 5
+    assert job['started'] <= job['finished']
+
+
+def test_failed_job_records_the_error_and_still_cleans_up():
+    jobs = JobQueue(workers=1)
+    cleaned = threading.Event()
+
+    def fail():
+        raise ValueError("unreadable audio")
+    job_id = jobs.submit(fail, cleanup=cleaned.set)
+    job = wait_for(jobs, job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == "unreadable audio"
+    assert job['result'] is None
+    assert cleaned.wait(1)
+
+
+def test_full_queue_rejects_new_jobs_and_forgets_them():
+    jobs = JobQueue(workers=1, max_queued=1)
+    release = threading.Event()
+    running = jobs.submit(release.wait)
+    wait_for(jobs, running, statuses=('running',))
+    queued = jobs.submit(lambda: 'queued')
+    assert jobs.depth() == 1
+    with pytest.raises(QueueFullError):
+        jobs.submit(lambda: 'rejected')
+    assert len(jobs.store) == 2   # the rejected job left no record
+    release.set()
+    assert wait_for(jobs, queued)['result'] == 'queued'
+
+
+def test_finished_jobs_expire_after_the_ttl(monkeypatch):
+    store = JobStore(ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr('job_queue.time.time', lambda: now[0])
+    done = store.create()
+    store.update(done, status='done', finished=now[0])
+    running = store.create()
+    now[0] += 11
+    assert store.get(done) is None
+    assert store.get(running)['status'] == 'queued'   # unfinished jobs never expire
+
+
+def test_complete_records_a_finished_job():
+    jobs = JobQueue(workers=1)
+    job = jobs.store.get(jobs.complete({'cached': True}))
+    assert job['status'] == 'done'
+    assert job['result'] == {'cached': True}
@@ -0,0 +1,84 @@
+"""
+Tests for sliding-window keyword spotting (keyword_spotter.py) with a stub
+keyword model
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from audio_context import AudioContext
+from keyword_spotter import KeywordSpotter
+
+from stub_models import FeatureExtractor
+
+SR = 16000
+
+
+class StubKeywordModel:
+    """Says 'yes' for loud windows and '_silence_' otherwise; records each call's size"""
+
+    feature_extractor = FeatureExtractor()
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, inputs, batch_size=None, top_k=1):
+        self.calls.append(len(inputs))
+        return [[{'label': 'yes' if np.abs(item['raw']).max() > 0.1 else '_silence_', 'score': 0.9}]
+                for item in inputs]
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+
+
+def test_windows_below_the_energy_gate_are_skipped():
+    y = np.concatenate([tone(2.0), np.zeros(2 * SR, dtype=np.float32), tone(1.0, amplitude=1e-4)])
+    spotter = KeywordSpotter(StubKeywordModel(), speech_only=False)
+    windows = spotter.windows(y, SR)
+    assert windows[0] == (0, SR)
+    # Only windows reaching into the tone pass; silence and the -70 dB tail do not
+    assert all(start < 2 * SR for start, _ in windows)
+    assert windows[-1][1] == int(2.5 * SR)
+
+
+def test_the_last_window_ends_at_the_end_of_the_audio():
+    spotter = KeywordSpotter(StubKeywordModel(), speech_only=False)
+    assert spotter.windows(tone(2.2), SR)[-1] == (int(1.2 * SR), int(2.2 * SR))
+    assert spotter.windows(tone(0.4), SR) == [(0, int(0.4 * SR))]
+
+
+def test_non_speech_windows_are_skipped_with_vad():
+    y = np.concatenate([tone(2.0), np.zeros(3 * SR, dtype=np.float32)])
+    ctx = AudioContext(y, SR)
+    ctx._memo.set('speech_segments', [(0.0, 1.0)])
+    model = StubKeywordModel()
+    KeywordSpotter(model, speech_only=True).detect(ctx)
+    assert model.calls == [2]   # windows starting at 0 s and 0.5 s
+
+
+def test_overlapping_detections_of_a_keyword_merge():
+    merged = KeywordSpotter.merge([
+        {'keyword': 'yes', 'start': 0.5, 'end': 1.5, 'score': 0.7},
+        {'keyword': 'yes', 'start': 0.0, 'end': 1.0, 'score': 0.6},
+        {'keyword': 'no', 'start': 1.2, 'end': 2.2, 'score': 0.8},
+        {'keyword': 'no', 'start': 3.0, 'end': 4.0, 'score': 0.55},
+    ])
+    assert merged == [
+        {'keyword': 'yes', 'start': 0.0, 'end': 1.5, 'score': 70.0},
+        {'keyword': 'no', 'start': 1.2, 'end': 2.2, 'score': 80.0},
+        {'keyword': 'no', 'start': 3.0, 'end': 4.0, 'score': 55.0},
+    ]
+
+
+def test_model_calls_are_chunked_and_detections_merged():
+    model = StubKeywordModel()
+    spotter = KeywordSpotter(model, speech_only=False, chunk=4)
+    detections = spotter.detect(AudioContext(tone(6.0), SR))
+    assert model.calls == [4, 4, 3]
+    assert detections == [{'keyword': 'yes', 'start': 0.0, 'end': 6.0, 'score': 90.0}]
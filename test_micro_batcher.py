@@ -0,0 +1,109 @@
+"""
+Tests for micro-batching of pipeline calls (micro_batcher.py)
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from micro_batcher import MicroBatcher
+
+
+class RecordingPipeline:
+    """Returns each input with the kwargs of the pass it ran in"""
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.threads = set()
+        self.delay = delay
+
+    def __call__(self, inputs, **kwargs):
+        self.calls.append((list(inputs), kwargs))
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        return [(x, kwargs) for x in inputs]
+
+
+def call_together(batcher, calls):
+    """Make every (inputs, kwargs) call from its own thread at the same time"""
+    results = [None] * len(calls)
+    start = threading.Barrier(len(calls))
+
+    def one(i):
+        start.wait()
+        results[i] = batcher(calls[i][0], **calls[i][1])
+    threads = [threading.Thread(target=one, args=(i,)) for i in range(len(calls))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_share_a_pass():
+    pipeline = RecordingPipeline()
+    batcher = MicroBatcher(pipeline, max_batch=16, max_wait_ms=200)
+    results = call_together(batcher, [([i], {'top_k': 3}) for i in range(4)])
+    assert [result[0][0] for result in results] == [0, 1, 2, 3]
+    assert len(pipeline.calls) == 1
+    assert pipeline.calls[0][1] == {'top_k': 3, 'batch_size': 4}
+
+
+def test_each_replica_runs_on_its_own_worker_thread():
+    replicas = [RecordingPipeline(delay=0.05) for _ in range(2)]
+    batcher = MicroBatcher(replicas, max_batch=1, max_wait_ms=0)
+    results = call_together(batcher, [([i], {}) for i in range(6)])
+    assert [result[0][0] for result in results] == list(range(6))
+    assert all(replica.calls for replica in replicas)   # slow passes spread over both
+    assert all(len(replica.threads) == 1 for replica in replicas)
+    assert replicas[0].threads != replicas[1].threads
+    assert threading.get_ident() not in replicas[0].threads | replicas[1].threads
+
+
+def test_calls_with_different_kwargs_never_share_a_pass():
+    pipeline = RecordingPipeline()
+    batcher = MicroBatcher(pipeline, max_batch=16, max_wait_ms=200)
+    results = call_together(batcher, [([1], {'top_k': 3, 'function_to_apply': 'softmax'}),
+                                      ([2], {'top_k': 3, 'function_to_apply': 'none'})])
+    assert results[0][0][1]['function_to_apply'] == 'softmax'
+    assert results[1][0][1]['function_to_apply'] == 'none'
+    assert len(pipeline.calls) == 2
+
+
+def test_callers_batch_size_is_kept_and_capped():
+    pipeline = RecordingPipeline()
+    batcher = MicroBatcher(pipeline, max_batch=8)
+    batcher(list(range(20)), batch_size=4)
+    batcher(list(range(20)), batch_size=64)
+    assert [kwargs['batch_size'] for _, kwargs in pipeline.calls] == [4, 8]
+    assert batcher.stats()['forward_passes'] == 5 + 3
+
+
+def test_pipeline_errors_reach_the_caller():
+    def failing(inputs, **kwargs):
+        raise RuntimeError('model exploded')
+    with pytest.raises(RuntimeError, match='exploded'):
+        MicroBatcher(failing)([1])
+
+
+def test_worker_failure_releases_waiting_callers():
+    batcher = MicroBatcher(RecordingPipeline())
+
+    def broken(*args):
+        raise KeyError('bad group')
+    batcher._forward = broken
+    with pytest.raises(KeyError):
+        batcher([1])
+    batcher._forward = MicroBatcher._forward.__get__(batcher)
+    assert batcher([2])[0][0] == 2   # the worker is still alive
+
+
+def test_caller_times_out_instead_of_waiting_forever():
+    batcher = MicroBatcher(RecordingPipeline(delay=1.0), timeout=0.1)
+    with pytest.raises(TimeoutError):
+        batcher([1])
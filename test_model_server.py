@@ -0,0 +1,58 @@
+"""
+Tests for the shared model server's connection security (model_server.py)
+"""
+
+import os
+import stat
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import model_server
+from model_server import ModelServer, RemoteModel
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason="Unix socket permissions")
+
+
+def stub_pipeline(inputs, top_k=5, **kwargs):
+    return [[{'label': 'neutral', 'score': 1.0}] for _ in inputs]
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.delenv('MODEL_SERVER_KEY', raising=False)
+    monkeypatch.setattr(model_server, 'KEY_FILE', str(tmp_path / 'server.key'))
+    address = str(tmp_path / 'models.sock')
+    threading.Thread(target=ModelServer({'emotion': stub_pipeline}, address).serve_forever,
+                     daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(address):
+            break
+        time.sleep(0.02)
+    return address
+
+
+def test_server_generates_a_private_key_and_socket(server):
+    assert stat.S_IMODE(os.stat(model_server.KEY_FILE).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(server).st_mode) & 0o077 == 0
+    assert len(open(model_server.KEY_FILE, 'rb').read()) == 64
+    assert RemoteModel(server, 'emotion')({'raw': [0.0], 'sampling_rate': 16000}) == \
+        [{'label': 'neutral', 'score': 1.0}]
+
+
+def test_wrong_key_is_rejected(server):
+    with pytest.raises(AuthenticationError):
+        Client(server, authkey=b'voice-analyzer')
+
+
+def test_client_without_any_key_refuses_to_connect(tmp_path, monkeypatch):
+    monkeypatch.delenv('MODEL_SERVER_KEY', raising=False)
+    monkeypatch.setattr(model_server, 'KEY_FILE', str(tmp_path / 'missing.key'))
+    with pytest.raises(RuntimeError, match='MODEL_SERVER_KEY'):
+        RemoteModel(str(tmp_path / 'models.sock'), 'emotion')
@@ -0,0 +1,44 @@
+"""
+Tests for the memory-mapped PCM spool (pcm_spool.py)
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from pcm_spool import map_pcm, remove_stale_spools, resample_pcm
+
+
+def test_map_pcm_is_read_only_and_leaves_no_file(tmp_path):
+    chunks = [np.arange(5, dtype=np.float32), np.arange(5, 8, dtype=np.float32)]
+    samples = map_pcm(chunks, directory=str(tmp_path))
+    assert samples.tolist() == [0, 1, 2, 3, 4, 5, 6, 7]
+    with pytest.raises(ValueError):
+        samples[0] = 1
+    if os.name == 'posix':
+        assert os.listdir(tmp_path) == []   # unlinked as soon as it is mapped
+    assert len(map_pcm([], directory=str(tmp_path))) == 0
+
+
+def test_resample_pcm_matches_the_length_ratio(tmp_path):
+    t = np.arange(44100) / 44100
+    samples = map_pcm([np.sin(2 * np.pi * 440 * t).astype(np.float32)], directory=str(tmp_path))
+    resampled = resample_pcm(samples, 44100, 22050, directory=str(tmp_path))
+    assert abs(len(resampled) - 22050) <= 1
+    assert np.max(np.abs(resampled)) == pytest.approx(1.0, abs=0.05)
+
+
+def test_remove_stale_spools_only_touches_old_service_files(tmp_path):
+    old = time.time() - 7200
+    for name in ('voice_pcm_old.f32', 'voice_upload_old.wav', 'other_old.wav'):
+        path = tmp_path / name
+        path.write_bytes(b'x')
+        os.utime(path, (old, old))
+    (tmp_path / 'voice_pcm_new.f32').write_bytes(b'x')
+    assert remove_stale_spools(str(tmp_path), max_age=3600) == 2
+    assert sorted(os.listdir(tmp_path)) == ['other_old.wav', 'voice_pcm_new.f32']
@@ -0,0 +1,62 @@
+"""
+Tests for the syllable-nucleus peak picking in praat_features.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from praat_features import prominent_peaks
+
+
+def test_peak_without_dip_is_dropped():
+    # The dip before the second peak is 9, only 1 dB below it
+    assert prominent_peaks([0, 10, 9, 10, 0, 0, 0], -1, 2.0).tolist() == [1]
+
+
+def test_peaks_separated_by_deep_dips_are_kept():
+    values = [0, 10, 2, 12, 11, 12, 3, 9, 0]
+    # Peaks at 1, 3, 5, 7; the one at 5 only rises 1 dB over the dip at 4
+    assert prominent_peaks(values, -1, 2.0).tolist() == [1, 3, 7]
+
+
+def test_threshold_applies_before_dips():
+    values = [0, 5, 0, 10, 0]
+    assert prominent_peaks(values, 6, 2.0).tolist() == [3]
+
+
+def test_dip_is_measured_from_previous_peak_only():
+    # An early deep valley must not count for a later peak
+    values = [0, 10, -20, 10, 9.5, 10, 0]
+    assert prominent_peaks(values, -1, 2.0).tolist() == [1, 3]
+
+
+def test_short_or_flat_input():
+    assert prominent_peaks([1, 2], 0, 2.0).tolist() == []
+    assert prominent_peaks(np.zeros(10), -1, 2.0).tolist() == []
+
+
+def voiced_sound(seconds=1.0, sr=16000, f0=140.0, seed=0):
+    import parselmouth
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    phase = 2 * np.pi * np.cumsum(f0 * (1 + 0.01 * rng.standard_normal(len(t)))) / sr
+    y = sum(np.sin(k * phase) / k for k in range(1, 6)) * 0.2
+    return parselmouth.Sound(np.concatenate([y, np.zeros(sr // 2), y]), sampling_frequency=sr)
+
+
+def test_jitter_over_regions_skips_the_gap_between_them():
+    from praat_features import PraatFeatures
+    praat = PraatFeatures(voiced_sound())
+    regions = [(0.0, 1.0), (1.5, 2.5)]
+    jitter = praat.jitter(regions=regions)
+    shimmer = praat.shimmer(regions=regions)
+    assert 0 < jitter < 0.05 and 0 < shimmer < 0.2
+    # Two equally long voiced regions: the average of measuring each alone
+    alone = [praat.jitter(regions=[region]) for region in regions]
+    assert jitter == pytest.approx(np.mean(alone), rel=0.05)
+    assert np.isnan(praat.jitter(regions=[(1.1, 1.4)]))   # no periods in the gap
@@ -0,0 +1,73 @@
+"""
+Tests for the analysis result cache (result_cache.py)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from result_cache import ResultCache
+
+
+def result(value=1):
+    return {'emotion': {'primary': 'calm', 'value': value},
+            'raw': {'timings': {'decode': 0.5, 'total': 2.0}}}
+
+
+def test_cache_hit_carries_lookup_timing_not_the_original_run():
+    cache = ResultCache()
+    original = result()
+    cache.put('a', original)
+    assert original['raw']['timings'] == {'decode': 0.5, 'total': 2.0}   # caller's copy untouched
+    hit = cache.get('a')
+    assert list(hit['raw']['timings']) == ['cache_hit']
+    assert hit['emotion'] == original['emotion']
+
+
+def test_disk_entries_are_stored_without_timings(tmp_path):
+    ResultCache(disk_dir=str(tmp_path)).put('h:sig', result())
+    with open(tmp_path / 'h_sig.json') as f:
+        assert 'timings' not in f.read()
+    hit = ResultCache(disk_dir=str(tmp_path)).get('h:sig')
+    assert list(hit['raw']['timings']) == ['cache_hit']
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = ResultCache(max_entries=2)
+    cache.put('a', result(1))
+    cache.put('b', result(2))
+    cache.get('a')               # 'b' is now the oldest
+    cache.put('c', result(3))
+    assert cache.get('b') is None
+    assert cache.get('a')['emotion']['value'] == 1
+    assert cache.get('c')['emotion']['value'] == 3
+    assert cache.stats()['entries'] == 2
+
+
+def test_results_are_copies():
+    cache = ResultCache()
+    cache.put('a', result())
+    cache.get('a')['emotion']['primary'] = 'angry'
+    assert cache.get('a')['emotion']['primary'] == 'calm'
+
+
+def test_disk_tier_round_trip_survives_a_restart(tmp_path):
+    ResultCache(max_entries=1, disk_dir=str(tmp_path)).put('hash:sig', result(7))
+    restarted = ResultCache(max_entries=1, disk_dir=str(tmp_path))
+    assert restarted.get('hash:sig')['emotion'] == {'primary': 'calm', 'value': 7}
+    assert restarted.get('hash:sig') is not None   # now served from memory
+    assert restarted.get('other:sig') is None
+    stats = restarted.stats()
+    assert (stats['hits'], stats['disk_hits'], stats['misses']) == (1, 1, 1)
+
+
+def test_invalidate_by_content_hash_covers_memory_and_disk(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path))
+    cache.put('h1:sigA', result())
+    cache.put('h1:sigB', result())
+    cache.put('h2:sigA', result())
+    assert cache.invalidate('h1') == 2
+    assert cache.get('h1:sigA') is None
+    assert sorted(os.listdir(tmp_path)) == ['h2_sigA.json']
+    assert cache.invalidate() == 1
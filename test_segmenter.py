@@ -0,0 +1,87 @@
+"""
+Tests for timeline segmentation (segmenter.py)
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from segmenter import plan_segments
+
+HOP = 0.01
+
+
+def levels(seconds, quiet=()):
+    """Flat -20 dB level with -60 dB dips at the `quiet` times"""
+    level_db = np.full(int(seconds / HOP), -20.0)
+    for t in quiet:
+        level_db[int(t / HOP)] = -60.0
+    return level_db
+
+
+def assert_ordered_and_disjoint(segments):
+    assert all(start < end for start, end in segments)
+    assert all(a[1] <= b[0] for a, b in zip(segments, segments[1:]))
+
+
+def test_boundaries_fall_in_pauses_between_regions():
+    regions = [(0.0, 2.8), (3.2, 6.1), (6.5, 9.0)]
+    segments = plan_segments(regions, levels(9.0), HOP, target=3.0)
+    assert segments == regions
+    assert_ordered_and_disjoint(segments)
+
+
+def test_short_regions_merge_up_to_the_target():
+    regions = [(0.0, 1.0), (1.2, 2.0), (2.3, 3.5), (5.0, 8.0)]
+    segments = plan_segments(regions, levels(8.0), HOP, target=3.0)
+    assert segments == [(0.0, 3.5), (5.0, 8.0)]
+
+
+def test_continuous_speech_is_cut_at_the_quietest_frame_near_the_target():
+    segments = plan_segments([(0.0, 9.0)], levels(9.0, quiet=(2.6, 5.9)), HOP, target=3.0)
+    assert [round(start, 2) for start, _ in segments] == [0.0, 2.6, 5.9]
+    assert segments[-1][1] == 9.0
+    assert_ordered_and_disjoint(segments)
+
+
+def test_short_tail_is_merged_into_the_previous_segment():
+    # The 0.4 s region after the split is too short to stand alone
+    segments = plan_segments([(0.0, 6.0), (6.2, 6.6)], levels(6.6, quiet=(3.0,)), HOP, target=3.0)
+    assert segments == [(0.0, 3.0), (3.0, 6.6)]
+    # A remainder within max_len is not split off at all
+    assert plan_segments([(0.0, 4.0)], levels(4.0, quiet=(3.0,)), HOP, target=3.0) == [(0.0, 4.0)]
+
+
+def test_target_below_min_len_still_splits_near_the_target():
+    segments = plan_segments([(0.0, 3.0)], levels(3.0, quiet=(0.5, 1.0, 1.5, 2.0, 2.5)), HOP, target=0.5)
+    assert len(segments) == 6
+    assert all(end - start <= 0.75 + 1e-9 for start, end in segments)
+    assert_ordered_and_disjoint(segments)
+
+
+def test_region_past_the_last_level_frame_is_cut_at_the_target():
+    segments = plan_segments([(0.0, 9.0)], levels(2.0), HOP, target=3.0)
+    assert segments == [(0.0, 3.0), (3.0, 6.0), (6.0, 9.0)]
+
+
+def test_non_positive_target_is_rejected():
+    with pytest.raises(ValueError):
+        plan_segments([(0.0, 1.0)], levels(1.0), HOP, target=0)
+
+
+def test_targets_shorter_than_a_frame_still_make_progress():
+    # Every cut rounds down to the frame it starts in; the cut must still advance
+    segments = plan_segments([(0.0, 10.0)], np.zeros(1000), HOP, target=0.02)
+    assert_ordered_and_disjoint(segments)
+    assert segments[0][0] == 0.0 and segments[-1][1] == 10.0
+
+
+def test_analyzer_rejects_timeline_windows_below_a_few_frames():
+    from voice_analyzer import VoiceAnalyzer
+    with pytest.raises(ValueError):
+        VoiceAnalyzer(timeline_window=0.02)
+    assert VoiceAnalyzer(timeline_window=0.5).timeline_window == 0.5
@@ -0,0 +1,77 @@
+"""
+Tests for the stage dependency graph (stage_scheduler.py)
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from stage_scheduler import StageScheduler, make_pools
+
+
+def test_stages_run_after_their_dependencies_with_their_results():
+    order = []
+    lock = threading.Lock()
+
+    def stage(name, *deps):
+        time.sleep(0.01)
+        with lock:
+            order.append(name)
+        return f"{name}({','.join(deps)})"
+
+    scheduler = StageScheduler()
+    scheduler.add('timeline', stage, 'timeline')
+    scheduler.add('health', stage, 'health')
+    scheduler.add('emotion', stage, 'emotion', deps=['timeline'])
+    scheduler.add('stress', stage, 'stress', deps=['emotion', 'health'])
+    results = scheduler.run()
+
+    assert results['stress'] == 'stress(emotion(timeline()),health())'
+    assert order.index('timeline') < order.index('emotion') < order.index('stress')
+    assert order.index('health') < order.index('stress')
+    assert set(scheduler.timings) == {'timeline', 'health', 'emotion', 'stress'}
+
+
+def test_independent_stages_run_side_by_side():
+    barrier = threading.Barrier(2, timeout=2)
+    thread_pool, _ = make_pools(max_workers=2)
+    scheduler = StageScheduler(thread_pool)
+    scheduler.add('a', barrier.wait)   # deadlocks (and times out) unless both run at once
+    scheduler.add('b', barrier.wait)
+    assert set(scheduler.run()) == {'a', 'b'}
+    thread_pool.shutdown()
+
+
+def test_preset_stages_are_skipped_and_feed_dependents():
+    scheduler = StageScheduler()
+    scheduler.preset('timeline', 'precomputed')
+    scheduler.add('timeline', lambda: pytest.fail("preset stage ran"))
+    scheduler.add('emotion', lambda timeline: timeline.upper(), deps=['timeline'])
+    assert scheduler.run() == {'timeline': 'precomputed', 'emotion': 'PRECOMPUTED'}
+
+
+def test_stage_error_propagates_and_dependents_never_run():
+    ran = []
+
+    def broken():
+        raise ValueError("decode failed")
+    scheduler = StageScheduler()
+    scheduler.add('timeline', broken)
+    scheduler.add('emotion', lambda timeline: ran.append(timeline), deps=['timeline'])
+    with pytest.raises(ValueError, match="decode failed"):
+        scheduler.run()
+    assert ran == []
+
+
+def test_invalid_graphs_are_rejected():
+    scheduler = StageScheduler()
+    with pytest.raises(ValueError, match="unknown stage"):
+        scheduler.add('stress', print, deps=['emotion'])
+    scheduler.add('emotion', print)
+    with pytest.raises(ValueError, match="twice"):
+        scheduler.add('emotion', print)
@@ -0,0 +1,104 @@
+"""
+Tests for live streaming sessions (streaming.py) with stub pipelines in
+place of the transformers models
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+import soxr
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from audio_context import CANONICAL_SR
+from keyword_spotter import KeywordSpotter
+from streaming import StreamingSession, StreamTooLongError
+
+import stub_models
+from stub_models import StubPipeline
+
+
+class RecordingSpotter(KeywordSpotter):
+    """Reports one 'yes' at the start of every keyword input and records its length"""
+
+    def __init__(self):
+        super().__init__(StubPipeline(), speech_only=False)
+        self.inputs = []
+
+    def detect(self, ctx):
+        self.inputs.append(ctx.duration)
+        return self.merge([{'keyword': 'yes', 'start': 0.0, 'end': 0.5, 'score': 0.9}])
+
+
+def stub_analyzer():
+    analyzer, _ = stub_models.stub_analyzer(replicas=1, max_concurrent=1, spotter=RecordingSpotter())
+    return analyzer
+
+
+def voice(seconds, sr):
+    return stub_models.voice(seconds, sr, noise=0.0)
+
+
+def test_windows_are_taken_whole_and_the_tail_only_when_final():
+    session = StreamingSession(stub_analyzer(), CANONICAL_SR, window=1.0)
+    session.feed(voice(0.6, CANONICAL_SR).tobytes())
+    assert session._take() is None
+    session.feed(voice(0.6, CANONICAL_SR).tobytes())
+    assert len(session._take()) == CANONICAL_SR
+    assert session._take() is None
+    assert len(session._take(final=True)) == int(1.2 * CANONICAL_SR) - CANONICAL_SR
+    assert session._take(final=True) is None
+
+
+def test_frames_past_the_limit_are_refused_and_not_kept():
+    session = StreamingSession(stub_analyzer(), 16000, max_seconds=2.0)
+    assert session.feed(voice(1.5, 16000).tobytes()) == 1.5
+    with pytest.raises(StreamTooLongError):
+        session.feed(voice(1.0, 16000).tobytes())
+    assert session._received_samples == int(1.5 * 16000)
+
+
+def test_windows_are_resampled_as_one_continuous_stream():
+    y = voice(4.0, 16000)
+    session = StreamingSession(stub_analyzer(), 16000, window=1.0)
+    for start in range(0, len(y), 4000):
+        session.feed(y[start:start + 4000].tobytes())
+        session.process_ready()
+    session.process_ready(final=True)
+
+    joined = np.concatenate(session._windows)
+    expected = soxr.resample(y, 16000, CANONICAL_SR, quality='HQ')
+    assert len(joined) == len(expected)
+    assert np.max(np.abs(joined - expected)) < 1e-4
+
+
+def test_keyword_offsets_account_for_the_overlap_with_the_previous_window():
+    analyzer = stub_analyzer()
+    session = StreamingSession(analyzer, CANONICAL_SR, window=2.0)
+    session.feed(voice(4.0, CANONICAL_SR).tobytes())
+    session.process_ready()
+
+    # The second window's input starts one spotter window before it
+    assert analyzer.keyword_spotter.inputs == pytest.approx([2.0, 3.0], abs=1e-3)
+    assert [det['start'] for det in session._detections] == pytest.approx([0.0, 1.0], abs=1e-3)
+    assert all(det['score'] == pytest.approx(0.9) for det in session._detections)
+
+
+def test_finish_hands_the_incremental_stages_to_analyze(monkeypatch):
+    analyzer = stub_analyzer()
+    session = StreamingSession(analyzer, CANONICAL_SR, window=2.0)
+    session.feed(voice(5.0, CANONICAL_SR).tobytes())
+    session.process_ready()
+    calls = []
+    monkeypatch.setattr(analyzer, 'analyze', lambda ctx, precomputed=None: calls.append((ctx, precomputed)) or {})
+
+    session.finish()
+
+    (ctx, precomputed), = calls
+    assert abs(ctx.duration - 5.0) < 1e-3
+    assert set(precomputed) == {'timeline', 'keywords', 'health'}
+    assert [point['time'] for point in precomputed['timeline']['timeline']] == ['0.0s', '2.0s', '4.0s']
+    assert [det['start'] for det in precomputed['keywords']['detections']] == [0.0, 1.0, 3.0]
+    assert session._bounds == [(0.0, 2.0), (2.0, 4.0), (4.0, 5.0)]
@@ -0,0 +1,59 @@
+"""
+Tests for upload spooling (upload_spool.py)
+"""
+
+import hashlib
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import upload_spool
+from upload_spool import UploadSpool
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_spool, 'SPOOL_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_small_upload_stays_in_memory(spool_dir):
+    data = os.urandom(1000)
+    with UploadSpool(io.BytesIO(data), max_memory=1000) as upload:
+        assert upload.in_memory
+        assert upload.size == 1000
+        assert upload.sha256 == hashlib.sha256(data).hexdigest()
+    assert os.listdir(spool_dir) == []
+
+
+def test_large_upload_spills_and_the_file_is_deleted(spool_dir):
+    data = os.urandom(3000)
+    with UploadSpool(io.BytesIO(data), suffix='.wav', max_memory=1000) as upload:
+        assert not upload.in_memory
+        assert upload.path.endswith('.wav')
+        with open(upload.path, 'rb') as f:
+            assert f.read() == data
+        assert upload.sha256 == hashlib.sha256(data).hexdigest()
+    assert os.listdir(spool_dir) == []
+
+
+def test_failed_read_removes_the_partial_file(spool_dir):
+    class Broken(io.BytesIO):
+        def read(self, size=-1):
+            if self.tell() >= 2000:
+                raise ConnectionError("client went away")
+            return super().read(size)
+    with pytest.raises(ConnectionError):
+        UploadSpool(Broken(os.urandom(5000)), max_memory=1000)
+    assert os.listdir(spool_dir) == []
+
+
+def test_to_file_spills_an_in_memory_upload(spool_dir):
+    with UploadSpool(io.BytesIO(b'abc')) as upload:
+        path = upload.to_file()
+        assert open(path, 'rb').read() == b'abc'
+    assert not os.path.exists(path)
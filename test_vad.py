@@ -0,0 +1,100 @@
+"""
+Tests for voice activity detection (vad.py) on synthetic silence + tone audio
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from vad import HOP, PADDING, detect_speech, frame_features, overlap
+
+SR = 16000
+
+
+def tone(seconds, freq=150.0, amplitude=0.3):
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def silence(seconds, noise=1e-4, seed=0):
+    return (noise * np.random.default_rng(seed).standard_normal(int(seconds * SR))).astype(np.float32)
+
+
+def test_tone_between_silences_is_found_with_padding():
+    y = np.concatenate([silence(1.0), tone(1.0), silence(1.0, seed=1)])
+    regions = detect_speech(y, SR)
+    assert len(regions) == 1
+    start, end = regions[0]
+    assert abs(start - (1.0 - PADDING)) <= 3 * HOP   # frames overlapping the onset count
+    assert abs(end - (2.0 + PADDING)) <= 4 * HOP
+
+
+def test_short_pause_is_bridged_long_pause_splits():
+    y = np.concatenate([silence(0.5), tone(0.8), silence(0.1, seed=1), tone(0.8),
+                        silence(1.0, seed=2), tone(0.8), silence(0.5, seed=3)])
+    regions = detect_speech(y, SR)
+    assert len(regions) == 2
+    assert overlap(regions, 0.5, 2.2) > 1.6      # both tones before the short pause, as one region
+    assert overlap(regions, 2.3, 3.1) < 0.2      # the long pause stays silent
+
+
+def test_short_burst_is_dropped():
+    y = np.concatenate([silence(1.0), tone(0.05), silence(1.0, seed=1), tone(1.0), silence(0.5, seed=2)])
+    regions = detect_speech(y, SR)
+    assert len(regions) == 1
+    assert regions[0][0] > 1.5
+
+
+def test_frame_features_match_per_frame_computation():
+    y = np.concatenate([silence(0.3), tone(0.4, freq=3000.0), silence(0.05, seed=1)])
+    level_db, zcr = frame_features(y, SR)
+    frame_len, hop_len = int(0.025 * SR), int(HOP * SR)
+    frames = np.lib.stride_tricks.sliding_window_view(y, frame_len)[::hop_len]
+    signs = np.signbit(frames)
+    assert np.allclose(level_db, 10 * np.log10(np.mean(np.square(frames, dtype=np.float64), axis=1) + 1e-10))
+    assert np.allclose(zcr, np.mean(signs[:, 1:] != signs[:, :-1], axis=1))
+
+
+def test_silence_and_empty_input():
+    assert detect_speech(np.zeros(0, dtype=np.float32), SR) == []
+    assert detect_speech(np.zeros(SR, dtype=np.float32), SR) == []
+
+
+def test_regions_are_sorted_disjoint_and_in_bounds():
+    rng = np.random.default_rng(4)
+    parts = [tone(rng.uniform(0.2, 1.0), freq=rng.uniform(100, 300)) if i % 2
+             else silence(rng.uniform(0.1, 0.8), seed=i)
+             for i in range(12)]
+    y = np.concatenate(parts)
+    regions = detect_speech(y, SR)
+    assert regions
+    assert all(0 <= start < end <= len(y) / SR for start, end in regions)
+    assert all(a[1] < b[0] for a, b in zip(regions, regions[1:]))
+
+
+def test_jitter_is_measured_per_region_of_the_joined_speech(monkeypatch):
+    from audio_context import AudioContext, CANONICAL_SR
+    from voice_analyzer import VoiceAnalyzer
+
+    t = np.arange(CANONICAL_SR) / CANONICAL_SR
+    voiced = (0.3 * np.sin(2 * np.pi * 140 * t)).astype(np.float32)
+    gap = np.zeros(CANONICAL_SR, dtype=np.float32)
+    ctx = AudioContext(np.concatenate([gap, voiced, gap, voiced, gap]), CANONICAL_SR)
+    speech = ctx.speech()
+    measured = []
+    jitter = speech.praat.jitter
+
+    def spy(regions=None, **params):
+        measured.append(regions)
+        return jitter(regions=regions, **params)
+    monkeypatch.setattr(speech.praat, 'jitter', spy)
+
+    value, _ = VoiceAnalyzer()._perturbation(ctx)
+    assert 'sound' not in ctx._memo.keys()   # no Praat pass over the silence
+    (first, second), = measured
+    assert first[0] == 0.0 and first[1] == second[0]
+    assert abs(second[1] - speech.duration) <= 1 / CANONICAL_SR
+    assert 0 <= value < 0.05
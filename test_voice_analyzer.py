@@ -0,0 +1,167 @@
+"""
+Tests for concurrent VoiceAnalyzer use (voice_analyzer.py, micro_batcher.py)
+with stub pipelines in place of the transformers models
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+import soundfile as sf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from audio_context import AudioContext, CANONICAL_SR
+from long_audio import LongAudioAnalysis, analyze_long
+import voice_analyzer
+from voice_analyzer import VoiceAnalyzer
+
+from stub_models import stub_analyzer, voice
+
+
+def test_concurrent_analyses_respect_slots_and_replica_threads():
+    analyzer, replicas = stub_analyzer(replicas=2, max_concurrent=2)
+    active = [0]
+    peak = [0]
+    lock = threading.Lock()
+    run_stages = analyzer._analyze
+
+    def counted(*args):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        try:
+            time.sleep(0.05)   # keep the slot long enough for callers to pile up
+            return run_stages(*args)
+        finally:
+            with lock:
+                active[0] -= 1
+    analyzer._analyze = counted
+
+    results = [None] * 6
+    errors = []
+
+    def call(i):
+        try:
+            results[i] = analyzer.analyze(AudioContext(voice(seed=i), CANONICAL_SR))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert all(result['emotion'] for result in results)
+    assert peak[0] == 2
+    assert max(result['raw']['timings']['queue'] for result in results) > 0.02
+    # Each replica is only ever called from its own batcher worker thread
+    assert all(len(replica.threads) <= 1 for replica in replicas)
+    used = [thread for replica in replicas for thread in replica.threads]
+    assert len(used) == len(set(used))
+
+
+def test_long_audio_waits_for_an_analysis_slot(tmp_path):
+    analyzer, _ = stub_analyzer(replicas=1, max_concurrent=1)
+    path = str(tmp_path / 'long.wav')
+    sf.write(path, voice(seconds=3.0), CANONICAL_SR)
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(analyze_long(analyzer, path, chunk_seconds=2.0)))
+
+    with analyzer.slot():
+        worker.start()
+        time.sleep(0.2)
+        assert not result   # blocked while the only slot is held
+    worker.join()
+
+    assert result['emotion']
+    assert result['raw']['timings']['queue'] >= 0.15
+    assert result['raw']['long_audio']['chunks'] == 2
+
+
+def test_cache_signature_does_not_load_the_models(monkeypatch):
+    analyzer = VoiceAnalyzer(replicas=1, max_concurrent=1, max_workers=1)
+    monkeypatch.setattr(analyzer, '_load_models', lambda: pytest.fail("cache_signature loaded the models"))
+    signature = analyzer.cache_signature()
+    assert not analyzer.ready
+    assert signature['backend'] == 'torch'
+    assert signature['emotion_model'] == {'name': voice_analyzer.EMOTION_MODEL,
+                                          'revision': voice_analyzer.EMOTION_REVISION}
+    assert signature['keyword_model']['revision'] == voice_analyzer.KEYWORD_REVISION
+    remote = VoiceAnalyzer(replicas=1, max_workers=1, model_server='127.0.0.1:6000')
+    assert remote.cache_signature()['backend'] == 'server:127.0.0.1:6000'
+
+
+def test_models_load_at_the_configured_revisions(monkeypatch):
+    loaded = []
+    monkeypatch.setattr(voice_analyzer, 'EMOTION_REVISION', 'abc123')
+    monkeypatch.setattr(voice_analyzer, 'load_pipeline', lambda model_id, backend, threads=None, revision=None:
+                        loaded.append((model_id, revision)))
+    voice_analyzer.load_models()
+    assert loaded == [(voice_analyzer.EMOTION_MODEL, 'abc123'),
+                      (voice_analyzer.KEYWORD_MODEL, voice_analyzer.KEYWORD_REVISION)]
+    assert VoiceAnalyzer(replicas=1, max_workers=1).cache_signature()['emotion_model']['revision'] == 'abc123'
+
+
+def test_long_audio_without_scored_segments_is_neutral(capsys):
+    analyzer, _ = stub_analyzer(replicas=1, max_concurrent=1)
+    analysis = LongAudioAnalysis(analyzer)   # no segment scores came through
+
+    emotion = analysis.stages()['emotion']
+
+    assert emotion == {'emotion': 'neutral', 'confidence': 0, 'all_emotions': []}
+    assert 'Emotion analysis error' not in capsys.readouterr().out
+
+
+def test_praat_failure_in_the_syllable_count_keeps_the_personality_scores(monkeypatch):
+    import parselmouth
+    from praat_features import PraatFeatures
+
+    def too_short(self, **params):
+        raise parselmouth.PraatError('Sound: shorter than window length.')
+    monkeypatch.setattr(PraatFeatures, 'syllable_nuclei', too_short)
+
+    personality = VoiceAnalyzer()._analyze_personality(AudioContext(voice(), CANONICAL_SR))
+
+    assert personality['acoustic_features']['speaking_rate'] == 0
+    assert personality['acoustic_features']['energy'] > 0   # the other features were still measured
+
+
+def test_decode_timing_comes_from_where_the_upload_was_decoded(monkeypatch):
+    import io
+    from metrics import STAGE_SECONDS
+    analyzer, _ = stub_analyzer(replicas=1, max_concurrent=1)
+    observed = {}
+    monkeypatch.setattr(STAGE_SECONDS, 'observe', lambda value, stage: observed.update({stage: value}))
+    buffer = io.BytesIO()
+    sf.write(buffer, voice(), CANONICAL_SR, format='WAV')
+    ctx = AudioContext.from_bytes(buffer.getvalue())   # decoded before analyze(), as uploads are
+    assert ctx.decode_seconds > 0
+
+    timings = analyzer.analyze(ctx)['raw']['timings']
+    assert timings['decode'] == round(ctx.decode_seconds, 4)
+    assert observed['decode'] == ctx.decode_seconds
+    # Contexts built from samples were never decoded, so report no decode time
+    assert 'decode' not in analyzer.analyze(AudioContext(voice(), CANONICAL_SR))['raw']['timings']
+
+
+def test_batch_classification_waits_for_an_analysis_slot():
+    analyzer, _ = stub_analyzer(replicas=1, max_concurrent=1)
+    classified = []
+    classify = analyzer._classify_inputs
+    analyzer._classify_inputs = lambda inputs: classified.append(len(inputs)) or classify(inputs)
+    results = []
+    worker = threading.Thread(target=lambda: results.extend(analyzer.analyze_batch(
+        [AudioContext(voice(seed=i), CANONICAL_SR) for i in range(2)])))
+
+    with analyzer.slot():
+        worker.start()
+        time.sleep(0.2)
+        assert not classified   # the shared pass needs the only slot too
+    worker.join()
+
+    assert classified and len(results) == 2
+    assert all(result['emotion'] for result in results)